@@ -0,0 +1,26 @@
+"""
+Create any indexes declared on the models that are missing from the database.
+create_all() only creates indexes together with new tables, so existing
+deployments need this after index changes in models.py.
+"""
+from sqlmodel import SQLModel
+from database import engine
+import models  # noqa: F401 - registers the tables on SQLModel.metadata
+
+def add_indexes():
+    print("=" * 60)
+    print("Creating missing indexes")
+    print("=" * 60)
+
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+                print(f"  ✓ {table.name}: {index.name}")
+
+    print("\n" + "=" * 60)
+    print("✓ Migration completed successfully!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    add_indexes()
@@ -0,0 +1,65 @@
+"""
+Create the search indexes used by /api/search on an existing database.
+
+PostgreSQL: adds the generated search_vector columns (this rewrites each
+table once, holding a lock that blocks writes, so run it in a quiet window),
+enables pg_trgm and builds the GIN and serial-prefix indexes with CREATE
+INDEX CONCURRENTLY. SQLite: creates and fills the FTS5 tables and their sync
+triggers. This is the only place the search structures are created; the API
+detects them at startup, so restart it afterwards.
+
+Usage: python add_search_indexes.py
+"""
+import time
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import text
+from database import engine
+from search import SEARCH_TARGETS, postgresql_index_statements, sqlite_fts_statements
+
+def enable_trigram() -> bool:
+    """Try to enable pg_trgm; returns whether it is available"""
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        return True
+    except DBAPIError as exc:
+        print(f"✗ pg_trgm is not available: {exc.orig}".splitlines()[0])
+        return False
+
+def add_search_indexes():
+    print("=" * 60)
+    print("Creating search indexes")
+    print("=" * 60)
+
+    if engine.dialect.name == "postgresql":
+        trigram = enable_trigram()
+        if not trigram:
+            print("  only the word-match and serial-prefix indexes will be built")
+        autocommit = engine.execution_options(isolation_level="AUTOCOMMIT")
+        with autocommit.connect() as connection:
+            for target in SEARCH_TARGETS.values():
+                for statement in postgresql_index_statements(target, concurrently=True, trigram=trigram):
+                    started = time.perf_counter()
+                    print(f"  {statement.split(' ON ')[0].split(' tsvector')[0]}...")
+                    connection.execute(text(statement))
+                    print(f"  ✓ done in {time.perf_counter() - started:.1f}s")
+    elif engine.dialect.name == "sqlite":
+        with engine.begin() as connection:
+            for target in SEARCH_TARGETS.values():
+                exists = connection.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": target.fts_table}
+                ).first()
+                for statement in sqlite_fts_statements(target):
+                    connection.execute(text(statement))
+                if not exists:
+                    connection.execute(text(f"INSERT INTO {target.fts_table}({target.fts_table}) VALUES ('rebuild')"))
+        print("✓ Search tables and triggers are in place")
+    else:
+        print(f"✗ No search indexes for {engine.dialect.name}; search will scan with ILIKE")
+
+    print("\n" + "=" * 60)
+    print("✓ Migration completed successfully!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    add_search_indexes()
@@ -0,0 +1,58 @@
+"""
+Make equipment.serial_number unique (the equipment import upserts on it).
+
+Duplicate serial numbers must be resolved first; they are listed and the
+migration stops without changing anything. On PostgreSQL the unique index is
+built with CREATE UNIQUE INDEX CONCURRENTLY and swapped in for the old one.
+
+Usage: python add_serial_number_unique.py
+"""
+import sys
+from sqlalchemy import inspect
+from sqlmodel import text
+from database import engine
+
+INDEX_NAME = "ix_equipment_serial_number"
+
+def add_serial_number_unique():
+    print("=" * 60)
+    print("Making equipment.serial_number unique")
+    print("=" * 60)
+
+    for index in inspect(engine).get_indexes("equipment"):
+        if index["name"] == INDEX_NAME and index["unique"]:
+            print(f"✓ Index '{INDEX_NAME}' is already unique!")
+            return 0
+
+    with engine.connect() as connection:
+        duplicates = connection.execute(text(
+            "SELECT serial_number, count(*) FROM equipment GROUP BY serial_number HAVING count(*) > 1 ORDER BY serial_number"
+        )).all()
+    if duplicates:
+        print(f"\n✗ {len(duplicates)} serial number(s) are used more than once; fix these first:")
+        for serial_number, count in duplicates:
+            print(f"  {serial_number!r}: {count} rows")
+        return 1
+
+    if engine.dialect.name == "postgresql":
+        autocommit = engine.execution_options(isolation_level="AUTOCOMMIT")
+        with autocommit.connect() as connection:
+            print("  Building unique index concurrently...")
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}__unique"))
+            connection.execute(text(f"CREATE UNIQUE INDEX CONCURRENTLY {INDEX_NAME}__unique ON equipment (serial_number)"))
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP INDEX IF EXISTS {INDEX_NAME}"))
+            connection.execute(text(f"ALTER INDEX {INDEX_NAME}__unique RENAME TO {INDEX_NAME}"))
+    else:
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP INDEX IF EXISTS {INDEX_NAME}"))
+            connection.execute(text(f"CREATE UNIQUE INDEX {INDEX_NAME} ON equipment (serial_number)"))
+    print(f"  ✓ Created unique index '{INDEX_NAME}'")
+
+    print("\n" + "=" * 60)
+    print("✓ Migration completed successfully!")
+    print("=" * 60)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(add_serial_number_unique())
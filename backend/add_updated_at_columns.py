@@ -0,0 +1,40 @@
+"""
+Add updated_at columns (used by /api/sync) to existing tables
+"""
+from sqlalchemy import inspect
+from sqlmodel import SQLModel, text
+from database import engine
+import models  # noqa: F401 - registers the tables on SQLModel.metadata
+
+TABLES = ["team", "technician", "workcenter", "equipmentcategory", "equipment", "maintenancerequest", "user"]
+
+def add_updated_at_columns():
+    print("=" * 60)
+    print("Adding updated_at columns")
+    print("=" * 60)
+
+    # Creates the new tombstone table; existing tables are left untouched
+    SQLModel.metadata.create_all(engine)
+
+    # The app stamps naive UTC; CURRENT_TIMESTAMP on PostgreSQL is session-local time
+    utc_now = "timezone('utc', now())" if engine.dialect.name == "postgresql" else "CURRENT_TIMESTAMP"
+
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in TABLES:
+            columns = [column["name"] for column in inspector.get_columns(table)]
+            if "updated_at" in columns:
+                print(f"✓ Column '{table}.updated_at' already exists!")
+                continue
+            print(f"  Adding '{table}.updated_at' column...")
+            connection.execute(text(f'ALTER TABLE "{table}" ADD COLUMN updated_at TIMESTAMP'))
+            connection.execute(text(f'UPDATE "{table}" SET updated_at = {utc_now}'))
+            print(f"  ✓ Added '{table}.updated_at' column")
+
+    print("\nRun add_indexes.py to create the updated_at indexes.")
+    print("\n" + "=" * 60)
+    print("✓ Migration completed successfully!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    add_updated_at_columns()
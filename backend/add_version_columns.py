@@ -0,0 +1,32 @@
+"""
+Add version columns (used for ETag / If-Match updates) to existing tables
+"""
+from sqlalchemy import inspect
+from sqlmodel import text
+from database import engine
+
+TABLES = ["team", "technician", "workcenter", "equipmentcategory", "equipment", "maintenancerequest"]
+
+def add_version_columns():
+    print("=" * 60)
+    print("Adding version columns")
+    print("=" * 60)
+
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in TABLES:
+            columns = [column["name"] for column in inspector.get_columns(table)]
+            if "version" in columns:
+                print(f"✓ Column '{table}.version' already exists!")
+                continue
+            print(f"  Adding '{table}.version' column...")
+            # A constant default fills existing rows without rewriting them on PostgreSQL 11+
+            connection.execute(text(f'ALTER TABLE "{table}" ADD COLUMN version INTEGER NOT NULL DEFAULT 1'))
+            print(f"  ✓ Added '{table}.version' column")
+
+    print("\n" + "=" * 60)
+    print("✓ Migration completed successfully!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    add_version_columns()
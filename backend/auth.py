@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -8,7 +9,11 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session, select
 from models import User
 from database import get_session
+from cache import token_cache
+import asyncio
+import os
 import secrets
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,7 +22,21 @@ SECRET_KEY = "gearguard_secret_key_change_me"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 24 hours
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor (log2 of the work). Stored hashes with any other cost are
+# re-hashed with this one on the user's next successful login, so the cost can
+# be raised or lowered without a flag-day migration.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+def make_pwd_context(rounds: int = BCRYPT_ROUNDS) -> CryptContext:
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+pwd_context = make_pwd_context()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 def verify_password(plain_password, hashed_password):
@@ -26,6 +45,50 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# bcrypt releases the GIL while hashing, so a thread pool sized to the
+# number of cores scales with them without blocking the event loop
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", str(HASH_WORKERS * 8)))
+
+class HashingPool:
+    """
+    Dedicated, bounded executor for password hashing. At most `workers`
+    hashes run at once and at most `queue_limit` more may wait; beyond that
+    callers get a 503 immediately instead of piling up behind a login storm.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self.rejected = 0
+
+    async def run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+hashing_pool = HashingPool()
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    """Returns (valid, new_hash); new_hash is set when the stored hash uses outdated parameters"""
+    return await hashing_pool.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await hashing_pool.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -37,6 +100,11 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+    # Tokens verified recently skip both the JWT decode and the user query
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -53,6 +121,9 @@ def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Dep
     user = session.exec(select(User).where(User.username == username)).first()
     if user is None:
         raise credentials_exception
+    # Cache a transient copy: `user` belongs to this request's session and is
+    # expired by any commit the handler makes
+    token_cache.put(token, User.model_validate(user.model_dump()), username, payload.get("exp"))
     return user
 
 def generate_reset_token():
@@ -0,0 +1,116 @@
+"""
+In-memory prefix index for equipment autocomplete.
+
+Keys are kept in one sorted list of (lowercased key, equipment id) pairs: the
+full serial number, the full name and every later word of the name, so
+"pump" finds "Hydraulic Pump". A lookup is a binary search to the first key
+with the prefix followed by a short forward scan, so it costs microseconds
+regardless of the number of assets.
+
+The index is built lazily from the database and then kept current by the
+equipment write endpoints (upsert / remove). Bulk writes such as imports
+call invalidate() and the next lookup rebuilds it. The index lives in each
+process; with several workers, changes made through another worker show up
+after the periodic rebuild (AUTOCOMPLETE_REBUILD_SECONDS).
+"""
+import bisect
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlmodel import Session, select
+from models import Equipment
+
+AUTOCOMPLETE_REBUILD_SECONDS = float(os.getenv("AUTOCOMPLETE_REBUILD_SECONDS", "300"))
+# Fields returned with every suggestion; enough to fill in the request form
+SUGGESTION_FIELDS = ("id", "name", "serial_number", "location", "status", "team_id", "technician_id")
+
+
+def _keys(entry: dict) -> List[Tuple[str, str]]:
+    """(key, matched field) pairs an asset is found under"""
+    keys = []
+    if entry["serial_number"]:
+        keys.append((entry["serial_number"].casefold(), "serial_number"))
+    name = (entry["name"] or "").casefold()
+    words = name.split()
+    for position in range(len(words)):
+        keys.append((" ".join(words[position:]), "name"))
+    return keys
+
+
+class PrefixIndex:
+    def __init__(self, rebuild_seconds: float = AUTOCOMPLETE_REBUILD_SECONDS):
+        self.rebuild_seconds = rebuild_seconds
+        self._keys: List[Tuple[str, int, str]] = []
+        self._entries: Dict[int, dict] = {}
+        self._built_at: Optional[float] = None
+        # Held across a rebuild so a concurrent upsert lands in the new arrays
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def _stale(self) -> bool:
+        return self._built_at is None or time.monotonic() - self._built_at > self.rebuild_seconds
+
+    def _rebuild(self, session: Session):
+        columns = [getattr(Equipment, name) for name in SUGGESTION_FIELDS]
+        entries = {row.id: dict(row._mapping) for row in session.exec(select(*columns))}
+        self._keys = sorted((key, row_id, field) for row_id, entry in entries.items() for key, field in _keys(entry))
+        self._entries = entries
+        self._built_at = time.monotonic()
+        self.rebuilds += 1
+
+    def _remove(self, row_id: int):
+        entry = self._entries.pop(row_id, None)
+        if entry is None:
+            return
+        for key, field in _keys(entry):
+            position = bisect.bisect_left(self._keys, (key, row_id, field))
+            if position < len(self._keys) and self._keys[position] == (key, row_id, field):
+                del self._keys[position]
+
+    def upsert(self, row):
+        """Add or replace one asset (an Equipment object or a row dict)"""
+        if not isinstance(row, dict):
+            row = row.model_dump()
+        entry = {name: row.get(name) for name in SUGGESTION_FIELDS}
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._remove(entry["id"])
+            self._entries[entry["id"]] = entry
+            for key, field in _keys(entry):
+                bisect.insort(self._keys, (key, entry["id"], field))
+
+    def remove(self, row_id: int):
+        with self._lock:
+            self._remove(row_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def suggest(self, session: Session, q: str, limit: int) -> List[dict]:
+        """Up to `limit` assets with a key starting with `q`, in key order"""
+        prefix = " ".join(q.casefold().split())
+        with self._lock:
+            if self._stale():
+                self._rebuild(session)
+            results = []
+            seen = set()
+            position = bisect.bisect_left(self._keys, (prefix,))
+            while position < len(self._keys) and len(results) < limit:
+                key, row_id, field = self._keys[position]
+                if not key.startswith(prefix):
+                    break
+                if row_id not in seen:
+                    seen.add(row_id)
+                    results.append({**self._entries[row_id], "matched": field})
+                position += 1
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"assets": len(self._entries), "keys": len(self._keys), "rebuilds": self.rebuilds}
+
+
+equipment_index = PrefixIndex()
@@ -0,0 +1,57 @@
+"""
+Benchmark password verification throughput of the login path as the
+hashing pool grows, to show it scaling with cores.
+
+Usage: python bench_login.py [verifications_per_run]
+"""
+import asyncio
+import os
+import sys
+import time
+from auth import HashingPool, get_password_hash, verify_password
+
+def worker_counts():
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+async def run(workers: int, total: int, hashed: str) -> float:
+    pool = HashingPool(workers=workers, queue_limit=total)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(pool.run(verify_password, "Secret#Password1", hashed) for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+    assert all(results)
+    return total / elapsed
+
+async def run_overload(hashed: str):
+    pool = HashingPool(workers=1, queue_limit=2)
+    results = await asyncio.gather(
+        *(pool.run(verify_password, "Secret#Password1", hashed) for _ in range(10)),
+        return_exceptions=True,
+    )
+    pool.shutdown()
+    return sum(1 for result in results if isinstance(result, Exception)), len(results)
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    hashed = get_password_hash("Secret#Password1")
+
+    print("=" * 60)
+    print(f"Login password verification throughput ({total} logins per run)")
+    print("=" * 60)
+    baseline = None
+    for workers in worker_counts():
+        rate = asyncio.run(run(workers, total, hashed))
+        baseline = baseline or rate
+        print(f"  workers={workers:<3} {rate:8.1f} logins/s   speedup x{rate / baseline:.2f}")
+
+    rejected, submitted = asyncio.run(run_overload(hashed))
+    print(f"\nOverload (1 worker, queue limit 2): {rejected}/{submitted} rejected with 503")
+
+if __name__ == "__main__":
+    main()
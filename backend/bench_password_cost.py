@@ -0,0 +1,36 @@
+"""
+Report login password-verification latency for each bcrypt cost setting,
+to pick BCRYPT_ROUNDS against the p99 login latency budget on this hardware.
+
+Usage: python bench_password_cost.py [min_rounds] [max_rounds] [samples]
+"""
+import statistics
+import sys
+import time
+from auth import make_pwd_context
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def main():
+    min_rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    max_rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 14
+    samples = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    print("=" * 60)
+    print(f"bcrypt verify latency ({samples} samples per cost)")
+    print("=" * 60)
+    print(f"  {'rounds':<8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for rounds in range(min_rounds, max_rounds + 1):
+        context = make_pwd_context(rounds)
+        hashed = context.hash("Secret#Password1")
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            context.verify("Secret#Password1", hashed)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"  {rounds:<8}{statistics.median(timings):>10.1f}{percentile(timings, 0.99):>10.1f}{max(timings):>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Kanban board data: per-stage counts and the first cards of each column,
+with keyset cursors so each column can load more on its own.
+"""
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import case, tuple_
+from sqlmodel import Session, select, func
+from models import Equipment, MaintenanceRequest, WorkCenter, parse_date
+
+STAGES = ["New", "In Progress", "Repaired", "Scrap"]
+BOARD_SORTS = ("date", "priority", "none")
+PRIORITY_RANK = {"High": 0, "Medium": 1, "Low": 2}
+
+priority_rank = case(PRIORITY_RANK, value=MaintenanceRequest.priority, else_=len(PRIORITY_RANK))
+
+
+def _sort_key(sort: str):
+    if sort == "date":
+        return MaintenanceRequest.scheduled_date
+    if sort == "priority":
+        return priority_rank
+    return None
+
+
+def _encode_cursor(sort: str, card: dict) -> str:
+    if sort == "date":
+        return f"{card['scheduled_date']}|{card['id']}"
+    if sort == "priority":
+        return f"{PRIORITY_RANK.get(card['priority'], len(PRIORITY_RANK))}|{card['id']}"
+    return str(card["id"])
+
+
+def _after_cursor(query, sort: str, cursor: str):
+    """Restrict `query` to cards after `cursor` in the board's sort order"""
+    try:
+        if sort == "none":
+            return query.where(MaintenanceRequest.id > int(cursor))
+        value, last_id = cursor.rsplit("|", 1)
+        value = parse_date(value) if sort == "date" else int(value)
+        return query.where(tuple_(_sort_key(sort), MaintenanceRequest.id) > tuple_(value, int(last_id)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def column_cards(session: Session, stage: str, sort: str, limit: int, filters, cursor: Optional[str] = None) -> dict:
+    query = (
+        select(
+            MaintenanceRequest,
+            Equipment.name.label("equipment_name"),
+            WorkCenter.name.label("work_center_name"),
+        )
+        .join(Equipment, MaintenanceRequest.equipment_id == Equipment.id, isouter=True)
+        .join(WorkCenter, MaintenanceRequest.work_center_id == WorkCenter.id, isouter=True)
+        .where(MaintenanceRequest.stage == stage)
+    )
+    query = filters.apply(query)
+    if cursor:
+        query = _after_cursor(query, sort, cursor)
+    sort_key = _sort_key(sort)
+    order = [sort_key, MaintenanceRequest.id] if sort_key is not None else [MaintenanceRequest.id]
+    rows = session.exec(query.order_by(*order).limit(limit + 1)).all()
+
+    cards = [{**request.model_dump(), "equipment_name": equipment_name, "work_center_name": work_center_name}
+             for request, equipment_name, work_center_name in rows[:limit]]
+    next_cursor = _encode_cursor(sort, cards[-1]) if len(rows) > limit else None
+    return {"stage": stage, "cards": cards, "next_cursor": next_cursor}
+
+
+def column_count(session: Session, stage: str, filters) -> int:
+    query = filters.apply(select(func.count(MaintenanceRequest.id)).where(MaintenanceRequest.stage == stage))
+    return session.exec(query).one()
+
+
+def board(session: Session, sort: str, limit: int, filters) -> dict:
+    """Counts for every stage from one GROUP BY, plus the first `limit` cards per column"""
+    count_query = filters.apply(select(MaintenanceRequest.stage, func.count(MaintenanceRequest.id))).group_by(MaintenanceRequest.stage)
+    counts = dict(session.exec(count_query).all())
+
+    columns = []
+    for stage in STAGES:
+        column = column_cards(session, stage, sort, limit, filters) if counts.get(stage) else {"stage": stage, "cards": [], "next_cursor": None}
+        column["count"] = counts.get(stage, 0)
+        columns.append(column)
+    return {"sort": sort, "columns": columns}
@@ -0,0 +1,206 @@
+"""
+Bulk maintenance request changes: creates, partial updates and stage moves
+applied in one transaction, with a result per item.
+
+Creates are validated up front and inserted with a single batched flush.
+Updates and stage moves are one statement each (see versioning and
+transitions); an update cannot change `stage`, that takes a stage op. Rollup changes are netted per key and written once at the end.
+
+In "atomic" mode the first failure rolls everything back. In "best_effort"
+mode each failing item is rolled back to its own savepoint and the rest
+commit.
+"""
+import os
+from typing import List, Literal, Optional
+from fastapi import HTTPException
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy.exc import IntegrityError, StatementError
+from sqlmodel import Session
+from models import InvalidDate, MaintenanceRequest
+from rollups import ROLLUP_KEY_COLUMNS, RollupBatch, row_rollup_key, rollup_key
+from transitions import transition_stage, without_stage
+from versioning import PROTECTED_FIELDS, versioned_update
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+EDIT_ROLES = ["admin", "manager", "technician"]
+
+
+class BulkOperation(BaseModel):
+    op: Literal["create", "update", "stage"]
+    id: Optional[int] = None
+    # Fields for create / update
+    data: dict = {}
+    # Target stage and optional guard for stage moves
+    stage: Optional[str] = None
+    expected_stage: Optional[str] = None
+    # Expected version for updates (the If-Match of a single PUT)
+    version: Optional[int] = None
+
+
+class BulkRequest(BaseModel):
+    mode: Literal["atomic", "best_effort"] = "atomic"
+    operations: List[BulkOperation] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class ItemFailed(Exception):
+    def __init__(self, status: int, error):
+        self.status = status
+        self.error = error
+
+
+def _failure(index: int, op: str, status: int, error) -> dict:
+    return {"index": index, "op": op, "status": status, "error": error}
+
+
+def _validated(data: dict) -> MaintenanceRequest:
+    try:
+        return MaintenanceRequest.model_validate({k: v for k, v in data.items() if k not in PROTECTED_FIELDS})
+    except ValidationError as exc:
+        raise ItemFailed(422, exc.errors(include_url=False, include_context=False))
+
+
+def _apply_change(session: Session, operation: BulkOperation, role: str, rollups: RollupBatch):
+    """Run one update or stage move; returns (request row, equipment row or None)"""
+    if role not in EDIT_ROLES:
+        raise ItemFailed(403, "Insufficient permissions")
+    if operation.id is None:
+        raise ItemFailed(422, f"{operation.op} needs an id")
+    try:
+        if operation.op == "stage":
+            if operation.stage is None:
+                raise ItemFailed(422, "stage needs a target stage")
+            return transition_stage(session, operation.id, operation.stage, operation.expected_stage, rollups=rollups)
+        values = {k: v for k, v in operation.data.items() if k not in PROTECTED_FIELDS and k in MaintenanceRequest.model_fields}
+        values = without_stage(session, operation.id, values)
+        db_request, old = versioned_update(session, MaintenanceRequest, operation.id, values, operation.version,
+                                           old_columns=ROLLUP_KEY_COLUMNS, label="Request")
+        rollups.move(row_rollup_key(old), row_rollup_key(db_request))
+        return db_request, None
+    except HTTPException as exc:
+        raise ItemFailed(exc.status_code, exc.detail)
+    except IntegrityError as exc:
+        raise ItemFailed(409, str(exc.orig))
+    except StatementError as exc:
+        raise ItemFailed(422 if isinstance(exc.orig, InvalidDate) else 400, str(exc.orig))
+
+
+def apply_bulk(session: Session, bulk: BulkRequest, role: str):
+    """
+    Apply `bulk` and commit what should be committed. Returns (committed,
+    results, published) where `published` lists (entity, action, row) change
+    events for the caller to send after the commit.
+    """
+    atomic = bulk.mode == "atomic"
+    results: List[Optional[dict]] = [None] * len(bulk.operations)
+    published = []
+    rollups = RollupBatch()
+
+    # Creates: validate everything first, then insert in one flush
+    creates = []
+    for index, operation in enumerate(bulk.operations):
+        if operation.op != "create":
+            continue
+        try:
+            creates.append((index, _validated(operation.data)))
+        except ItemFailed as exc:
+            results[index] = _failure(index, "create", exc.status, exc.error)
+    if atomic and any(results):
+        return False, _mark_skipped(bulk, results), []
+
+    if creates and not _insert_creates(session, creates, results, atomic, rollups, published):
+        return False, _mark_skipped(bulk, results), []
+
+    for index, operation in enumerate(bulk.operations):
+        if operation.op == "create":
+            continue
+        item_rollups = RollupBatch()
+        savepoint = None if atomic else session.begin_nested()
+        try:
+            db_request, equipment = _apply_change(session, operation, role, item_rollups)
+        except ItemFailed as exc:
+            results[index] = _failure(index, operation.op, exc.status, exc.error)
+            if atomic:
+                session.rollback()
+                return False, _mark_skipped(bulk, results), []
+            savepoint.rollback()
+            continue
+        if savepoint is not None:
+            savepoint.commit()
+        rollups.merge(item_rollups)
+        results[index] = {"index": index, "op": operation.op, "status": 200, "id": db_request["id"], "version": db_request["version"]}
+        published.append(("requests", "stage_changed" if operation.op == "stage" else "updated", db_request))
+        if equipment:
+            published.append(("equipment", "updated", equipment))
+
+    rollups.apply(session)
+    session.commit()
+    return True, results, published
+
+
+def _insert_creates(session: Session, creates, results, atomic: bool, rollups: RollupBatch, published) -> bool:
+    """
+    Insert all creates with one flush (batched INSERT ... RETURNING). If the
+    batch fails it is retried one row per savepoint so only the offending
+    rows are reported (409). In best-effort mode the other rows are kept;
+    in atomic mode everything is rolled back and False is returned.
+    """
+    def record(rows):
+        for index, request in rows:
+            row = request.model_dump()
+            rollups.move(None, rollup_key(request))
+            results[index] = {"index": index, "op": "create", "status": 201, "id": row["id"], "version": row["version"]}
+            published.append(("requests", "created", row))
+
+    savepoint = None if atomic else session.begin_nested()
+    try:
+        session.add_all([request for _, request in creates])
+        session.flush()
+    except StatementError as exc:
+        batch_error = str(exc.orig)
+        if atomic:
+            session.rollback()
+        else:
+            savepoint.rollback()
+    else:
+        if savepoint is not None:
+            savepoint.commit()
+        record(creates)
+        return True
+
+    failed = False
+    for index, request in creates:
+        request = MaintenanceRequest.model_validate(request.model_dump(exclude={"id"}))
+        savepoint = session.begin_nested()
+        try:
+            session.add(request)
+            session.flush()
+        except StatementError as exc:
+            savepoint.rollback()
+            results[index] = _failure(index, "create", 409, str(exc.orig))
+            failed = True
+            continue
+        if atomic:
+            # Only probing for the offending rows. Never release the
+            # savepoint: on pysqlite it can be the outermost transaction,
+            # and releasing it would commit the row
+            savepoint.rollback()
+        else:
+            savepoint.commit()
+            record([(index, request)])
+    if atomic:
+        session.rollback()
+        if not failed:
+            # Only the combination failed; no single row can be blamed
+            for index, _ in creates:
+                results[index] = _failure(index, "create", 409, batch_error)
+        return False
+    return True
+
+
+def _mark_skipped(bulk: BulkRequest, results):
+    """In a failed atomic batch, every item that did not fail itself was rolled back"""
+    return [
+        result if result is not None and "error" in result
+        else {"index": index, "op": operation.op, "status": 424, "error": "Rolled back"}
+        for index, (operation, result) in enumerate(zip(bulk.operations, results))
+    ]
@@ -0,0 +1,189 @@
+"""
+In-process cache for rarely-changing reference collections (teams,
+technicians, work centers, equipment categories).
+
+Entries expire after a TTL and are dropped explicitly by the write endpoints.
+Invalidations go through a pluggable bus: the default delivers them inside
+this process only; a multi-worker deployment can plug in a bus that also
+forwards them to the other workers.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "60"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+
+class InvalidationBus:
+    """Delivers invalidated keys to subscribers in this process"""
+
+    def __init__(self):
+        self._callbacks: List[Callable[[str], None]] = []
+
+    def subscribe(self, callback: Callable[[str], None]):
+        self._callbacks.append(callback)
+
+    def publish(self, key: str):
+        self._deliver(key)
+
+    def _deliver(self, key: str):
+        for callback in self._callbacks:
+            callback(key)
+
+
+class MultiprocessingInvalidationBus(InvalidationBus):
+    """
+    Broadcasts invalidations between processes. Each process owns one inbox
+    in `inboxes` (e.g. multiprocessing.Queue objects created before forking)
+    and is told its own position via `index`.
+    """
+
+    def __init__(self, inboxes: list, index: int):
+        super().__init__()
+        self.inboxes = inboxes
+        self.index = index
+        threading.Thread(target=self._listen, daemon=True).start()
+
+    def publish(self, key: str):
+        self._deliver(key)
+        for position, inbox in enumerate(self.inboxes):
+            if position != self.index:
+                inbox.put(key)
+
+    def _listen(self):
+        inbox = self.inboxes[self.index]
+        while True:
+            self._deliver(inbox.get())
+
+
+class ReferenceCache:
+    def __init__(self, ttl: float = REFERENCE_CACHE_TTL, bus: InvalidationBus = None):
+        self.ttl = ttl
+        self._entries: Dict[str, tuple] = {}
+        # Bumped on every invalidation so a load that raced with a write
+        # does not store its (possibly stale) result
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.bus = None
+        self.set_bus(bus or InvalidationBus())
+
+    def set_bus(self, bus: InvalidationBus):
+        self.bus = bus
+        bus.subscribe(self._drop)
+
+    def get_or_load(self, key: str, loader: Callable[[], object]):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generations.get(key, 0)
+
+        value = loader()
+
+        with self._lock:
+            if self._generations.get(key, 0) == generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def invalidate(self, key: str):
+        self.bus.publish(key)
+
+    def clear(self):
+        """Drop every entry in this process, e.g. to measure cold loads"""
+        with self._lock:
+            keys = list(self._entries)
+        for key in keys:
+            self._drop(key)
+
+    def _drop(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl,
+            }
+
+
+class TokenCache:
+    """
+    Bounded LRU of bearer token -> authenticated user. An entry lives for
+    at most `ttl` seconds and never past the token's own `exp`. All tokens
+    of a user are dropped when that user's role or password changes.
+    """
+
+    def __init__(self, maxsize: int = AUTH_CACHE_SIZE, ttl: float = AUTH_CACHE_TTL, bus: InvalidationBus = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_user: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bus = bus or InvalidationBus()
+        self.bus.subscribe(self._drop_user)
+
+    def get(self, token: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, token: str, user, username: str, token_expires_at: Optional[float]):
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            self._entries[token] = (expires_at, user, username)
+            self._entries.move_to_end(token)
+            self._tokens_by_user.setdefault(username, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, username: str):
+        self.bus.publish(username)
+
+    def _drop_user(self, username: str):
+        with self._lock:
+            for token in self._tokens_by_user.pop(username, set()):
+                self._entries.pop(token, None)
+
+    def _remove(self, token: str):
+        _, _, username = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[username]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "ttl_seconds": self.ttl}
+
+
+reference_cache = ReferenceCache()
+token_cache = TokenCache()
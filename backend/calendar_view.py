@@ -0,0 +1,52 @@
+"""
+Calendar data for a date range, grouped by day.
+"""
+from datetime import date
+from typing import Optional
+from sqlmodel import Session, select
+from models import Equipment, MaintenanceRequest, WorkCenter
+
+MAX_CALENDAR_DAYS = 62
+
+
+def calendar_events(session: Session, start: date, end: date, team_id: Optional[int] = None) -> dict:
+    """
+    Requests scheduled and equipment purchased in [start, end], using range
+    scans on the scheduled_date and purchase_date indexes.
+    """
+    request_query = (
+        select(
+            MaintenanceRequest.id,
+            MaintenanceRequest.subject,
+            MaintenanceRequest.type,
+            MaintenanceRequest.stage,
+            MaintenanceRequest.scheduled_date,
+            MaintenanceRequest.equipment_id,
+            MaintenanceRequest.work_center_id,
+            MaintenanceRequest.team_id,
+            Equipment.name.label("equipment_name"),
+            WorkCenter.name.label("work_center_name"),
+        )
+        .join(Equipment, MaintenanceRequest.equipment_id == Equipment.id, isouter=True)
+        .join(WorkCenter, MaintenanceRequest.work_center_id == WorkCenter.id, isouter=True)
+        .where(MaintenanceRequest.scheduled_date >= start, MaintenanceRequest.scheduled_date <= end)
+        .order_by(MaintenanceRequest.scheduled_date, MaintenanceRequest.id)
+    )
+    equipment_query = (
+        select(Equipment.id, Equipment.name, Equipment.purchase_date, Equipment.team_id)
+        .where(Equipment.purchase_date >= start, Equipment.purchase_date <= end)
+        .order_by(Equipment.purchase_date, Equipment.id)
+    )
+    if team_id is not None:
+        request_query = request_query.where(MaintenanceRequest.team_id == team_id)
+        equipment_query = equipment_query.where(Equipment.team_id == team_id)
+
+    days = {}
+    for row in session.exec(request_query).all():
+        day = days.setdefault(row.scheduled_date, {"date": row.scheduled_date, "requests": [], "equipment": []})
+        day["requests"].append(dict(row._mapping))
+    for row in session.exec(equipment_query).all():
+        day = days.setdefault(row.purchase_date, {"date": row.purchase_date, "requests": [], "equipment": []})
+        day["equipment"].append(dict(row._mapping))
+
+    return {"from": start, "to": end, "team_id": team_id, "days": [days[key] for key in sorted(days)]}
@@ -0,0 +1,112 @@
+"""
+Check that the read endpoints stay within their SQL statement budgets.
+
+Runs each endpoint in-process against the configured DATABASE_URL and fails
+if it issues more statements than allowed, listing what it ran. A budget
+that starts failing usually means a lazy-loaded relationship (N+1) or a
+per-row lookup crept into the handler.
+
+Budgets only mean something with data, so first every board stage gets at
+least one request: missing ones are created on a dedicated asset
+(serial QUERY-BUDGET-CHECK) and moved with the normal stage transition, so
+rollups and statuses stay consistent. Run it against a development or CI
+database.
+
+Usage: python check_query_budgets.py
+"""
+import sys
+from datetime import date
+from fastapi.testclient import TestClient
+from sqlmodel import Session, func, select
+from board import STAGES
+from cache import reference_cache
+from database import engine
+from main import app
+from models import Equipment, MaintenanceRequest
+from querylog import assert_max_queries
+from rollups import move_in_rollup, rollup_key
+from transitions import transition_stage
+
+CHECK_SERIAL = "QUERY-BUDGET-CHECK"
+
+# (method, path, request kwargs, max statements), measured on PostgreSQL and
+# SQLite with requests in every stage; the reference cache is emptied before
+# each call, so cached lists are counted with their load
+QUERY_BUDGETS = [
+    ("GET", "/api/bootstrap", {}, 7),
+    ("GET", "/api/teams", {}, 1),
+    ("GET", "/api/technicians", {}, 1),
+    ("GET", "/api/technicians/workload", {}, 1),
+    ("GET", "/api/equipment-categories", {}, 1),
+    ("GET", "/api/work-centers", {}, 1),
+    ("GET", "/api/equipment", {}, 1),
+    ("GET", "/api/equipment/autocomplete?q=a", {}, 1),
+    ("POST", "/api/equipment/lookup", {"json": {"serials": ["MT/125/222"], "ids": [1, 2]}}, 1),
+    ("GET", "/api/requests", {}, 1),
+    # Stage counts, then the first cards of each column
+    ("GET", "/api/requests/board", {}, 1 + len(STAGES)),
+    ("GET", "/api/calendar?from=2024-01-01&to=2024-01-31", {}, 2),
+    ("GET", "/api/search?q=pump", {}, 2),
+    ("GET", "/api/reports/matrix", {}, 1),
+    ("GET", "/api/reports/summary", {}, 1),
+]
+
+def seed_every_stage(session: Session):
+    """Create a request in each stage that has none"""
+    counts = dict(session.exec(select(MaintenanceRequest.stage, func.count(MaintenanceRequest.id)).group_by(MaintenanceRequest.stage)).all())
+    missing = [stage for stage in STAGES if not counts.get(stage)]
+    if not missing:
+        return
+    equipment = session.exec(select(Equipment).where(Equipment.serial_number == CHECK_SERIAL)).first()
+    if equipment is None:
+        equipment = Equipment(
+            name="Query budget check", serial_number=CHECK_SERIAL, purchase_date=date.today(), location="-",
+            department="-", employee="-",
+        )
+        session.add(equipment)
+        session.flush()
+    for stage in missing:
+        request = MaintenanceRequest(subject=f"Query budget check ({stage})", type="Corrective", equipment_id=equipment.id,
+                                     scheduled_date=date.today())
+        session.add(request)
+        move_in_rollup(session, None, rollup_key(request))
+        session.flush()
+        if stage != "New":
+            transition_stage(session, request.id, stage)
+        print(f"  added a request in {stage}")
+    session.commit()
+
+def check_query_budgets():
+    print("=" * 60)
+    print("Checking SQL statement budgets")
+    print("=" * 60)
+
+    failures = 0
+    with TestClient(app) as client:
+        with Session(engine) as session:
+            seed_every_stage(session)
+        for method, path, kwargs, budget in QUERY_BUDGETS:
+            reference_cache.clear()
+            try:
+                with assert_max_queries(engine, budget, f"{method} {path}") as counter:
+                    response = client.request(method, path, **kwargs)
+            except AssertionError as exc:
+                failures += 1
+                print(f"✗ {exc}")
+                continue
+            if response.status_code >= 400:
+                failures += 1
+                print(f"✗ {method} {path} returned {response.status_code}")
+                continue
+            print(f"✓ {method} {path}: {counter.count}/{budget}")
+
+    print("\n" + "=" * 60)
+    if failures:
+        print(f"✗ {failures} endpoint(s) over budget or failing")
+        print("=" * 60)
+        sys.exit(1)
+    print("✓ All endpoints within budget")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    check_query_budgets()
@@ -0,0 +1,327 @@
+"""
+Streaming equipment import from CSV or NDJSON, upserting on serial_number.
+
+Records are parsed one at a time, validated against the Equipment model and
+written in batches, so memory stays bounded by the batch size whatever the
+size of the file. Each batch is upserted with the database's bulk path:
+COPY into a temp table followed by INSERT ... ON CONFLICT on PostgreSQL, an
+executemany upsert elsewhere. Every batch commits on its own; re-running an
+import is safe because rows are matched on serial_number.
+
+Only the columns a row actually provides are written: a blank CSV cell, or
+a missing or null NDJSON key, keeps the stored value. So a row for a serial
+that already exists may carry any subset of the columns (e.g. just
+serial_number,health) and is validated field by field; a new serial needs
+every required column, and model defaults fill the rest. Existing serials
+are updated and new ones inserted (still ON CONFLICT, in case another import
+adds them first); rows of a batch that provide the same set of columns share
+one statement.
+"""
+import csv
+import io
+import json
+import time
+from datetime import date, datetime
+from typing import IO, Iterator, List, Optional, Tuple
+import anyio.from_thread
+from pydantic import ValidationError, create_model
+from pydantic.fields import FieldInfo
+from sqlalchemy import bindparam, insert, text, update
+from sqlmodel import Session, select
+from models import Equipment, EquipmentCategory, Team, Technician
+
+IMPORT_FORMATS = ("csv", "ndjson")
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+# Everything but the bookkeeping columns can come from a file
+IMPORT_COLUMNS = [column.name for column in Equipment.__table__.columns if column.name not in ("id", "version", "updated_at")]
+REFERENCE_COLUMNS = {"team_id": Team, "technician_id": Technician, "category_id": EquipmentCategory}
+# Plain pydantic model with Equipment's field definitions: same validation,
+# without building an instrumented ORM object per row
+EquipmentRow = create_model(
+    "EquipmentRow",
+    **{name: (field.annotation, field) for name, field in Equipment.model_fields.items() if name in IMPORT_COLUMNS},
+)
+# The same fields, all optional, for rows that update an existing serial
+EquipmentPatch = create_model(
+    "EquipmentPatch",
+    **{name: (Optional[field.annotation], FieldInfo.merge_field_infos(field, default=None))
+       for name, field in Equipment.model_fields.items() if name in IMPORT_COLUMNS},
+)
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.rejected = 0
+        self.errors: List[dict] = []
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def reject(self, line: int, error):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def finish(self) -> dict:
+        self.seconds = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows / self.seconds, 1) if self.seconds else None,
+        }
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[Tuple[int, dict]]:
+    """Parse `stream` lazily into (line number, raw record) pairs"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+
+        def csv_records():
+            for record in reader:
+                # Blank cells mean "not provided": NULL for new rows, unchanged for existing ones
+                yield reader.line_num, {key: value for key, value in record.items() if key and value != ""}
+        return csv_records()
+
+    def ndjson_records():
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield line_number, exc
+                continue
+            if isinstance(record, dict):
+                record = {key: value for key, value in record.items() if value is not None}
+            yield line_number, record
+    return ndjson_records()
+
+
+def provided_columns(record: dict) -> frozenset:
+    return frozenset(key for key in record if key in IMPORT_COLUMNS)
+
+
+def _validated_row(record, reference_ids: dict, model=EquipmentRow) -> dict:
+    if isinstance(record, Exception):
+        raise ValueError(f"Invalid JSON: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("Each record must be an object")
+    row = model.model_validate(record).model_dump()
+    if not row["serial_number"]:
+        raise ValueError("serial_number is required")
+    for column, ids in reference_ids.items():
+        if row[column] is not None and row[column] not in ids:
+            raise ValueError(f"{column} {row[column]} does not exist")
+    return row
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _copy_upsert(session: Session, groups: List[Tuple[Tuple[bool, frozenset], List[dict]]]):
+    """
+    PostgreSQL: COPY the whole batch into a temp table, tagged with its
+    group, then per group of provided columns one UPDATE ... FROM for
+    existing serials or one INSERT ... ON CONFLICT for new ones
+    """
+    session.execute(text(
+        "CREATE TEMP TABLE IF NOT EXISTS equipment_import ON COMMIT DELETE ROWS AS "
+        f"SELECT {', '.join(IMPORT_COLUMNS)}, 0 AS import_group FROM equipment WITH NO DATA"
+    ))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for group, (_, rows) in enumerate(groups):
+        for row in rows:
+            writer.writerow([_copy_value(row[column]) for column in IMPORT_COLUMNS] + [group])
+    buffer.seek(0)
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY equipment_import ({', '.join(IMPORT_COLUMNS)}, import_group) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+        )
+    finally:
+        cursor.close()
+
+    now = datetime.utcnow()
+    for group, ((existing, update_columns), _) in enumerate(groups):
+        if existing:
+            # Not an upsert: the omitted columns are NULL here, and INSERT
+            # checks NOT NULL before it looks for a conflict
+            assignments = [f"{column} = source.{column}" for column in sorted(update_columns) if column != "serial_number"]
+            session.execute(text(
+                f"UPDATE equipment SET {', '.join(assignments + ['version = equipment.version + 1', 'updated_at = :now'])} "
+                f"FROM equipment_import AS source "
+                f"WHERE source.import_group = :group AND equipment.serial_number = source.serial_number"
+            ), {"now": now, "group": group})
+            continue
+        assignments = [f"{column} = EXCLUDED.{column}" for column in sorted(update_columns) if column != "serial_number"]
+        assignments += ["version = equipment.version + 1", "updated_at = EXCLUDED.updated_at"]
+        session.execute(text(
+            f"INSERT INTO equipment ({', '.join(IMPORT_COLUMNS)}, version, updated_at) "
+            f"SELECT {', '.join(IMPORT_COLUMNS)}, 1, :now FROM equipment_import WHERE import_group = :group "
+            f"ON CONFLICT (serial_number) DO UPDATE SET {', '.join(assignments)}"
+        ), {"now": now, "group": group})
+
+
+def _executemany_upsert(session: Session, groups: List[Tuple[Tuple[bool, frozenset], List[dict]]]):
+    """
+    Other databases: per group, an executemany UPDATE for existing serials,
+    or an executemany upsert (update/insert without one) for new ones
+    """
+    for (existing, update_columns), rows in groups:
+        if existing:
+            _executemany_update_group(session, rows, sorted(update_columns))
+        else:
+            _executemany_upsert_group(session, rows, sorted(update_columns))
+
+
+def _executemany_update_group(session: Session, rows: List[dict], update_columns: List[str]):
+    table = Equipment.__table__
+    changes = [column for column in update_columns if column != "serial_number"]
+    session.execute(
+        update(table).where(table.c.serial_number == bindparam("match_serial"))
+        .values(version=table.c.version + 1, updated_at=datetime.utcnow()),
+        [{**{column: row[column] for column in changes}, "match_serial": row["serial_number"]} for row in rows],
+    )
+
+
+def _executemany_upsert_group(session: Session, rows: List[dict], update_columns: List[str]):
+    now = datetime.utcnow()
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        statement = sqlite_insert(Equipment)
+        changes = {column: statement.excluded[column] for column in update_columns if column != "serial_number"}
+        statement = statement.on_conflict_do_update(
+            index_elements=["serial_number"],
+            set_={**changes, "version": Equipment.version + 1, "updated_at": statement.excluded.updated_at},
+        )
+        session.execute(statement, [{**row, "version": 1, "updated_at": now} for row in rows])
+        return
+
+    existing = dict(session.exec(
+        select(Equipment.serial_number, Equipment.id).where(Equipment.serial_number.in_([row["serial_number"] for row in rows]))
+    ).all())
+    updates = [{**{column: row[column] for column in update_columns}, "row_id": existing[row["serial_number"]]}
+               for row in rows if row["serial_number"] in existing]
+    inserts = [{**row, "version": 1, "updated_at": now} for row in rows if row["serial_number"] not in existing]
+    if updates:
+        session.execute(
+            update(Equipment.__table__).where(Equipment.__table__.c.id == bindparam("row_id"))
+            .values(version=Equipment.__table__.c.version + 1, updated_at=now),
+            updates,
+        )
+    if inserts:
+        session.execute(insert(Equipment.__table__), inserts)
+
+
+def import_equipment(session: Session, stream: IO[str], fmt: str = "csv", batch_size: int = DEFAULT_BATCH_SIZE,
+                     on_batch=None) -> dict:
+    """
+    Import equipment records from `stream` and return a report with row
+    counts, the first rejected rows and the throughput. `on_batch(report)` is
+    called after every committed batch.
+    """
+    report = ImportReport()
+    records = read_records(stream, fmt)
+    reference_ids = {column: set(session.exec(select(model.id)).all()) for column, model in REFERENCE_COLUMNS.items()}
+    upsert = _copy_upsert if session.get_bind().dialect.name == "postgresql" else _executemany_upsert
+
+    # serial_number -> (line, raw record, row validated as a patch)
+    batch = {}
+
+    def validated(line: int, record, model) -> Optional[dict]:
+        try:
+            return _validated_row(record, reference_ids, model)
+        except ValidationError as exc:
+            report.reject(line, exc.errors(include_url=False, include_context=False, include_input=False))
+        except ValueError as exc:
+            report.reject(line, str(exc))
+        return None
+
+    def write_batch():
+        if not batch:
+            return
+        existing = set(session.exec(select(Equipment.serial_number).where(Equipment.serial_number.in_(list(batch)))).all())
+        groups = {}
+        batch_lines = []
+        for serial, (line, record, row) in batch.items():
+            # New serials need every required column
+            if serial not in existing:
+                row = validated(line, record, EquipmentRow)
+                if row is None:
+                    continue
+            groups.setdefault((serial in existing, provided_columns(record)), []).append(row)
+            batch_lines.append(line)
+        batch.clear()
+        if groups:
+            try:
+                upsert(session, list(groups.items()))
+                session.commit()
+                report.imported += len(batch_lines)
+            except Exception as exc:
+                session.rollback()
+                error = str(getattr(exc, "orig", exc)).splitlines()[0]
+                for line in batch_lines:
+                    report.reject(line, f"Batch failed: {error}")
+        if on_batch:
+            on_batch(report)
+
+    for line, record in records:
+        report.rows += 1
+        row = validated(line, record, EquipmentPatch)
+        if row is None:
+            continue
+        # A later row for the same serial wins; one statement cannot upsert a key twice
+        batch[row["serial_number"]] = (line, record, row)
+        if len(batch) >= batch_size:
+            write_batch()
+    write_batch()
+    return report.finish()
+
+
+class RequestBodyReader(io.RawIOBase):
+    """
+    Blocking file object over an ASGI request body, for use from a worker
+    thread: each read pulls the next chunk from the event loop. Lets the sync
+    importer stream an upload without buffering it.
+    """
+
+    def __init__(self, request):
+        self._chunks = request.stream().__aiter__()
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def _next_chunk(self) -> Optional[bytes]:
+        try:
+            return anyio.from_thread.run(self._chunks.__anext__)
+        except StopAsyncIteration:
+            return None
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = self._next_chunk()
+            if chunk is None:
+                return 0
+            self._pending = chunk
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def text_stream(raw: IO[bytes]) -> IO[str]:
+    return io.TextIOWrapper(io.BufferedReader(raw), encoding="utf-8-sig", newline="")
@@ -0,0 +1,107 @@
+"""
+In-process change feed pushed to clients over Server-Sent Events.
+
+Handlers publish one event per committed write; every connected client gets
+it from a bounded per-subscriber queue, so N open boards cost one DB write
+instead of N full reloads. A subscriber that falls behind does not slow the
+publishers: its backlog is dropped and it receives a single "resync" event,
+after which the client catches up with /api/sync.
+
+Fan-out is per process. With several workers, each worker only reaches the
+clients connected to it.
+"""
+import asyncio
+import json
+from typing import Optional
+from fastapi.encoders import jsonable_encoder
+
+SUBSCRIBER_QUEUE_SIZE = 256
+MAX_SUBSCRIBERS = 1000
+HEARTBEAT_SECONDS = 15
+
+RESYNC = {"action": "resync"}
+
+
+class ChangeFeed:
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE, max_subscribers: int = MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.overflows = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Optional[asyncio.Queue]:
+        """Register a subscriber; must be called on the event loop. Returns None when full."""
+        if len(self._subscribers) >= self.max_subscribers:
+            return None
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, entity: str, action: str, row=None, row_id: Optional[int] = None):
+        """
+        Broadcast a change. Safe to call from the threadpool that runs the sync
+        handlers: the row is serialized here and fan-out is scheduled on the loop.
+        """
+        if self._loop is None or not self._subscribers:
+            return
+        data = jsonable_encoder(row) if row is not None else None
+        event = {"entity": entity, "action": action, "id": row_id if row_id is not None else data["id"], "data": data}
+        self.published += 1
+        try:
+            self._loop.call_soon_threadsafe(self._fan_out, event)
+        except RuntimeError:
+            # Loop already closed (shutdown)
+            pass
+
+    def publish_resync(self):
+        """Tell every client to catch up with /api/sync, for writes too large to send row by row"""
+        if self._loop is None or not self._subscribers:
+            return
+        self.published += 1
+        try:
+            self._loop.call_soon_threadsafe(self._fan_out, RESYNC)
+        except RuntimeError:
+            pass
+
+    def _fan_out(self, event: dict):
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: replace its backlog with one resync marker
+                self.overflows += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+
+def format_sse(event: dict) -> str:
+    return f"event: change\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+async def event_stream(feed: ChangeFeed, queue: asyncio.Queue, is_disconnected):
+    """Yield SSE frames from `queue` until the client goes away, with periodic heartbeats"""
+    try:
+        yield "retry: 3000\n\n"
+        while not await is_disconnected():
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        feed.unsubscribe(queue)
+
+
+change_feed = ChangeFeed()
@@ -0,0 +1,131 @@
+"""
+Streaming exports of list queries as CSV, NDJSON or Parquet.
+
+Rows are read through a server-side cursor (`yield_per`) and each chunk is
+encoded and sent before the next one is fetched, so memory stays flat no
+matter how many rows match. Parquet needs the optional pyarrow package.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Iterator, List
+from fastapi import HTTPException
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, TypeDecorator
+from sqlmodel import Session
+from database import engine
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_CHUNK_ROWS = 5000
+
+
+def check_format(fmt: str):
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed on the server")
+
+
+def _chunks(query) -> Iterator[list]:
+    """
+    Run `query` in its own session (the request's session is closed before
+    a streamed body is sent) and yield lists of row tuples.
+    """
+    with Session(engine) as session:
+        result = session.execute(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        for partition in result.partitions():
+            yield partition
+
+
+def _csv_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _csv(columns: List, query) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in columns])
+    for rows in _chunks(query):
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _ndjson(columns: List, query) -> Iterator[bytes]:
+    names = [column.name for column in columns]
+    for rows in _chunks(query):
+        yield "".join(json.dumps(dict(zip(names, row)), default=_json_default) + "\n" for row in rows).encode()
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink that hands over whatever the Parquet writer produced so far"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _parquet(columns: List, query) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def arrow_type(column):
+        sql_type = column.type
+        if isinstance(sql_type, TypeDecorator):
+            sql_type = sql_type.impl_instance
+        for sql_class, arrow in ((DateTime, pa.timestamp("us")), (Date, pa.date32()), (Boolean, pa.bool_()),
+                                 (Integer, pa.int64()), (Float, pa.float64())):
+            if isinstance(sql_type, sql_class):
+                return arrow
+        return pa.string()
+
+    schema = pa.schema([pa.field(column.name, arrow_type(column)) for column in columns])
+    sink = _Drain()
+    # One row group per fetched chunk; the footer is written on close
+    with pq.ParquetWriter(sink, schema) as writer:
+        for rows in _chunks(query):
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)], schema=schema
+            ))
+            yield sink.take()
+    yield sink.take()
+
+
+def export_rows(fmt: str, columns: List, query) -> Iterator[bytes]:
+    """Body iterator for a StreamingResponse exporting `query` (which selects `columns`)"""
+    encoder = {"csv": _csv, "ndjson": _ndjson, "parquet": _parquet}[fmt]
+    return encoder(columns, query)
@@ -0,0 +1,125 @@
+"""
+Query-string filters and keyset pagination shared by the list endpoints.
+"""
+from datetime import date
+from typing import List, Optional
+from fastapi import HTTPException, Query, Response
+from sqlmodel import Session
+from models import Equipment, MaintenanceRequest
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class RequestFilters:
+    """Filters for MaintenanceRequest lists, pushed down into the SQL WHERE clause"""
+
+    def __init__(
+        self,
+        stage: Optional[str] = None,
+        type: Optional[str] = None,
+        team_id: Optional[int] = None,
+        technician_id: Optional[int] = None,
+        equipment_id: Optional[int] = None,
+        priority: Optional[str] = None,
+        company: Optional[str] = None,
+        scheduled_from: Optional[date] = None,
+        scheduled_to: Optional[date] = None,
+    ):
+        self.stage = stage
+        self.type = type
+        self.team_id = team_id
+        self.technician_id = technician_id
+        self.equipment_id = equipment_id
+        self.priority = priority
+        self.company = company
+        self.scheduled_from = scheduled_from
+        self.scheduled_to = scheduled_to
+
+    def apply(self, query):
+        for column in ("stage", "type", "team_id", "technician_id", "equipment_id", "priority", "company"):
+            value = getattr(self, column)
+            if value is not None:
+                query = query.where(getattr(MaintenanceRequest, column) == value)
+        if self.scheduled_from is not None:
+            query = query.where(MaintenanceRequest.scheduled_date >= self.scheduled_from)
+        if self.scheduled_to is not None:
+            query = query.where(MaintenanceRequest.scheduled_date <= self.scheduled_to)
+        return query
+
+
+class EquipmentFilters:
+    """Filters for Equipment lists, pushed down into the SQL WHERE clause"""
+
+    def __init__(
+        self,
+        status: Optional[str] = None,
+        department: Optional[str] = None,
+        team_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        company: Optional[str] = None,
+        min_health: Optional[int] = Query(None, ge=0, le=100),
+        max_health: Optional[int] = Query(None, ge=0, le=100),
+    ):
+        self.status = status
+        self.department = department
+        self.team_id = team_id
+        self.category_id = category_id
+        self.company = company
+        self.min_health = min_health
+        self.max_health = max_health
+
+    def apply(self, query):
+        for column in ("status", "department", "team_id", "category_id", "company"):
+            value = getattr(self, column)
+            if value is not None:
+                query = query.where(getattr(Equipment, column) == value)
+        if self.min_health is not None:
+            query = query.where(Equipment.health >= self.min_health)
+        if self.max_health is not None:
+            query = query.where(Equipment.health <= self.max_health)
+        return query
+
+
+def projection(model, fields: Optional[str]) -> List:
+    """
+    Resolve a comma-separated `fields=` value to columns of `model`.
+    `id` is always included since keyset pagination needs it.
+    """
+    table_columns = model.__table__.columns
+    if not fields:
+        return list(table_columns)
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in table_columns]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if "id" not in names:
+        names.insert(0, "id")
+    return [table_columns[name] for name in dict.fromkeys(names)]
+
+
+class PageParams:
+    """Keyset pagination parameters: return rows with id > cursor, ordered by id"""
+
+    def __init__(
+        self,
+        cursor: Optional[int] = Query(None, description="id of the last row of the previous page"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def keyset_page(session: Session, query, id_column, page: PageParams, response: Response):
+    """
+    Run `query` as one keyset page ordered by `id_column`.
+    Fetches one extra row to know whether another page exists; if it does,
+    the id to pass as the next `cursor` is returned in the X-Next-Cursor header.
+    """
+    if page.cursor is not None:
+        query = query.where(id_column > page.cursor)
+    rows = session.exec(query.order_by(id_column).limit(page.limit + 1)).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return rows
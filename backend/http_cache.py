@@ -0,0 +1,47 @@
+"""
+Helpers for conditional GET (ETag / If-None-Match) on JSON payloads.
+"""
+import hashlib
+import json
+from typing import Optional
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def etag_for_version(*parts) -> str:
+    """ETag from a data version (e.g. a sync token) and the query parameters, known before loading anything"""
+    return etag_for("|".join(str(part) for part in parts).encode())
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates or "*" in candidates
+
+
+def _headers(etag: str, headers: Optional[dict]) -> dict:
+    return {"ETag": etag, "Cache-Control": "no-cache", **(headers or {})}
+
+
+def not_modified(request: Request, etag: str, headers: dict = None) -> Optional[Response]:
+    """A 304 response if the client already holds `etag`, else None"""
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=_headers(etag, headers))
+    return None
+
+
+def conditional_json(request: Request, payload, headers: dict = None, etag: str = None) -> Response:
+    """
+    Serialize `payload` once and answer with 304 Not Modified if the client
+    already holds the same representation, otherwise 200 with an ETag.
+    Without an `etag` from the caller, it is a hash of the body.
+    """
+    body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+    etag = etag or etag_for(body)
+    return not_modified(request, etag, headers) or Response(content=body, media_type="application/json", headers=_headers(etag, headers))
@@ -0,0 +1,45 @@
+"""
+Import an equipment register from a CSV or NDJSON file, upserting on serial_number.
+
+Usage:
+    python import_equipment.py assets.csv
+    python import_equipment.py assets.ndjson --batch-size 5000
+    python import_equipment.py - --format ndjson < assets.ndjson
+"""
+import argparse
+import sys
+from sqlmodel import Session, SQLModel
+from database import engine
+from equipment_import import DEFAULT_BATCH_SIZE, IMPORT_FORMATS, import_equipment
+import models  # noqa: F401 - registers the tables on SQLModel.metadata
+
+def main():
+    parser = argparse.ArgumentParser(description="Import equipment from CSV or NDJSON")
+    parser.add_argument("path", help="file to import, or - for stdin")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="defaults from the file extension")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    SQLModel.metadata.create_all(engine)
+
+    print("=" * 60)
+    print(f"Importing equipment from {args.path} ({fmt})")
+    print("=" * 60)
+
+    def progress(report):
+        print(f"  {report.rows} rows read, {report.imported} imported, {report.rejected} rejected")
+
+    stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8-sig", newline="")
+    with stream, Session(engine) as session:
+        report = import_equipment(session, stream, fmt, args.batch_size, on_batch=progress)
+
+    for error in report["errors"]:
+        print(f"  ✗ line {error['line']}: {error['error']}")
+    print(f"\n✓ Imported {report['imported']} of {report['rows']} rows in {report['seconds']}s "
+          f"({report['rows_per_second']} rows/s)")
+    if report["rejected"]:
+        print(f"✗ {report['rejected']} rows rejected")
+    return 1 if report["rejected"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
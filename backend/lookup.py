@@ -0,0 +1,90 @@
+"""
+Batch equipment lookup for scanning sessions.
+
+A whole batch of scanned serial numbers and/or ids is resolved with a single
+statement: the assets are matched with IN (...) on the unique serial_number
+index (or the primary key), and each one is joined to its latest open request
+(New or In Progress), ranked per asset with ROW_NUMBER over the
+(equipment_id, id) index.
+"""
+import os
+from typing import List
+from pydantic import BaseModel, Field, model_validator
+from sqlalchemy import func, or_
+from sqlmodel import Session, select
+from models import Equipment, MaintenanceRequest
+
+LOOKUP_MAX_ITEMS = int(os.getenv("LOOKUP_MAX_ITEMS", "1000"))
+OPEN_STAGES = ("New", "In Progress")
+
+
+class LookupRequest(BaseModel):
+    serials: List[str] = Field(default=[], max_length=LOOKUP_MAX_ITEMS)
+    ids: List[int] = Field(default=[], max_length=LOOKUP_MAX_ITEMS)
+
+    @model_validator(mode="after")
+    def clean(self):
+        # Scanners add stray whitespace and repeat scans; keep the first of each
+        self.serials = list(dict.fromkeys(serial.strip() for serial in self.serials if serial.strip()))
+        self.ids = list(dict.fromkeys(self.ids))
+        if not self.serials and not self.ids:
+            raise ValueError("Provide at least one serial number or id")
+        if len(self.serials) + len(self.ids) > LOOKUP_MAX_ITEMS:
+            raise ValueError(f"At most {LOOKUP_MAX_ITEMS} serial numbers and ids per lookup")
+        return self
+
+
+def lookup_equipment(session: Session, lookup: LookupRequest) -> dict:
+    """
+    Returns {"found": [...], "missing": {"serials": [...], "ids": [...]}}.
+    Found assets keep the order they were asked for and carry
+    `open_request` (or None).
+    """
+    conditions = []
+    if lookup.serials:
+        conditions.append(Equipment.serial_number.in_(lookup.serials))
+    if lookup.ids:
+        conditions.append(Equipment.id.in_(lookup.ids))
+    matched = or_(*conditions)
+
+    request_columns = MaintenanceRequest.__table__.columns
+    ranked = (
+        select(
+            *request_columns,
+            func.row_number().over(partition_by=MaintenanceRequest.equipment_id, order_by=MaintenanceRequest.id.desc()).label("position"),
+        )
+        .where(
+            MaintenanceRequest.equipment_id.in_(select(Equipment.id).where(matched)),
+            MaintenanceRequest.stage.in_(OPEN_STAGES),
+        )
+        .subquery()
+    )
+    equipment_columns = Equipment.__table__.columns
+    query = (
+        select(*equipment_columns, *(ranked.c[column.name].label(f"request_{column.name}") for column in request_columns))
+        .outerjoin(ranked, (ranked.c.equipment_id == Equipment.id) & (ranked.c.position == 1))
+        .where(matched)
+    )
+
+    by_serial, by_id = {}, {}
+    for row in session.execute(query).mappings():
+        item = {column.name: row[column.name] for column in equipment_columns}
+        item["open_request"] = (
+            {column.name: row[f"request_{column.name}"] for column in request_columns}
+            if row["request_id"] is not None else None
+        )
+        by_serial[item["serial_number"]] = item
+        by_id[item["id"]] = item
+
+    found, seen = [], set()
+    for item in [by_serial.get(serial) for serial in lookup.serials] + [by_id.get(row_id) for row_id in lookup.ids]:
+        if item is not None and item["id"] not in seen:
+            seen.add(item["id"])
+            found.append(item)
+    return {
+        "found": found,
+        "missing": {
+            "serials": [serial for serial in lookup.serials if serial not in by_serial],
+            "ids": [row_id for row_id in lookup.ids if row_id not in by_id],
+        },
+    }
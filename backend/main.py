@@ -1,13 +1,35 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError, StatementError
+from starlette.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel import Session, SQLModel, create_engine, select
-from typing import List
-from models import Team, Technician, Equipment, MaintenanceRequest, User, WorkCenter, EquipmentCategory
-from auth import get_password_hash, verify_password, create_access_token, get_current_user, generate_reset_token, send_reset_email
+from typing import List, Optional
+from models import Team, Technician, Equipment, MaintenanceRequest, User, WorkCenter, EquipmentCategory, InvalidDate
+from auth import get_password_hash, get_password_hash_async, verify_and_update_password_async, create_access_token, get_current_user, generate_reset_token, send_reset_email
 from database import get_session, create_db_and_tables, engine
+from filters import RequestFilters, EquipmentFilters, PageParams, keyset_page, projection
+from http_cache import conditional_json, etag_for_version, not_modified
+from sync import SYNC_OVERLAP, changes_since, current_token, decode_token, prune_tombstones
+from events import change_feed, event_stream
+from cache import reference_cache, token_cache
+from transitions import transition_stage, without_stage
+from bulk import BulkRequest, apply_bulk
+from versioning import changed_fields, if_match_version, version_etag, versioned_update
+from equipment_import import DEFAULT_BATCH_SIZE, IMPORT_FORMATS, RequestBodyReader, import_equipment, text_stream
+from exports import EXPORT_FORMATS, check_format, export_rows
+from search import MAX_SEARCH_OFFSET, SEARCH_TARGETS, detect_search_indexes, search
+from autocomplete import equipment_index
+from lookup import LookupRequest, lookup_equipment
+from metrics import METRICS_ENABLED, PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, instrument_engine, render_metrics
+from board import BOARD_SORTS, STAGES, board, column_cards, column_count
+from calendar_view import MAX_CALENDAR_DAYS, calendar_events
+from reports import WORKLOAD_ORDERINGS, request_matrix, technician_workload
+from rollups import GROUP_COLUMNS, ROLLUP_KEY_COLUMNS, rollup_key, row_rollup_key, move_in_rollup, rollup_summary
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pydantic import BaseModel
 
 # Database Setup handled in database.py
@@ -20,12 +42,36 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Latency, SQL and pool metrics for every request, scraped from /metrics
+if METRICS_ENABLED:
+    instrument_engine(engine)
+    app.add_middleware(MetricsMiddleware)
+
+# Date columns parse request strings at flush time; report bad dates as a client error
+@app.exception_handler(InvalidDate)
+async def invalid_date_handler(request: Request, exc: InvalidDate):
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
+@app.exception_handler(StatementError)
+async def statement_error_handler(request: Request, exc: StatementError):
+    if isinstance(exc.orig, InvalidDate):
+        return JSONResponse(status_code=422, content={"detail": str(exc.orig)})
+    raise exc
+
+@app.exception_handler(IntegrityError)
+async def integrity_error_handler(request: Request, exc: IntegrityError):
+    # e.g. a duplicate serial number
+    return JSONResponse(status_code=409, content={"detail": str(exc.orig).splitlines()[0]})
+
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
+    detect_search_indexes(engine)
     with Session(engine) as session:
+        prune_tombstones(session)
         if session.exec(select(Team)).first() is None:
             seed_data(session)
         if session.exec(select(User)).first() is None:
@@ -97,14 +143,15 @@ def seed_data(session: Session):
 # --- Auth Endpoints ---
 
 @app.post("/api/auth/register", response_model=User)
-def register(user: User, session: Session = Depends(get_session)):
+async def register(user: User, session: Session = Depends(get_session)):
+    # Database calls run in the threadpool; hashing runs in the bounded hashing pool
     # Check if username exists
-    existing_username = session.exec(select(User).where(User.username == user.username)).first()
+    existing_username = await run_in_threadpool(lambda: session.exec(select(User).where(User.username == user.username)).first())
     if existing_username:
         raise HTTPException(status_code=400, detail="Username already registered")
     
     # Check if email exists (duplicate check)
-    existing_email = session.exec(select(User).where(User.email == user.email)).first()
+    existing_email = await run_in_threadpool(lambda: session.exec(select(User).where(User.email == user.email)).first())
     if existing_email:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -141,16 +188,16 @@ def register(user: User, session: Session = Depends(get_session)):
         )
     
     # Hash the password after validation
-    user.hashed_password = get_password_hash(password)
+    user.hashed_password = await get_password_hash_async(password)
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await run_in_threadpool(session.commit)
+    await run_in_threadpool(session.refresh, user)
     return user
 
 @app.post("/api/auth/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
     # Check if user exists
-    user = session.exec(select(User).where(User.email == form_data.username)).first()
+    user = await run_in_threadpool(lambda: session.exec(select(User).where(User.email == form_data.username)).first())
     
     if not user:
         raise HTTPException(
@@ -160,7 +207,8 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = D
         )
     
     # Verify password
-    if not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = await verify_and_update_password_async(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid Password",
@@ -168,7 +216,15 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = D
         )
     
     access_token = create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer", "username": user.username, "role": user.role}
+    result = {"access_token": access_token, "token_type": "bearer", "username": user.username, "role": user.role}
+    
+    # Transparently upgrade hashes made with an outdated cost setting
+    if new_hash:
+        user.hashed_password = new_hash
+        session.add(user)
+        await run_in_threadpool(session.commit)
+    
+    return result
 
 @app.get("/api/auth/me")
 def read_users_me(current_user: str = Depends(get_current_user), session: Session = Depends(get_session)):
@@ -221,9 +277,9 @@ def verify_reset_token(request: VerifyTokenRequest, session: Session = Depends(g
     return {"valid": True, "email": user.email}
 
 @app.post("/api/auth/reset-password")
-def reset_password(request: ResetPasswordRequest, session: Session = Depends(get_session)):
+async def reset_password(request: ResetPasswordRequest, session: Session = Depends(get_session)):
     """Reset password using a valid token"""
-    user = session.exec(select(User).where(User.reset_token == request.token)).first()
+    user = await run_in_threadpool(lambda: session.exec(select(User).where(User.reset_token == request.token)).first())
     
     if not user:
         raise HTTPException(status_code=400, detail="Invalid reset token")
@@ -232,28 +288,127 @@ def reset_password(request: ResetPasswordRequest, session: Session = Depends(get
         raise HTTPException(status_code=400, detail="Reset token has expired")
     
     # Update password
-    user.hashed_password = get_password_hash(request.new_password)
+    user.hashed_password = await get_password_hash_async(request.new_password)
     # Clear reset token
     user.reset_token = None
     user.reset_token_expires = None
     session.add(user)
-    session.commit()
+    await run_in_threadpool(session.commit)
+    # Tokens issued before the reset must be re-verified against the database
+    token_cache.invalidate_user(user.username)
     
     return {"message": "Password has been reset successfully"}
 
 # --- API Endpoints ---
 
+# Small, rarely-changing collections served from reference_cache
+REFERENCE_MODELS = {
+    "teams": Team,
+    "technicians": Technician,
+    "work_centers": WorkCenter,
+    "equipment_categories": EquipmentCategory,
+}
+
+def cached_reference(session: Session, key: str):
+    # Cached rows are detached once the loading session closes; they are
+    # only ever read, never re-attached to another session
+    model = REFERENCE_MODELS[key]
+    return reference_cache.get_or_load(key, lambda: session.exec(select(model)).all())
+
+ACTIVE_STAGES = ["New", "In Progress"]
+
+@app.get("/api/bootstrap")
+def bootstrap(
+    request: Request,
+    requests_limit: int = Query(1000, ge=0, le=5000),
+    active_only: bool = True,
+    session: Session = Depends(get_session),
+):
+    """
+    All reference data plus a bounded window of the most recent requests,
+    loaded in one session with one query per table. Supports If-None-Match:
+    the ETag is derived from the sync token and the parameters, so an
+    unchanged payload is answered with 304 before any table is loaded.
+    """
+    token = current_token(session)
+    etag = None
+    # Writes stamped just before the token may still be committing (see
+    # SYNC_OVERLAP); until it has settled, fall back to hashing the body
+    if decode_token(token) < datetime.utcnow() - SYNC_OVERLAP:
+        etag = etag_for_version("bootstrap", token, requests_limit, active_only)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
+    request_query = select(MaintenanceRequest)
+    if active_only:
+        request_query = request_query.where(MaintenanceRequest.stage.in_(ACTIVE_STAGES))
+    window = session.exec(request_query.order_by(MaintenanceRequest.id.desc()).limit(requests_limit + 1)).all()
+
+    payload = {
+        "equipment": session.exec(select(Equipment)).all(),
+        "teams": cached_reference(session, "teams"),
+        "technicians": cached_reference(session, "technicians"),
+        "work_centers": cached_reference(session, "work_centers"),
+        "equipment_categories": cached_reference(session, "equipment_categories"),
+        "requests": window[:requests_limit],
+        "requests_truncated": len(window) > requests_limit,
+        "sync_token": token,
+    }
+    return conditional_json(request, payload, etag=etag)
+
+@app.get("/api/sync")
+def sync(since: Optional[str] = None, session: Session = Depends(get_session)):
+    """
+    Rows changed or deleted since `since` (a token from /api/bootstrap or a
+    previous sync). Apply `deleted` before `changed`. When `full_resync` is
+    true the token is too old and the client should reload via /api/bootstrap.
+    """
+    return changes_since(session, since)
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    return {"reference": reference_cache.stats(), "auth": token_cache.stats(), "autocomplete": equipment_index.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/api/events")
+async def events(request: Request):
+    """Server-Sent Events stream of create/update/stage/delete changes"""
+    queue = change_feed.subscribe()
+    if queue is None:
+        raise HTTPException(status_code=503, detail="Too many event subscribers")
+    return StreamingResponse(
+        event_stream(change_feed, queue, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/api/teams", response_model=List[Team])
 def get_teams(session: Session = Depends(get_session)):
-    return session.exec(select(Team)).all()
+    return cached_reference(session, "teams")
 
 @app.get("/api/technicians", response_model=List[Technician])
 def get_technicians(session: Session = Depends(get_session)):
-    return session.exec(select(Technician)).all()
+    return cached_reference(session, "technicians")
+
+@app.get("/api/technicians/workload")
+def get_technician_workload(
+    order_by: str = "active_requests",
+    limit: Optional[int] = Query(None, ge=1),
+    team_id: Optional[int] = None,
+    session: Session = Depends(get_session),
+):
+    """Per-technician active requests, scheduled hours and overdue count, ranked by `order_by`"""
+    if order_by not in WORKLOAD_ORDERINGS:
+        raise HTTPException(status_code=400, detail=f"order_by must be one of: {', '.join(WORKLOAD_ORDERINGS)}")
+    return technician_workload(session, order_by, limit, team_id)
 
 @app.get("/api/equipment-categories", response_model=List[EquipmentCategory])
 def get_equipment_categories(session: Session = Depends(get_session)):
-    return session.exec(select(EquipmentCategory)).all()
+    return cached_reference(session, "equipment_categories")
 
 @app.post("/api/equipment-categories", response_model=EquipmentCategory)
 def create_equipment_category(cat: EquipmentCategory, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
@@ -262,21 +417,19 @@ def create_equipment_category(cat: EquipmentCategory, current_user: User = Depen
     session.add(cat)
     session.commit()
     session.refresh(cat)
+    change_feed.publish("equipment_categories", "created", cat)
+    reference_cache.invalidate("equipment_categories")
     return cat
 
 @app.put("/api/equipment-categories/{cat_id}", response_model=EquipmentCategory)
-def update_equipment_category(cat_id: int, cat: EquipmentCategory, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+def update_equipment_category(cat_id: int, cat: EquipmentCategory, response: Response, if_match: Optional[str] = Header(None), current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
     if current_user.role not in ["admin", "manager"]:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
-    db_cat = session.get(EquipmentCategory, cat_id)
-    if not db_cat:
-        raise HTTPException(status_code=404, detail="Category not found")
-    cat_data = cat.dict(exclude_unset=True)
-    for key, value in cat_data.items():
-        setattr(db_cat, key, value)
-    session.add(db_cat)
+    db_cat, _ = versioned_update(session, EquipmentCategory, cat_id, changed_fields(cat), if_match_version(if_match), label="Category")
     session.commit()
-    session.refresh(db_cat)
+    response.headers["ETag"] = version_etag(db_cat["version"])
+    change_feed.publish("equipment_categories", "updated", db_cat)
+    reference_cache.invalidate("equipment_categories")
     return db_cat
 
 @app.delete("/api/equipment-categories/{cat_id}")
@@ -288,10 +441,12 @@ def delete_equipment_category(cat_id: int, current_user: User = Depends(get_curr
         raise HTTPException(status_code=404, detail="Category not found")
     session.delete(db_cat)
     session.commit()
+    change_feed.publish("equipment_categories", "deleted", row_id=cat_id)
+    reference_cache.invalidate("equipment_categories")
     return {"ok": True}
 @app.get("/api/work-centers", response_model=List[WorkCenter])
 def get_work_centers(session: Session = Depends(get_session)):
-    return session.exec(select(WorkCenter)).all()
+    return cached_reference(session, "work_centers")
 
 @app.post("/api/work-centers", response_model=WorkCenter)
 def create_work_center(wc: WorkCenter, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
@@ -300,21 +455,19 @@ def create_work_center(wc: WorkCenter, current_user: User = Depends(get_current_
     session.add(wc)
     session.commit()
     session.refresh(wc)
+    change_feed.publish("work_centers", "created", wc)
+    reference_cache.invalidate("work_centers")
     return wc
 
 @app.put("/api/work-centers/{wc_id}", response_model=WorkCenter)
-def update_work_center(wc_id: int, wc: WorkCenter, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+def update_work_center(wc_id: int, wc: WorkCenter, response: Response, if_match: Optional[str] = Header(None), current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
     if current_user.role not in ["admin", "manager"]:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
-    db_wc = session.get(WorkCenter, wc_id)
-    if not db_wc:
-        raise HTTPException(status_code=404, detail="Work Center not found")
-    wc_data = wc.dict(exclude_unset=True)
-    for key, value in wc_data.items():
-        setattr(db_wc, key, value)
-    session.add(db_wc)
+    db_wc, _ = versioned_update(session, WorkCenter, wc_id, changed_fields(wc), if_match_version(if_match), label="Work Center")
     session.commit()
-    session.refresh(db_wc)
+    response.headers["ETag"] = version_etag(db_wc["version"])
+    change_feed.publish("work_centers", "updated", db_wc)
+    reference_cache.invalidate("work_centers")
     return db_wc
 
 @app.delete("/api/work-centers/{wc_id}")
@@ -326,6 +479,8 @@ def delete_work_center(wc_id: int, current_user: User = Depends(get_current_user
         raise HTTPException(status_code=404, detail="Work Center not found")
     session.delete(db_wc)
     session.commit()
+    change_feed.publish("work_centers", "deleted", row_id=wc_id)
+    reference_cache.invalidate("work_centers")
     return {"ok": True}
 
 @app.post("/api/teams", response_model=Team)
@@ -335,23 +490,19 @@ def create_team(team: Team, current_user: User = Depends(get_current_user), sess
     session.add(team)
     session.commit()
     session.refresh(team)
+    change_feed.publish("teams", "created", team)
+    reference_cache.invalidate("teams")
     return team
 
 @app.put("/api/teams/{team_id}", response_model=Team)
-def update_team(team_id: int, team: Team, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+def update_team(team_id: int, team: Team, response: Response, if_match: Optional[str] = Header(None), current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can update teams")
-    db_team = session.get(Team, team_id)
-    if not db_team:
-        raise HTTPException(status_code=404, detail="Team not found")
-    
-    team_data = team.dict(exclude_unset=True)
-    for key, value in team_data.items():
-        setattr(db_team, key, value)
-    
-    session.add(db_team)
+    db_team, _ = versioned_update(session, Team, team_id, changed_fields(team), if_match_version(if_match), label="Team")
     session.commit()
-    session.refresh(db_team)
+    response.headers["ETag"] = version_etag(db_team["version"])
+    change_feed.publish("teams", "updated", db_team)
+    reference_cache.invalidate("teams")
     return db_team
 
 @app.delete("/api/teams/{team_id}")
@@ -363,6 +514,8 @@ def delete_team(team_id: int, current_user: User = Depends(get_current_user), se
         raise HTTPException(status_code=404, detail="Team not found")
     session.delete(db_team)
     session.commit()
+    change_feed.publish("teams", "deleted", row_id=team_id)
+    reference_cache.invalidate("teams")
     return {"ok": True}
 
 @app.post("/api/technicians", response_model=Technician)
@@ -372,23 +525,19 @@ def create_technician(tech: Technician, current_user: User = Depends(get_current
     session.add(tech)
     session.commit()
     session.refresh(tech)
+    change_feed.publish("technicians", "created", tech)
+    reference_cache.invalidate("technicians")
     return tech
 
 @app.put("/api/technicians/{tech_id}", response_model=Technician)
-def update_technician(tech_id: int, tech: Technician, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+def update_technician(tech_id: int, tech: Technician, response: Response, if_match: Optional[str] = Header(None), current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
     if current_user.role not in ["admin", "manager"]:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
-    db_tech = session.get(Technician, tech_id)
-    if not db_tech:
-        raise HTTPException(status_code=404, detail="Technician not found")
-    
-    tech_data = tech.dict(exclude_unset=True)
-    for key, value in tech_data.items():
-        setattr(db_tech, key, value)
-    
-    session.add(db_tech)
+    db_tech, _ = versioned_update(session, Technician, tech_id, changed_fields(tech), if_match_version(if_match), label="Technician")
     session.commit()
-    session.refresh(db_tech)
+    response.headers["ETag"] = version_etag(db_tech["version"])
+    change_feed.publish("technicians", "updated", db_tech)
+    reference_cache.invalidate("technicians")
     return db_tech
 
 @app.delete("/api/technicians/{tech_id}")
@@ -400,22 +549,148 @@ def delete_technician(tech_id: int, current_user: User = Depends(get_current_use
         raise HTTPException(status_code=404, detail="Technician not found")
     session.delete(db_tech)
     session.commit()
+    change_feed.publish("technicians", "deleted", row_id=tech_id)
+    reference_cache.invalidate("technicians")
     return {"ok": True}
 
-@app.get("/api/equipment", response_model=List[Equipment])
-def get_equipment(session: Session = Depends(get_session)):
-    return session.exec(select(Equipment)).all()
+@app.get("/api/equipment")
+def get_equipment(response: Response, fields: Optional[str] = None, filters: EquipmentFilters = Depends(), page: PageParams = Depends(), session: Session = Depends(get_session)):
+    # Select only the requested columns (e.g. ?fields=name,status,health)
+    query = filters.apply(select(*projection(Equipment, fields)))
+    rows = keyset_page(session, query, Equipment.id, page, response)
+    return [dict(row._mapping) for row in rows]
+
+@app.get("/api/equipment/autocomplete")
+def autocomplete_equipment(q: str = Query(..., min_length=1, max_length=100), limit: int = Query(10, ge=1, le=50), session: Session = Depends(get_session)):
+    """Equipment whose serial number, name or a word of the name starts with `q` (case-insensitive)"""
+    return equipment_index.suggest(session, q, limit)
+
+@app.post("/api/equipment/lookup")
+def lookup_equipment_batch(lookup: LookupRequest, session: Session = Depends(get_session)):
+    """
+    Resolve a batch of scanned serial numbers and/or ids in one query. Found
+    assets come with their latest open request; unknown ones are listed
+    under `missing`.
+    """
+    return lookup_equipment(session, lookup)
+
+@app.get("/api/equipment/export")
+def export_equipment(format: str = "csv", fields: Optional[str] = None, filters: EquipmentFilters = Depends()):
+    """Stream every matching equipment row (same filters as /api/equipment) as CSV, NDJSON or Parquet"""
+    check_format(format)
+    columns = projection(Equipment, fields)
+    query = filters.apply(select(*columns)).order_by(Equipment.id)
+    return StreamingResponse(
+        export_rows(format, columns, query),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="equipment.{format}"'},
+    )
+
+@app.get("/api/requests/export")
+def export_requests(format: str = "csv", fields: Optional[str] = None, filters: RequestFilters = Depends()):
+    """Stream every matching request (same filters as /api/requests) as CSV, NDJSON or Parquet"""
+    check_format(format)
+    columns = projection(MaintenanceRequest, fields)
+    query = filters.apply(select(*columns)).order_by(MaintenanceRequest.id)
+    return StreamingResponse(
+        export_rows(format, columns, query),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="requests.{format}"'},
+    )
+
+@app.get("/api/search")
+def search_records(
+    q: str = Query(..., min_length=2, max_length=200),
+    types: str = "requests,equipment",
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+    session: Session = Depends(get_session),
+):
+    """
+    Ranked search over request subjects/worksheet notes and equipment names,
+    serial numbers, locations and employees. Page with `next_offset`.
+    """
+    entities = [name.strip() for name in types.split(",") if name.strip()]
+    unknown = [name for name in entities if name not in SEARCH_TARGETS]
+    if unknown or not entities:
+        raise HTTPException(status_code=400, detail=f"types must be drawn from: {', '.join(SEARCH_TARGETS)}")
+    return search(session, q.strip(), entities, limit, offset)
+
+@app.get("/api/requests/board")
+def get_request_board(
+    sort: str = "date",
+    limit: int = Query(20, ge=1, le=200),
+    stage: Optional[str] = None,
+    cursor: Optional[str] = None,
+    filters: RequestFilters = Depends(),
+    session: Session = Depends(get_session),
+):
+    """
+    Kanban columns with per-stage counts and the first `limit` cards in board
+    order. Pass `stage` and a column's `next_cursor` to load more of one column;
+    `stage` without a cursor reloads that column from the top, with its count.
+    """
+    if sort not in BOARD_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(BOARD_SORTS)}")
+    # The column is chosen by `stage`, not by the generic stage filter
+    filters.stage = None
+    if stage is not None:
+        if stage not in STAGES:
+            raise HTTPException(status_code=400, detail=f"stage must be one of: {', '.join(STAGES)}")
+        column = column_cards(session, stage, sort, limit, filters, cursor)
+        if cursor is None:
+            # A column reloaded from the top also gets its count, so a client
+            # can refresh one column without reloading the board
+            column["count"] = column_count(session, stage, filters)
+        return column
+    return board(session, sort, limit, filters)
 
 @app.get("/api/requests", response_model=List[MaintenanceRequest])
-def get_requests(session: Session = Depends(get_session)):
-    return session.exec(select(MaintenanceRequest)).all()
+def get_requests(response: Response, filters: RequestFilters = Depends(), page: PageParams = Depends(), session: Session = Depends(get_session)):
+    query = filters.apply(select(MaintenanceRequest))
+    return keyset_page(session, query, MaintenanceRequest.id, page, response)
+
+@app.get("/api/calendar")
+def get_calendar(
+    request: Request,
+    start: date = Query(..., alias="from"),
+    end: date = Query(..., alias="to"),
+    team_id: Optional[int] = None,
+    session: Session = Depends(get_session),
+):
+    """
+    Requests and equipment purchases in [from, to], grouped by day. Each
+    month/team URL carries an ETag, so revisits revalidate with a cheap 304.
+    """
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end - start).days >= MAX_CALENDAR_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range must be shorter than {MAX_CALENDAR_DAYS} days")
+    payload = calendar_events(session, start, end, team_id)
+    return conditional_json(request, payload)
+
+@app.get("/api/reports/matrix")
+def get_report_matrix(date_from: Optional[date] = None, date_to: Optional[date] = None, company: Optional[str] = None, session: Session = Depends(get_session)):
+    """Team x department request counts with per-team and per-department totals"""
+    return request_matrix(session, date_from, date_to, company)
+
+@app.get("/api/reports/summary")
+def get_report_summary(group_by: str = "team_id,stage", date_from: Optional[date] = None, date_to: Optional[date] = None, company: Optional[str] = None, session: Session = Depends(get_session)):
+    """Request counts from the rollup table, grouped by any of day, team_id, stage, type, company"""
+    columns = [column.strip() for column in group_by.split(",") if column.strip()]
+    unknown = [column for column in columns if column not in GROUP_COLUMNS]
+    if not columns or unknown:
+        raise HTTPException(status_code=400, detail=f"group_by must be a subset of: {', '.join(GROUP_COLUMNS)}")
+    return rollup_summary(session, columns, date_from, date_to, company)
 
 @app.post("/api/requests", response_model=MaintenanceRequest)
 def create_request(request: MaintenanceRequest, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
     # Any authenticated user can create a request
     session.add(request)
+    move_in_rollup(session, None, rollup_key(request))
     session.commit()
     session.refresh(request)
+    change_feed.publish("requests", "created", request)
     return request
 
 @app.post("/api/equipment", response_model=Equipment)
@@ -425,23 +700,46 @@ def create_equipment(equipment: Equipment, current_user: User = Depends(get_curr
     session.add(equipment)
     session.commit()
     session.refresh(equipment)
+    change_feed.publish("equipment", "created", equipment)
+    equipment_index.upsert(equipment)
     return equipment
 
+@app.post("/api/equipment/import")
+async def import_equipment_file(
+    request: Request,
+    format: Optional[str] = None,
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=50000),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Stream a CSV or NDJSON asset register in the request body and upsert it
+    on serial_number. `format` defaults from the Content-Type.
+    """
+    if current_user.role not in ["admin", "manager"]:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    fmt = format or ("ndjson" if "json" in request.headers.get("content-type", "") else "csv")
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(IMPORT_FORMATS)}")
+
+    def run_import():
+        with Session(engine) as session:
+            return import_equipment(session, text_stream(RequestBodyReader(request)), fmt, batch_size)
+
+    report = await run_in_threadpool(run_import)
+    if report["imported"]:
+        change_feed.publish_resync()
+        equipment_index.invalidate()
+    return report
+
 @app.put("/api/equipment/{equipment_id}", response_model=Equipment)
-def update_equipment(equipment_id: int, item: Equipment, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+def update_equipment(equipment_id: int, item: Equipment, response: Response, if_match: Optional[str] = Header(None), current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
     if current_user.role not in ["admin", "manager"]:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
-    db_item = session.get(Equipment, equipment_id)
-    if not db_item:
-        raise HTTPException(status_code=404, detail="Equipment not found")
-    
-    item_data = item.dict(exclude_unset=True)
-    for key, value in item_data.items():
-        setattr(db_item, key, value)
-    
-    session.add(db_item)
+    db_item, _ = versioned_update(session, Equipment, equipment_id, changed_fields(item), if_match_version(if_match), label="Equipment")
     session.commit()
-    session.refresh(db_item)
+    response.headers["ETag"] = version_etag(db_item["version"])
+    change_feed.publish("equipment", "updated", db_item)
+    equipment_index.upsert(db_item)
     return db_item
 
 @app.delete("/api/equipment/{equipment_id}")
@@ -453,46 +751,58 @@ def delete_equipment(equipment_id: int, current_user: User = Depends(get_current
         raise HTTPException(status_code=404, detail="Equipment not found")
     session.delete(db_item)
     session.commit()
+    change_feed.publish("equipment", "deleted", row_id=equipment_id)
+    equipment_index.remove(equipment_id)
     return {"ok": True}
 
 @app.put("/api/requests/{request_id}", response_model=MaintenanceRequest)
-def update_request(request_id: int, req: MaintenanceRequest, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+def update_request(request_id: int, req: MaintenanceRequest, response: Response, if_match: Optional[str] = Header(None), current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
     if current_user.role not in ["admin", "manager", "technician"]:
          raise HTTPException(status_code=403, detail="Insufficient permissions")
-    db_req = session.get(MaintenanceRequest, request_id)
-    if not db_req:
-        raise HTTPException(status_code=404, detail="Request not found")
-    
-    req_data = req.dict(exclude_unset=True)
-    for key, value in req_data.items():
-        setattr(db_req, key, value)
-    
-    session.add(db_req)
+    values = without_stage(session, request_id, changed_fields(req))
+    db_req, old = versioned_update(session, MaintenanceRequest, request_id, values, if_match_version(if_match),
+                                   old_columns=ROLLUP_KEY_COLUMNS, label="Request")
+    move_in_rollup(session, row_rollup_key(old), row_rollup_key(db_req))
     session.commit()
-    session.refresh(db_req)
+    response.headers["ETag"] = version_etag(db_req["version"])
+    change_feed.publish("requests", "updated", db_req)
     return db_req
 
+@app.post("/api/requests/bulk")
+def bulk_requests(bulk: BulkRequest, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    """
+    Create, update and move up to BULK_MAX_ITEMS requests in one transaction.
+    Every item gets a result with its own status code. A failed atomic batch
+    is answered with 409 and nothing is written.
+    """
+    committed, results, published = apply_bulk(session, bulk, current_user.role)
+    for entity, action, row in published:
+        change_feed.publish(entity, action, row)
+        if entity == "equipment":
+            equipment_index.upsert(row)
+    body = {
+        "mode": bulk.mode,
+        "committed": committed,
+        "succeeded": sum(1 for result in results if "error" not in result),
+        "failed": sum(1 for result in results if "error" in result),
+        "results": results,
+    }
+    return JSONResponse(jsonable_encoder(body), status_code=200 if committed else 409)
+
 @app.put("/api/requests/{request_id}/stage", response_model=MaintenanceRequest)
-def update_stage(request_id: int, stage: str, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+def update_stage(request_id: int, stage: str, expected_stage: Optional[str] = None, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    """
+    Move a request to another stage. Pass the stage the client last saw as
+    `expected_stage`; if the request has moved since, the call fails with 409.
+    """
     if current_user.role not in ["admin", "manager", "technician"]:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
-    db_request = session.get(MaintenanceRequest, request_id)
-    if not db_request:
-        raise HTTPException(status_code=404, detail="Request not found")
-    
-    db_request.stage = stage
-    
-    # Scrap logic
-    if stage == "Scrap":
-        equipment = session.get(Equipment, db_request.equipment_id)
-        if equipment:
-            equipment.status = "scrapped"
-            session.add(equipment)
-            
-    session.add(db_request)
+    db_request, equipment = transition_stage(session, request_id, stage, expected_stage)
     session.commit()
-    session.refresh(db_request)
-    session.refresh(db_request)
+    change_feed.publish("requests", "stage_changed", db_request)
+    if equipment:
+        change_feed.publish("equipment", "updated", equipment)
+        equipment_index.upsert(equipment)
     return db_request
 
 @app.delete("/api/requests/{request_id}")
@@ -502,8 +812,10 @@ def delete_request(request_id: int, current_user: User = Depends(get_current_use
     db_req = session.get(MaintenanceRequest, request_id)
     if not db_req:
         raise HTTPException(status_code=404, detail="Request not found")
+    move_in_rollup(session, rollup_key(db_req), None)
     session.delete(db_req)
     session.commit()
+    change_feed.publish("requests", "deleted", row_id=request_id)
     return {"ok": True}
 
 if __name__ == "__main__":
@@ -0,0 +1,270 @@
+"""
+Request and database instrumentation exposed in the Prometheus text format.
+
+MetricsMiddleware (plain ASGI, so it adds no per-request task or body
+copying) times every HTTP request and labels it with the route template,
+e.g. /api/equipment/{equipment_id}, so path parameters do not create new
+series. While a request runs, its RequestStats object sits in a context
+variable; SQLAlchemy cursor events on the engine add each statement's count
+and duration to it. Sync handlers run in the threadpool with a copy of the
+request's context, so their queries are attributed to the right request.
+
+Pool checkout time (waiting for a free connection, or opening a new one) is
+measured around the pool's connect(). Statements run outside a request
+(startup, background work) only show up in the global counters.
+
+The same hooks feed the slow-query log and N+1 check in querylog.py.
+Set METRICS_ENABLED=false to leave all of this out.
+"""
+import bisect
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from querylog import (
+    N_PLUS_ONE_THRESHOLD, SLOW_QUERY_SECONDS, log_n_plus_one, log_slow_query, repeated_statements, track_statement,
+)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> str:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in values]
+        return "\n".join(lines)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> str:
+        with self._lock:
+            series = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return "\n".join(lines)
+
+
+REQUEST_SECONDS = Histogram(
+    "gearguard_http_request_duration_seconds", "Time to answer an HTTP request, including streaming the body",
+    ["method", "route", "status"],
+)
+REQUEST_STATEMENTS = Histogram(
+    "gearguard_http_request_db_statements", "SQL statements executed per HTTP request",
+    ["method", "route"], buckets=STATEMENT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "gearguard_http_request_db_seconds", "Time spent executing SQL per HTTP request",
+    ["method", "route"],
+)
+POOL_CHECKOUT_SECONDS = Histogram(
+    "gearguard_db_pool_checkout_seconds", "Time to get a connection from the pool (waiting or connecting)",
+    buckets=POOL_WAIT_BUCKETS,
+)
+DB_STATEMENTS = Counter("gearguard_db_statements_total", "SQL statements executed, in or outside requests")
+DB_SECONDS = Counter("gearguard_db_statement_seconds_total", "Time spent executing SQL, in or outside requests")
+SLOW_QUERIES = Counter("gearguard_db_slow_queries_total", "Statements slower than SLOW_QUERY_MS")
+N_PLUS_ONE_REQUESTS = Counter(
+    "gearguard_n_plus_one_requests_total", "Requests that ran one SELECT with N_PLUS_ONE_THRESHOLD or more parameter sets",
+    ["method", "route"],
+)
+
+
+class PoolGauges:
+    """Current pool occupancy, read from the pool when scraped"""
+
+    def __init__(self):
+        self.pool = None
+
+    def render(self) -> str:
+        pool = self.pool
+        if pool is None or not hasattr(pool, "checkedout"):
+            return ""
+        lines = []
+        for name, help, value in (
+            ("gearguard_db_pool_size", "Configured pool size", pool.size()),
+            ("gearguard_db_pool_checked_out", "Connections currently checked out", pool.checkedout()),
+            ("gearguard_db_pool_overflow", "Connections open beyond the pool size", max(pool.overflow(), 0)),
+        ):
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines)
+
+
+POOL_GAUGES = PoolGauges()
+
+REGISTRY = [REQUEST_SECONDS, REQUEST_STATEMENTS, REQUEST_DB_SECONDS, POOL_CHECKOUT_SECONDS, DB_STATEMENTS, DB_SECONDS,
+            SLOW_QUERIES, N_PLUS_ONE_REQUESTS, POOL_GAUGES]
+
+
+class RequestStats:
+    __slots__ = ("scope", "statements", "db_seconds", "pool_wait_seconds", "shapes")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        # SELECT text -> hashes of the parameters it ran with, for the N+1 check
+        self.shapes = {}
+
+    @property
+    def label(self) -> str:
+        return f"{self.scope['method']} {self.route}"
+
+    @property
+    def route(self) -> str:
+        # Set by the router once the request has been matched
+        route = self.scope.get("route")
+        return getattr(route, "path_format", None) or "unmatched"
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    DB_STATEMENTS.inc()
+    DB_SECONDS.inc(amount=elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+        if N_PLUS_ONE_THRESHOLD:
+            track_statement(stats.shapes, statement, parameters, executemany)
+    if SLOW_QUERY_SECONDS and elapsed >= SLOW_QUERY_SECONDS:
+        SLOW_QUERIES.inc()
+        log_slow_query(statement, parameters, context, elapsed, stats.label if stats is not None else None)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def instrument_engine(engine: Engine):
+    """Count and time every statement on `engine` and time pool checkouts"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+    pool = engine.pool
+    checkout = pool.connect
+
+    def timed_checkout():
+        started = time.perf_counter()
+        try:
+            return checkout()
+        finally:
+            elapsed = time.perf_counter() - started
+            POOL_CHECKOUT_SECONDS.observe(elapsed)
+            stats = current_request.get()
+            if stats is not None:
+                stats.pool_wait_seconds += elapsed
+
+    pool.connect = timed_checkout
+    POOL_GAUGES.pool = pool
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request.reset(token)
+            method, route = scope["method"], stats.route
+            REQUEST_SECONDS.observe(elapsed, method, route, str(status[0]))
+            REQUEST_STATEMENTS.observe(stats.statements, method, route)
+            REQUEST_DB_SECONDS.observe(stats.db_seconds, method, route)
+            repeated = repeated_statements(stats.shapes, route)
+            if repeated:
+                N_PLUS_ONE_REQUESTS.inc(method, route)
+                log_n_plus_one(stats.label, repeated)
+
+
+def render_metrics() -> str:
+    return "\n".join(text for text in (metric.render() for metric in REGISTRY) if text) + "\n"
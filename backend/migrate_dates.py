@@ -0,0 +1,198 @@
+"""
+Convert string date columns to DATE:
+    maintenancerequest.scheduled_date, equipment.purchase_date, equipment.warranty
+
+PostgreSQL (online, no long table locks):
+    1. add a DATE shadow column and a trigger that keeps it in sync with new writes
+    2. backfill the shadow column in small id-range batches, one commit per batch
+    3. build its index, and a copy of every other index on the column (such
+       as the (stage, scheduled_date, id) composite from add_indexes.py),
+       with CREATE INDEX CONCURRENTLY
+    4. prove NOT NULL with a NOT VALID check constraint validated online
+    5. swap the columns in one short transaction (metadata-only changes)
+
+SQLite stores dates as ISO text already, so only blank/invalid values are
+cleaned up and the new indexes are created.
+
+The derived requestrollup table is rebuilt afterwards.
+
+Usage: python migrate_dates.py [batch_size]
+"""
+import re
+import sys
+import time
+from sqlalchemy import inspect
+from sqlmodel import Session, SQLModel, text
+from database import engine
+from rollups import rebuild_rollups
+import models  # noqa: F401 - registers the tables on SQLModel.metadata
+
+# (table, column, NOT NULL, index name, indexed columns)
+DATE_COLUMNS = [
+    ("maintenancerequest", "scheduled_date", True, "ix_maintenancerequest_scheduled_date_id", "scheduled_date, id"),
+    ("equipment", "purchase_date", True, "ix_equipment_purchase_date", "purchase_date"),
+    ("equipment", "warranty", False, "ix_equipment_warranty", "warranty"),
+]
+
+ISO_DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}"
+
+def column_type(table, column):
+    for info in inspect(engine).get_columns(table):
+        if info["name"] == column:
+            return str(info["type"]).upper()
+    return None
+
+def id_range(connection, table):
+    low, high = connection.execute(text(f'SELECT min(id), max(id) FROM "{table}"')).one()
+    return (low or 0), (high or 0)
+
+def dependent_indexes(connection, table, column, index_name):
+    """(name, definition) of the other indexes that include `column`; dropping the column would drop them"""
+    return connection.execute(text("""
+        SELECT DISTINCT i.relname, pg_get_indexdef(i.oid)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_class t ON t.oid = x.indrelid
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = ANY(x.indkey)
+        WHERE t.relname = :table AND a.attname = :column AND i.relname <> :index_name AND NOT x.indisprimary
+    """), {"table": table, "column": column, "index_name": index_name}).all()
+
+def shadow_index_definition(definition, name, column, shadow):
+    """The same index on the shadow column, named <name>__date and built concurrently"""
+    head, using = definition.split(" USING ", 1)
+    head = re.sub(r"^CREATE (UNIQUE )?INDEX \S+", lambda m: f"CREATE {m.group(1) or ''}INDEX CONCURRENTLY {name}__date", head)
+    using = re.sub(rf"\b{column}\b", shadow, using)
+    return f"{head} USING {using}"
+
+def migrate_postgresql_column(table, column, not_null, index_name, index_columns, batch_size):
+    shadow = f"{column}__date"
+    function = f"{table}_{column}_date_sync"
+    safe_cast = lambda source: f"CASE WHEN {source} ~ '{ISO_DATE_PATTERN}' THEN substring({source} from 1 for 10)::date END"
+
+    print(f"\n  {table}.{column}: adding shadow column and sync trigger...")
+    with engine.begin() as connection:
+        connection.execute(text(f'ALTER TABLE "{table}" ADD COLUMN IF NOT EXISTS {shadow} DATE'))
+        connection.execute(text(f"""
+            CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$
+            BEGIN
+                NEW.{shadow} := {safe_cast(f"NEW.{column}")};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """))
+        connection.execute(text(f'DROP TRIGGER IF EXISTS {function} ON "{table}"'))
+        connection.execute(text(
+            f'CREATE TRIGGER {function} BEFORE INSERT OR UPDATE OF {column} ON "{table}" '
+            f'FOR EACH ROW EXECUTE FUNCTION {function}()'
+        ))
+
+    print(f"  {table}.{column}: backfilling in batches of {batch_size}...")
+    with engine.connect() as connection:
+        low, high = id_range(connection, table)
+    start = time.perf_counter()
+    for batch_start in range(low, high + 1, batch_size):
+        with engine.begin() as connection:
+            connection.execute(text(
+                f'UPDATE "{table}" SET {shadow} = {safe_cast(column)} '
+                f'WHERE id >= :low AND id < :high AND {shadow} IS NULL AND {column} IS NOT NULL'
+            ), {"low": batch_start, "high": batch_start + batch_size})
+    print(f"  ✓ Backfilled ids {low}..{high} in {time.perf_counter() - start:.1f}s")
+
+    autocommit = engine.execution_options(isolation_level="AUTOCOMMIT")
+    with autocommit.connect() as connection:
+        invalid = connection.execute(text(
+            f'SELECT count(*) FROM "{table}" WHERE {column} IS NOT NULL AND {column} <> \'\' AND {shadow} IS NULL'
+        )).scalar()
+        if invalid:
+            print(f"  ! {invalid} row(s) have values that are not ISO dates; they become NULL")
+
+        print(f"  {table}.{column}: building index concurrently...")
+        shadow_columns = index_columns.replace(column, shadow)
+        connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {index_name}__date'))
+        connection.execute(text(f'CREATE INDEX CONCURRENTLY {index_name}__date ON "{table}" ({shadow_columns})'))
+
+        dependents = dependent_indexes(connection, table, column, index_name)
+        for name, definition in dependents:
+            if name.endswith("__date"):
+                continue
+            print(f"  {table}.{column}: rebuilding dependent index {name} concurrently...")
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}__date"))
+            connection.execute(text(shadow_index_definition(definition, name, column, shadow)))
+
+        nulls = connection.execute(text(f'SELECT count(*) FROM "{table}" WHERE {shadow} IS NULL')).scalar()
+        enforce_not_null = not_null and nulls == 0
+        if not_null and not enforce_not_null:
+            print(f"  ! {nulls} NULL value(s); leaving {table}.{column} nullable")
+        if enforce_not_null:
+            # Validating a NOT VALID constraint does not block writes, and lets
+            # SET NOT NULL below skip its full-table scan
+            connection.execute(text(f'ALTER TABLE "{table}" DROP CONSTRAINT IF EXISTS {shadow}_not_null'))
+            connection.execute(text(f'ALTER TABLE "{table}" ADD CONSTRAINT {shadow}_not_null CHECK ({shadow} IS NOT NULL) NOT VALID'))
+            connection.execute(text(f'ALTER TABLE "{table}" VALIDATE CONSTRAINT {shadow}_not_null'))
+
+    print(f"  {table}.{column}: swapping columns...")
+    with engine.begin() as connection:
+        connection.execute(text("SET LOCAL lock_timeout = '5s'"))
+        connection.execute(text(f'DROP TRIGGER IF EXISTS {function} ON "{table}"'))
+        connection.execute(text(f'ALTER TABLE "{table}" DROP COLUMN {column}'))
+        connection.execute(text(f'ALTER TABLE "{table}" RENAME COLUMN {shadow} TO {column}'))
+        connection.execute(text(f'ALTER INDEX {index_name}__date RENAME TO {index_name}'))
+        for name, _ in dependents:
+            if not name.endswith("__date"):
+                connection.execute(text(f"ALTER INDEX {name}__date RENAME TO {name}"))
+        if enforce_not_null:
+            connection.execute(text(f'ALTER TABLE "{table}" ALTER COLUMN {column} SET NOT NULL'))
+            connection.execute(text(f'ALTER TABLE "{table}" DROP CONSTRAINT {shadow}_not_null'))
+        connection.execute(text(f"DROP FUNCTION IF EXISTS {function}()"))
+    print(f"  ✓ {table}.{column} is now DATE")
+
+def migrate_sqlite_column(table, column, not_null, index_name, index_columns, batch_size):
+    pattern = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*"
+    with engine.connect() as connection:
+        low, high = id_range(connection, table)
+        invalid = connection.execute(text(
+            f'SELECT count(*) FROM "{table}" WHERE {column} IS NOT NULL AND {column} NOT GLOB :pattern'
+        ), {"pattern": pattern}).scalar()
+    if invalid and not_null:
+        print(f"  ! {table}.{column}: {invalid} row(s) are not ISO dates; fix them manually")
+    elif invalid:
+        for batch_start in range(low, high + 1, batch_size):
+            with engine.begin() as connection:
+                connection.execute(text(
+                    f'UPDATE "{table}" SET {column} = NULL '
+                    f'WHERE id >= :low AND id < :high AND {column} NOT GLOB :pattern'
+                ), {"low": batch_start, "high": batch_start + batch_size, "pattern": pattern})
+        print(f"  ✓ {table}.{column}: cleared {invalid} blank/invalid value(s)")
+    with engine.begin() as connection:
+        connection.execute(text(f'CREATE INDEX IF NOT EXISTS {index_name} ON "{table}" ({index_columns})'))
+    print(f"  ✓ {table}.{column} indexed")
+
+def migrate_dates(batch_size: int = 5000):
+    print("=" * 60)
+    print("Converting date columns to DATE")
+    print("=" * 60)
+
+    dialect = engine.dialect.name
+    for table, column, not_null, index_name, index_columns in DATE_COLUMNS:
+        if dialect == "postgresql":
+            if column_type(table, column) == "DATE":
+                print(f"\n✓ {table}.{column} is already DATE")
+                continue
+            migrate_postgresql_column(table, column, not_null, index_name, index_columns, batch_size)
+        else:
+            migrate_sqlite_column(table, column, not_null, index_name, index_columns, batch_size)
+
+    print("\n  Rebuilding request rollups...")
+    if dialect == "postgresql" and column_type("requestrollup", "day") not in (None, "DATE"):
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE requestrollup"))
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        print(f"  ✓ Rebuilt {rebuild_rollups(session)} rollup rows")
+
+    print("\n" + "=" * 60)
+    print("✓ Migration completed successfully!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    migrate_dates(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -1,13 +1,48 @@
 from typing import List, Optional
+from sqlalchemy import Date, Index, TypeDecorator, UniqueConstraint, event
 from sqlmodel import Field, Relationship, SQLModel, Session, create_engine, select
 from datetime import date, datetime
 
+class InvalidDate(ValueError):
+    pass
+
+def parse_date(value):
+    """Coerce an ISO "YYYY-MM-DD" string (or datetime) to a date; blank strings become None"""
+    if value is None or (isinstance(value, date) and not isinstance(value, datetime)):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).date()
+    except ValueError:
+        raise InvalidDate(f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+class ISODate(TypeDecorator):
+    """
+    DATE column that also accepts the ISO date strings API clients send.
+    Table models skip validation, so request bodies reach the ORM as strings.
+    """
+    impl = Date
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return parse_date(value)
+
 class Team(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     leader: str
     members_count: int = 0
     technicians: List["Technician"] = Relationship(back_populates="team")
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    version: int = 1
 
 class Technician(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -15,6 +50,8 @@ class Technician(SQLModel, table=True):
     avatar: str
     team_id: int = Field(foreign_key="team.id")
     team: Optional[Team] = Relationship(back_populates="technicians")
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    version: int = 1
 
 class WorkCenter(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -26,6 +63,8 @@ class WorkCenter(SQLModel, table=True):
     capacity_time: float = 100.0
     time_efficiency: float = 100.0
     oee_target: float = 85.0
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    version: int = 1
 
 class EquipmentCategory(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -35,13 +74,24 @@ class EquipmentCategory(SQLModel, table=True):
     
     # Optional: relationship to equipment
     equipment: List["Equipment"] = Relationship(back_populates="category")
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    version: int = 1
 
 class Equipment(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_equipment_status_id", "status", "id"),
+        Index("ix_equipment_department_id", "department", "id"),
+        Index("ix_equipment_team_id_id", "team_id", "id"),
+        Index("ix_equipment_category_id_id", "category_id", "id"),
+        Index("ix_equipment_company_id", "company", "id"),
+        Index("ix_equipment_health_id", "health", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
-    serial_number: str = Field(index=True)
-    purchase_date: str
-    warranty: str
+    serial_number: str = Field(index=True, unique=True)
+    purchase_date: date = Field(sa_type=ISODate, index=True)
+    warranty: Optional[date] = Field(default=None, sa_type=ISODate, index=True)
     location: str
     department: str
     employee: str
@@ -54,21 +104,40 @@ class Equipment(SQLModel, table=True):
     company: Optional[str] = None # Company/Organization responsible for equipment
     category_id: Optional[int] = Field(default=None, foreign_key="equipmentcategory.id")
     category: Optional[EquipmentCategory] = Relationship(back_populates="equipment")
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    version: int = 1
 
 class MaintenanceRequest(SQLModel, table=True):
+    # Composite (filter, id) indexes so filtered list pages can walk the
+    # index in id order for keyset pagination instead of sorting.
+    __table_args__ = (
+        Index("ix_maintenancerequest_stage_id", "stage", "id"),
+        Index("ix_maintenancerequest_type_id", "type", "id"),
+        Index("ix_maintenancerequest_team_id_id", "team_id", "id"),
+        Index("ix_maintenancerequest_technician_id_id", "technician_id", "id"),
+        Index("ix_maintenancerequest_equipment_id_id", "equipment_id", "id"),
+        Index("ix_maintenancerequest_priority_id", "priority", "id"),
+        Index("ix_maintenancerequest_company_id", "company", "id"),
+        Index("ix_maintenancerequest_scheduled_date_id", "scheduled_date", "id"),
+        # Kanban columns in date order
+        Index("ix_maintenancerequest_stage_scheduled_date_id", "stage", "scheduled_date", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     subject: str
     equipment_id: Optional[int] = Field(default=None, foreign_key="equipment.id")
     work_center_id: Optional[int] = Field(default=None, foreign_key="workcenter.id")
     type: str # Corrective, Preventive
     stage: str = "New" # New, In Progress, Repaired, Scrap
-    scheduled_date: str
+    scheduled_date: date = Field(sa_type=ISODate)
     duration: float = 0.0
     technician_id: Optional[int] = Field(default=None, foreign_key="technician.id")
     team_id: Optional[int] = Field(default=None, foreign_key="team.id")
     priority: str = "Medium" # Low, Medium, High
     company: Optional[str] = None # Company/Organization responsible for maintenance
     worksheet_notes: Optional[str] = None # Technical notes for the worksheet
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    version: int = 1
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -78,3 +147,46 @@ class User(SQLModel, table=True):
     role: str = "technician"  # technician, admin
     reset_token: Optional[str] = Field(default=None)
     reset_token_expires: Optional[datetime] = Field(default=None)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class Tombstone(SQLModel, table=True):
+    """Record of a deleted row, so /api/sync can tell clients to drop it"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    table_name: str
+    row_id: int
+    deleted_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class RequestRollup(SQLModel, table=True):
+    """
+    Request counts per (day, team, stage, type, company), kept up to date by
+    the request endpoints. team_id 0 and company "" stand for "none" so the
+    key can carry a unique constraint.
+    """
+    __table_args__ = (
+        UniqueConstraint("day", "team_id", "stage", "type", "company", name="uq_requestrollup_key"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    day: date = Field(sa_type=ISODate, index=True)
+    team_id: int = 0
+    stage: str
+    type: str
+    company: str = ""
+    count: int = 0
+
+@event.listens_for(Session, "before_flush")
+def track_changes(session, flush_context, instances):
+    """
+    Stamp updated_at on every insert/update, bump the version of modified rows
+    and log a tombstone for every delete
+    """
+    now = datetime.utcnow()
+    for obj in session.dirty:
+        if hasattr(obj, "version") and session.is_modified(obj):
+            obj.version = (obj.version or 0) + 1
+    for obj in list(session.new) + list(session.dirty):
+        if hasattr(obj, "updated_at"):
+            obj.updated_at = now
+    for obj in list(session.deleted):
+        if hasattr(obj, "updated_at"):
+            session.add(Tombstone(table_name=obj.__tablename__, row_id=obj.id, deleted_at=now))
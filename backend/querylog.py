@@ -0,0 +1,130 @@
+"""
+Slow-query log and N+1 detection on top of the request instrumentation in
+metrics.py.
+
+Any statement slower than SLOW_QUERY_MS is logged with its parameters
+(values of password/token/secret binds are masked, long lists truncated) and
+the route that ran it. Within a request, SELECTs are grouped by their SQL
+text, which SQLAlchemy renders with placeholders, so a lazy load repeated
+per row (N+1) shows up as the same text with N different parameter sets; a
+request that runs one SELECT with N_PLUS_ONE_THRESHOLD or more different
+parameter sets is logged and counted in gearguard_n_plus_one_requests_total.
+Writes, executemany batches and the batch endpoints in
+N_PLUS_ONE_EXEMPT_ROUTES (which page through their input on purpose) are
+not checked. Set either variable to 0 to turn that check off.
+
+assert_max_queries() gives tests and scripts a query budget per endpoint.
+"""
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_MS", "200")) / 1000
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+N_PLUS_ONE_EXEMPT_ROUTES = {
+    route.strip() for route in os.getenv("N_PLUS_ONE_EXEMPT_ROUTES", "/api/equipment/import,/api/requests/bulk").split(",")
+    if route.strip()
+}
+MAX_LOGGED_CHARS = 1000
+
+SENSITIVE_PARAMETER = re.compile("password|token|secret", re.IGNORECASE)
+
+
+def _one_line(statement: str, limit: int = MAX_LOGGED_CHARS) -> str:
+    text = " ".join(statement.split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _masked(parameters):
+    if isinstance(parameters, dict):
+        return {key: "***" if SENSITIVE_PARAMETER.search(str(key)) else value for key, value in parameters.items()}
+    return parameters
+
+
+def format_parameters(parameters, context=None) -> str:
+    # Named binds (when the statement was compiled by SQLAlchemy) so secrets
+    # can be masked on every driver, including positional ones like sqlite3
+    if context is not None and getattr(context, "compiled", None) is not None and context.compiled_parameters:
+        parameters = context.compiled_parameters
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (dict, list, tuple)):
+        text = repr(_masked(parameters[0]))
+        if len(parameters) > 1:
+            text += f" (+{len(parameters) - 1} more)"
+    else:
+        text = repr(_masked(parameters))
+    return text if len(text) <= MAX_LOGGED_CHARS else text[:MAX_LOGGED_CHARS] + "..."
+
+
+def log_slow_query(statement: str, parameters, context, elapsed: float, request: Optional[str]):
+    logger.warning(
+        f"Slow query ({elapsed * 1000:.1f} ms) on {request or 'no request'}: "
+        f"{_one_line(statement)} parameters={format_parameters(parameters, context)}"
+    )
+
+
+def track_statement(shapes: dict, statement: str, parameters, executemany: bool):
+    """Record a SELECT and a hash of its parameters in `shapes` for the N+1 check"""
+    if executemany or statement.lstrip()[:6].upper() != "SELECT":
+        return
+    shapes.setdefault(statement, set()).add(hash(repr(parameters)))
+
+
+def repeated_statements(shapes: dict, route: Optional[str] = None) -> List[tuple]:
+    """(statement, count) pairs run with enough different parameters to look like N+1, most frequent first"""
+    if not N_PLUS_ONE_THRESHOLD or route in N_PLUS_ONE_EXEMPT_ROUTES:
+        return []
+    repeated = [(statement, len(seen)) for statement, seen in shapes.items() if len(seen) >= N_PLUS_ONE_THRESHOLD]
+    return sorted(repeated, key=lambda item: -item[1])
+
+
+def log_n_plus_one(request: str, repeated: List[tuple]):
+    details = "; ".join(f"{count} x {_one_line(statement, 300)}" for statement, count in repeated)
+    logger.warning(f"Possible N+1 on {request}: {details}")
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements: List[str] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine: Engine):
+    """Count every statement `engine` runs inside the block, from any thread"""
+    counter = QueryCounter()
+    event.listen(engine, "after_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "after_cursor_execute", counter)
+
+
+@contextmanager
+def assert_max_queries(engine: Engine, max_queries: int, label: str = "block"):
+    """
+    Fail with AssertionError if the block runs more than `max_queries`
+    statements, e.g.
+
+        with assert_max_queries(engine, 2, "GET /api/equipment"):
+            client.get("/api/equipment")
+    """
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > max_queries:
+        listing = "\n".join(f"  {index}. {_one_line(statement, 200)}" for index, statement in enumerate(counter.statements, 1))
+        raise AssertionError(f"{label} ran {counter.count} queries, expected at most {max_queries}:\n{listing}")
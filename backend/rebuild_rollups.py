@@ -0,0 +1,37 @@
+"""
+Verify the request rollups against a full recount and optionally rebuild them.
+
+Usage:
+    python rebuild_rollups.py            # report drift only
+    python rebuild_rollups.py --rebuild  # report drift, then recompute from scratch
+"""
+import sys
+from sqlmodel import Session, SQLModel
+from database import engine
+from rollups import verify_rollups, rebuild_rollups
+
+def main():
+    rebuild = "--rebuild" in sys.argv[1:]
+    SQLModel.metadata.create_all(engine)
+
+    print("=" * 60)
+    print("Verifying request rollups")
+    print("=" * 60)
+    with Session(engine) as session:
+        drift = verify_rollups(session)
+        if drift:
+            print(f"\n✗ {len(drift)} rollup key(s) drifted:")
+            for item in drift:
+                print(f"  {item['day']} team={item['team_id']} {item['stage']}/{item['type']} "
+                      f"company={item['company']!r}: expected {item['expected']}, found {item['actual']}")
+        else:
+            print("\n✓ Rollups match the requests table")
+
+        if rebuild:
+            rows = rebuild_rollups(session)
+            print(f"\n✓ Rebuilt {rows} rollup rows")
+
+    return 1 if drift and not rebuild else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
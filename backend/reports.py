@@ -0,0 +1,93 @@
+"""
+Reporting aggregates computed in the database instead of on the client.
+"""
+from datetime import date
+from typing import Optional
+from sqlalchemy import and_, case
+from sqlmodel import Session, select, func
+from models import Equipment, MaintenanceRequest, Technician
+
+CLOSED_STAGES = ["Repaired", "Scrap"]
+
+# Active requests at which a technician counts as fully loaded (100%)
+TECHNICIAN_CAPACITY = 4
+
+WORKLOAD_ORDERINGS = ("active_requests", "scheduled_hours", "overdue")
+
+
+def request_matrix(session: Session, date_from: Optional[date] = None, date_to: Optional[date] = None, company: Optional[str] = None) -> dict:
+    """
+    Request counts per (equipment department, team) from a single GROUP BY.
+    Requests without equipment have department None; they still count in
+    the team totals and the grand total.
+    """
+    query = (
+        select(Equipment.department, MaintenanceRequest.team_id, func.count(MaintenanceRequest.id))
+        .select_from(MaintenanceRequest)
+        .join(Equipment, MaintenanceRequest.equipment_id == Equipment.id, isouter=True)
+        .group_by(Equipment.department, MaintenanceRequest.team_id)
+    )
+    if date_from is not None:
+        query = query.where(MaintenanceRequest.scheduled_date >= date_from)
+    if date_to is not None:
+        query = query.where(MaintenanceRequest.scheduled_date <= date_to)
+    if company is not None:
+        query = query.where(MaintenanceRequest.company == company)
+
+    cells = []
+    department_totals = {}
+    team_totals = {}
+    total = 0
+    for department, team_id, count in session.exec(query).all():
+        cells.append({"department": department, "team_id": team_id, "count": count})
+        department_totals[department] = department_totals.get(department, 0) + count
+        team_totals[team_id] = team_totals.get(team_id, 0) + count
+        total += count
+
+    return {
+        "cells": cells,
+        "department_totals": [{"department": d, "count": c} for d, c in department_totals.items()],
+        "team_totals": [{"team_id": t, "count": c} for t, c in team_totals.items()],
+        "total": total,
+    }
+
+
+def technician_workload(session: Session, order_by: str = "active_requests", limit: Optional[int] = None, team_id: Optional[int] = None) -> list:
+    """
+    Active request count, scheduled hours and overdue count per technician,
+    from one LEFT JOIN + GROUP BY so technicians without work are included.
+    """
+    today = date.today()
+    active_requests = func.count(MaintenanceRequest.id)
+    scheduled_hours = func.coalesce(func.sum(MaintenanceRequest.duration), 0.0)
+    overdue = func.coalesce(func.sum(case((MaintenanceRequest.scheduled_date < today, 1), else_=0)), 0)
+    orderings = {"active_requests": active_requests, "scheduled_hours": scheduled_hours, "overdue": overdue}
+
+    query = (
+        select(Technician.id, Technician.name, Technician.team_id, active_requests, scheduled_hours, overdue)
+        .select_from(Technician)
+        .join(
+            MaintenanceRequest,
+            and_(MaintenanceRequest.technician_id == Technician.id, MaintenanceRequest.stage.not_in(CLOSED_STAGES)),
+            isouter=True,
+        )
+        .group_by(Technician.id, Technician.name, Technician.team_id)
+        .order_by(orderings[order_by].desc(), Technician.id)
+    )
+    if team_id is not None:
+        query = query.where(Technician.team_id == team_id)
+    if limit is not None:
+        query = query.limit(limit)
+
+    return [
+        {
+            "technician_id": tech_id,
+            "name": name,
+            "team_id": tech_team_id,
+            "active_requests": active,
+            "scheduled_hours": float(hours),
+            "overdue": overdue_count,
+            "load_percentage": min(round(active / TECHNICIAN_CAPACITY * 100), 100),
+        }
+        for tech_id, name, tech_team_id, active, hours, overdue_count in session.exec(query).all()
+    ]
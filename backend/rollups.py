@@ -0,0 +1,159 @@
+"""
+Incrementally maintained request rollups (see models.RequestRollup).
+
+The request endpoints call these helpers inside their own transaction, so a
+rollup change commits or rolls back together with the request change.
+"""
+from collections import Counter
+from datetime import date
+from typing import Optional, Tuple
+from sqlmodel import Session, select, func, delete
+from models import MaintenanceRequest, RequestRollup, parse_date
+
+RollupKey = Tuple[date, int, str, str, str]
+
+GROUP_COLUMNS = ("day", "team_id", "stage", "type", "company")
+# The MaintenanceRequest columns each rollup key is derived from
+ROLLUP_KEY_COLUMNS = ("scheduled_date", "team_id", "stage", "type", "company")
+
+
+def rollup_key(request: MaintenanceRequest) -> RollupKey:
+    return (parse_date(request.scheduled_date), request.team_id or 0, request.stage, request.type, request.company or "")
+
+
+def row_rollup_key(row: dict) -> RollupKey:
+    """rollup_key for a row returned as a mapping (e.g. from UPDATE ... RETURNING)"""
+    return (parse_date(row["scheduled_date"]), row["team_id"] or 0, row["stage"], row["type"], row["company"] or "")
+
+
+def _upsert_statement(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(RequestRollup)
+
+
+def add_to_rollup(session: Session, key: RollupKey, delta: int):
+    """Atomically add `delta` to the count for `key`, creating the row if needed"""
+    values = dict(zip(GROUP_COLUMNS, key))
+    statement = _upsert_statement(session.get_bind().dialect.name)
+    if statement is not None:
+        statement = statement.values(**values, count=delta).on_conflict_do_update(
+            index_elements=list(GROUP_COLUMNS),
+            set_={"count": RequestRollup.count + delta},
+        )
+        session.exec(statement)
+        return
+
+    # Databases without an upsert: read-modify-write inside the transaction
+    query = select(RequestRollup)
+    for column, value in values.items():
+        query = query.where(getattr(RequestRollup, column) == value)
+    row = session.exec(query.with_for_update()).first()
+    if row is None:
+        row = RequestRollup(**values, count=0)
+    row.count += delta
+    session.add(row)
+
+
+def move_in_rollup(session: Session, old_key: Optional[RollupKey], new_key: Optional[RollupKey]):
+    """Account for a request moving from `old_key` to `new_key` (None for create/delete)"""
+    if old_key == new_key:
+        return
+    if old_key is not None:
+        add_to_rollup(session, old_key, -1)
+    if new_key is not None:
+        add_to_rollup(session, new_key, 1)
+
+
+class RollupBatch:
+    """Collects rollup moves and applies the net change per key in one pass"""
+
+    def __init__(self):
+        self.deltas = Counter()
+
+    def move(self, old_key: Optional[RollupKey], new_key: Optional[RollupKey]):
+        if old_key == new_key:
+            return
+        if old_key is not None:
+            self.deltas[old_key] -= 1
+        if new_key is not None:
+            self.deltas[new_key] += 1
+
+    def merge(self, other: "RollupBatch"):
+        self.deltas.update(other.deltas)
+
+    def apply(self, session: Session):
+        for key, delta in self.deltas.items():
+            if delta:
+                add_to_rollup(session, key, delta)
+        self.deltas.clear()
+
+
+def _recomputed_counts(session: Session) -> dict:
+    query = select(
+        MaintenanceRequest.scheduled_date,
+        func.coalesce(MaintenanceRequest.team_id, 0),
+        MaintenanceRequest.stage,
+        MaintenanceRequest.type,
+        func.coalesce(MaintenanceRequest.company, ""),
+        func.count(MaintenanceRequest.id),
+    ).group_by(
+        MaintenanceRequest.scheduled_date,
+        func.coalesce(MaintenanceRequest.team_id, 0),
+        MaintenanceRequest.stage,
+        MaintenanceRequest.type,
+        func.coalesce(MaintenanceRequest.company, ""),
+    )
+    return {tuple(row[:5]): row[5] for row in session.exec(query).all()}
+
+
+def verify_rollups(session: Session) -> list:
+    """Compare the rollups with a full recount; returns one entry per drifted key"""
+    expected = _recomputed_counts(session)
+    actual = {}
+    for row in session.exec(select(RequestRollup)).all():
+        key = (row.day, row.team_id, row.stage, row.type, row.company)
+        actual[key] = actual.get(key, 0) + row.count
+
+    drift = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        if expected.get(key, 0) != actual.get(key, 0):
+            drift.append({**dict(zip(GROUP_COLUMNS, key)), "expected": expected.get(key, 0), "actual": actual.get(key, 0)})
+    return drift
+
+
+def rebuild_rollups(session: Session) -> int:
+    """Replace all rollups with a full recount; returns the number of rollup rows"""
+    counts = _recomputed_counts(session)
+    session.exec(delete(RequestRollup))
+    session.add_all([RequestRollup(**dict(zip(GROUP_COLUMNS, key)), count=count) for key, count in counts.items()])
+    session.commit()
+    return len(counts)
+
+
+def rollup_summary(session: Session, group_by: list, date_from: Optional[date] = None, date_to: Optional[date] = None, company: Optional[str] = None) -> list:
+    """Sum rollup counts over the given grouping columns; cost is O(days x teams), not O(requests)"""
+    columns = [getattr(RequestRollup, column) for column in group_by]
+    query = select(*columns, func.sum(RequestRollup.count)).group_by(*columns).having(func.sum(RequestRollup.count) != 0)
+    if date_from is not None:
+        query = query.where(RequestRollup.day >= date_from)
+    if date_to is not None:
+        query = query.where(RequestRollup.day <= date_to)
+    if company is not None:
+        query = query.where(RequestRollup.company == company)
+
+    results = []
+    for row in session.exec(query).all():
+        item = dict(zip(group_by, row[:-1]))
+        # Translate the "none" placeholders back
+        if item.get("team_id") == 0:
+            item["team_id"] = None
+        if item.get("company") == "":
+            item["company"] = None
+        item["count"] = row[-1]
+        results.append(item)
+    return results
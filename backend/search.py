@@ -0,0 +1,242 @@
+"""
+Ranked text search over requests and equipment.
+
+The search structures are created by add_search_indexes.py, never at
+startup; at startup detect_search_indexes() only looks up which of them
+exist and search uses the best path available:
+
+PostgreSQL: each searched table gets a stored generated search_vector column
+(a tsvector of its text columns, not mapped on the models) with a GIN index
+for word matches ranked with ts_rank, and a pg_trgm GIN index on the
+same text where the extension is installed (fuzzy and partial matches,
+ranked with word_similarity). Serial numbers also get a prefix index on
+lower(serial_number), so "MT/12" finds "MT/125/222" without pg_trgm; prefix
+hits rank above word matches. Ranking is done over the SEARCH_CANDIDATES
+newest matching rows (or the whole page window if larger), so very common
+terms stay fast and the same query always returns the same page.
+
+SQLite: an external-content FTS5 table with the trigram tokenizer per
+searched table, kept in sync by triggers and ranked with bm25. Terms shorter
+than three characters fall back to a LIKE scan of the FTS table.
+
+Other databases, and tables whose search structures have not been created
+yet, get an unindexed ILIKE scan.
+"""
+import logging
+from typing import Dict, List, Optional, Set
+from sqlalchemy import Float, column, literal_column, or_, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from models import Equipment, MaintenanceRequest
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CANDIDATES = 500
+MAX_SEARCH_OFFSET = 1000
+
+# Search structures found per table ("vector", "trigram", "prefix", "fts");
+# looked up at startup, or on the first search
+_available: Optional[Dict[str, Set[str]]] = None
+
+
+class SearchTarget:
+    def __init__(self, entity: str, model, columns: List[str], prefix_columns: List[str] = ()):
+        self.entity = entity
+        self.model = model
+        self.columns = columns
+        # Identifiers matched by prefix as well, e.g. serial numbers
+        self.prefix_columns = list(prefix_columns)
+        self.table = model.__tablename__
+        self.fts_table = f"{self.table}_fts"
+        # The exact expression the PostgreSQL indexes are built on
+        self.document = " || ' ' || ".join(f"coalesce({name}, '')" for name in columns)
+
+
+SEARCH_TARGETS = {
+    "requests": SearchTarget("requests", MaintenanceRequest, ["subject", "worksheet_notes"]),
+    "equipment": SearchTarget("equipment", Equipment, ["name", "serial_number", "location", "employee"], ["serial_number"]),
+}
+
+
+def postgresql_index_statements(target: SearchTarget, concurrently: bool = False, trigram: bool = True) -> List[str]:
+    how = "CONCURRENTLY " if concurrently else ""
+    statements = [
+        f"ALTER TABLE {target.table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('simple'::regconfig, {target.document})) STORED",
+        f"CREATE INDEX {how}IF NOT EXISTS ix_{target.table}_search_vector ON {target.table} USING gin (search_vector)",
+    ]
+    if trigram:
+        statements.append(
+            f"CREATE INDEX {how}IF NOT EXISTS ix_{target.table}_search_trgm ON {target.table} "
+            f"USING gin (({target.document}) gin_trgm_ops)"
+        )
+    for name in target.prefix_columns:
+        statements.append(
+            f"CREATE INDEX {how}IF NOT EXISTS {_prefix_index(target, name)} ON {target.table} "
+            f"(lower({name}) text_pattern_ops)"
+        )
+    return statements
+
+
+def sqlite_fts_statements(target: SearchTarget) -> List[str]:
+    names = ", ".join(target.columns)
+    new_values = ", ".join(f"new.{name}" for name in target.columns)
+    old_values = ", ".join(f"old.{name}" for name in target.columns)
+    fts = target.fts_table
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, "
+        f"content='{target.table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {target.table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {target.table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {names} ON {target.table} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def _prefix_index(target: SearchTarget, name: str) -> str:
+    return f"ix_{target.table}_{name}_prefix"
+
+
+def detect_search_indexes(engine: Engine) -> Dict[str, Set[str]]:
+    """Look up which search structures exist; runs no DDL"""
+    global _available
+    found = {target.table: set() for target in SEARCH_TARGETS.values()}
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            vectors = set(connection.execute(text(
+                "SELECT table_name FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND column_name = 'search_vector'"
+            )).scalars())
+            indexes = set(connection.execute(text(
+                "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()"
+            )).scalars())
+            for target in SEARCH_TARGETS.values():
+                if target.table in vectors:
+                    found[target.table].add("vector")
+                if f"ix_{target.table}_search_trgm" in indexes:
+                    found[target.table].add("trigram")
+                if target.prefix_columns and all(_prefix_index(target, name) in indexes for name in target.prefix_columns):
+                    found[target.table].add("prefix")
+        elif engine.dialect.name == "sqlite":
+            tables = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars())
+            for target in SEARCH_TARGETS.values():
+                if target.fts_table in tables:
+                    found[target.table].add("fts")
+    missing = [table for table, features in found.items() if not features & {"vector", "fts"}]
+    if missing and engine.dialect.name in ("postgresql", "sqlite"):
+        logger.warning(f"No search index on {', '.join(missing)}; search scans them with ILIKE until add_search_indexes.py is run")
+    _available = found
+    return found
+
+
+def _select_list(target: SearchTarget) -> str:
+    # Listed explicitly: the typed result below is matched by position
+    return ", ".join(f"{target.table}.{name}" for name in target.model.__table__.columns.keys())
+
+
+def _typed(sql: str, target: SearchTarget):
+    return text(sql).columns(*target.model.__table__.columns, column("rank", Float))
+
+
+def _postgresql_query(target: SearchTarget, features: Set[str]):
+    document = target.document
+    rank = "ts_rank(search_vector, websearch_to_tsquery('simple', :q))"
+    condition = "search_vector @@ websearch_to_tsquery('simple', :q)"
+    if "trigram" in features:
+        rank += f" + word_similarity(:q, {document})"
+        condition += f" OR :q <% ({document})"
+    if "prefix" in features:
+        for name in target.prefix_columns:
+            prefix_match = f"lower({name}) LIKE :prefix ESCAPE '\\'"
+            rank += f" + CASE WHEN {prefix_match} THEN 1 ELSE 0 END"
+            condition += f" OR {prefix_match}"
+    # The newest matches are picked with the id index, then only those are
+    # ranked; ties keep id order so pages are stable
+    names = ", ".join(target.model.__table__.columns.keys())
+    return _typed(f"""
+        SELECT {names}, {rank} AS rank FROM (
+            SELECT {_select_list(target)}, search_vector
+            FROM {target.table}
+            WHERE {condition}
+            ORDER BY id DESC
+            LIMIT :candidates
+        ) AS candidates
+        ORDER BY rank DESC, id
+        LIMIT :limit
+    """, target)
+
+
+def _fts5_match(q: str) -> Optional[str]:
+    """Quote every term as an FTS5 phrase (implicit AND); None if a term is too short for trigrams"""
+    terms = q.split()
+    if not terms or any(len(term) < 3 for term in terms):
+        return None
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _sqlite_query(target: SearchTarget, match: Optional[str]):
+    fts = target.fts_table
+    if match is None:
+        condition = " OR ".join(f"{fts}.{name} LIKE :like" for name in target.columns)
+        rank = "0.0"
+        order = f"{target.table}.id"
+    else:
+        condition, rank, order = f"{fts} MATCH :match", f"-bm25({fts})", f"bm25({fts}), {target.table}.id"
+    return _typed(f"""
+        SELECT {_select_list(target)}, {rank} AS rank FROM {fts} JOIN {target.table} ON {target.table}.id = {fts}.rowid
+        WHERE {condition} ORDER BY {order} LIMIT :limit
+    """, target)
+
+
+def _like_prefix(q: str) -> str:
+    escaped = q.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def _search_target(session: Session, target: SearchTarget, q: str, limit: int) -> List[dict]:
+    bind = session.get_bind()
+    features = (_available if _available is not None else detect_search_indexes(bind))[target.table]
+    if "vector" in features:
+        statement = _postgresql_query(target, features)
+        params = {"q": q, "prefix": _like_prefix(q), "candidates": max(SEARCH_CANDIDATES, limit), "limit": limit}
+    elif "fts" in features:
+        match = _fts5_match(q)
+        statement = _sqlite_query(target, match)
+        params = {"match": match, "like": f"%{q}%", "limit": limit}
+    else:
+        table = target.model.__table__
+        statement = (
+            select(table, literal_column("0.0", Float).label("rank"))
+            .where(or_(*(table.c[name].ilike(f"%{q}%") for name in target.columns)))
+            .order_by(table.c.id).limit(limit)
+        )
+        params = {}
+    rows = session.execute(statement, params).mappings().all()
+    return [
+        {"type": target.entity, "id": row["id"], "rank": row["rank"],
+         "data": {name: row[name] for name in target.model.__table__.columns.keys()}}
+        for row in rows
+    ]
+
+
+def search(session: Session, q: str, entities: List[str], limit: int, offset: int) -> dict:
+    """
+    Best matches across `entities`, highest rank first. Each target returns
+    its top offset+limit rows, which are merged and sliced to the page.
+    """
+    window = offset + limit
+    found = []
+    has_more = False
+    for entity in entities:
+        rows = _search_target(session, SEARCH_TARGETS[entity], q, window + 1)
+        has_more = has_more or len(rows) > window
+        found.extend(rows[:window])
+    found.sort(key=lambda result: (-result["rank"], result["type"], result["id"]))
+    has_more = has_more or len(found) > window
+    return {
+        "query": q,
+        "results": found[offset:window],
+        "next_offset": window if has_more and window < MAX_SEARCH_OFFSET else None,
+    }
@@ -0,0 +1,82 @@
+"""
+Delta sync: rows changed (updated_at) or deleted (Tombstone) since a client token.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import union_all
+from sqlmodel import Session, select, func, delete
+from models import Team, Technician, Equipment, MaintenanceRequest, WorkCenter, EquipmentCategory, Tombstone
+
+# Keys match the /api/bootstrap payload so clients can merge either response
+SYNC_MODELS = {
+    "equipment": Equipment,
+    "teams": Team,
+    "technicians": Technician,
+    "work_centers": WorkCenter,
+    "equipment_categories": EquipmentCategory,
+    "requests": MaintenanceRequest,
+}
+
+# Rows stamped just before the token may belong to transactions that had not
+# committed yet when the token was issued, so every sync re-reads this window.
+# Clients apply changes as idempotent upserts, so the overlap is harmless.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# Tombstones older than this are pruned; older tokens require a full reload.
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+
+def encode_token(moment: datetime) -> str:
+    return moment.isoformat()
+
+
+def decode_token(token: str) -> datetime:
+    try:
+        return datetime.fromisoformat(token)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+
+def current_token(session: Session) -> str:
+    """Token covering everything currently in the database: the latest change or deletion"""
+    # One statement: the newest stamp of every table, combined with UNION ALL
+    stamps = [select(func.max(model.updated_at).label("moment")) for model in SYNC_MODELS.values()]
+    stamps.append(select(func.max(Tombstone.deleted_at).label("moment")))
+    combined = union_all(*stamps).subquery()
+    latest = session.exec(select(func.max(combined.c.moment))).one()
+    return encode_token(latest if latest is not None else datetime.min)
+
+
+def changes_since(session: Session, since: Optional[str]) -> dict:
+    if since is None:
+        return {"full_resync": True, "token": current_token(session)}
+
+    since_at = decode_token(since)
+    if since_at < datetime.utcnow() - TOMBSTONE_RETENTION:
+        return {"full_resync": True, "token": current_token(session)}
+
+    window_start = since_at - SYNC_OVERLAP
+    newest = since_at
+    changed = {}
+    for key, model in SYNC_MODELS.items():
+        rows = session.exec(select(model).where(model.updated_at > window_start)).all()
+        changed[key] = rows
+        for row in rows:
+            newest = max(newest, row.updated_at)
+
+    deleted = {key: [] for key in SYNC_MODELS}
+    table_keys = {model.__tablename__: key for key, model in SYNC_MODELS.items()}
+    tombstones = session.exec(select(Tombstone).where(Tombstone.deleted_at > window_start)).all()
+    for tombstone in tombstones:
+        key = table_keys.get(tombstone.table_name)
+        if key is not None:
+            deleted[key].append(tombstone.row_id)
+        newest = max(newest, tombstone.deleted_at)
+
+    return {"full_resync": False, "token": encode_token(newest), "changed": changed, "deleted": deleted}
+
+
+def prune_tombstones(session: Session):
+    session.exec(delete(Tombstone).where(Tombstone.deleted_at < datetime.utcnow() - TOMBSTONE_RETENTION))
+    session.commit()
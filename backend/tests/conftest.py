@@ -0,0 +1,77 @@
+"""
+Shared fixtures: the app runs in-process on a throwaway SQLite database
+(or on DATABASE_URL when TEST_DATABASE_URL is set), seeded by the normal
+startup, with an admin session.
+"""
+import itertools
+import os
+import sys
+import tempfile
+from datetime import date
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = os.getenv(
+    "TEST_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='gearguard-tests-'), 'test.db')}"
+)
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session
+from database import engine
+from main import app
+
+_serials = itertools.count(1)
+
+if engine.dialect.name == "sqlite":
+    # Enforce foreign keys like PostgreSQL does, so constraint failures
+    # (e.g. in bulk inserts) behave the same on both
+    @event.listens_for(engine, "connect")
+    def _enable_foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys = ON")
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def auth(client):
+    response = client.post("/api/auth/login", data={"username": "admin@gearguard.com", "password": "admin123"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def session():
+    with Session(engine) as db_session:
+        yield db_session
+
+
+@pytest.fixture
+def make_equipment(client, auth):
+    def make(**fields):
+        body = {
+            "name": "Test Press", "serial_number": f"TEST/{next(_serials)}", "purchase_date": "2024-01-15",
+            "location": "Hall A", "department": "Production", "employee": "Tester",
+            **fields,
+        }
+        response = client.post("/api/equipment", json=body, headers=auth)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return make
+
+
+@pytest.fixture
+def make_request(client, auth, make_equipment):
+    def make(**fields):
+        if "equipment_id" not in fields:
+            fields["equipment_id"] = make_equipment()["id"]
+        body = {"subject": "Test request", "type": "Corrective", "scheduled_date": date.today().isoformat(), **fields}
+        response = client.post("/api/requests", json=body, headers=auth)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return make
@@ -0,0 +1,50 @@
+import pytest
+from board import STAGES
+
+
+def test_columns_carry_counts_and_first_cards(client, auth, make_request):
+    for _ in range(3):
+        make_request(company="Board Co")
+    moved = make_request(company="Board Co")
+    client.put(f"/api/requests/{moved['id']}/stage", params={"stage": "In Progress"}, headers=auth)
+
+    columns = {column["stage"]: column for column in client.get(
+        "/api/requests/board", params={"company": "Board Co", "limit": 2}).json()["columns"]}
+    assert list(columns) == STAGES
+    assert {stage: column["count"] for stage, column in columns.items()} == {"New": 3, "In Progress": 1, "Repaired": 0, "Scrap": 0}
+    assert len(columns["New"]["cards"]) == 2
+    assert columns["New"]["next_cursor"] is not None
+    assert columns["In Progress"]["next_cursor"] is None
+
+
+@pytest.mark.parametrize("sort", ["date", "priority", "none"])
+def test_column_cursor_walks_every_card_once(client, make_request, sort):
+    company = f"Cursor Co {sort}"
+    created = [make_request(company=company, scheduled_date=f"2024-04-0{day}", priority=priority)["id"]
+               for day, priority in [(3, "Low"), (1, "High"), (2, "Medium"), (1, "Low"), (2, "High")]]
+
+    seen, cursor = [], None
+    while True:
+        params = {"company": company, "stage": "New", "sort": sort, "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        column = client.get("/api/requests/board", params=params).json()
+        seen += [card["id"] for card in column["cards"]]
+        cursor = column["next_cursor"]
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(created)
+    assert len(seen) == len(created)
+
+
+def test_bad_cursor(client):
+    assert client.get("/api/requests/board", params={"stage": "New", "cursor": "nonsense"}).status_code == 400
+
+
+def test_column_reload_carries_its_count(client, make_request):
+    for _ in range(3):
+        make_request(company="Reload Co")
+    column = client.get("/api/requests/board", params={"company": "Reload Co", "stage": "New", "limit": 2}).json()
+    assert (len(column["cards"]), column["count"]) == (2, 3)
+    more = client.get("/api/requests/board", params={"company": "Reload Co", "stage": "New", "cursor": column["next_cursor"]}).json()
+    assert "count" not in more
@@ -0,0 +1,28 @@
+from datetime import datetime
+from unittest import mock
+import main
+from querylog import count_queries
+
+
+def test_unchanged_bootstrap_is_answered_with_304_before_loading(client, make_request):
+    make_request()
+    # Past the sync overlap the token is final, so the ETag can be reused
+    with mock.patch.object(main, "datetime", wraps=datetime) as clock:
+        clock.utcnow.return_value = datetime.utcnow() + main.SYNC_OVERLAP * 2
+        first = client.get("/api/bootstrap")
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+
+        with count_queries(main.engine) as counter:
+            repeat = client.get("/api/bootstrap", headers={"If-None-Match": etag})
+        assert repeat.status_code == 304
+        assert counter.count == 1
+
+        other_params = client.get("/api/bootstrap", params={"active_only": "false"}, headers={"If-None-Match": etag})
+        assert other_params.status_code == 200
+
+
+def test_write_changes_bootstrap_etag(client, make_request):
+    etag = client.get("/api/bootstrap").headers["ETag"]
+    make_request()
+    assert client.get("/api/bootstrap", headers={"If-None-Match": etag}).status_code == 200
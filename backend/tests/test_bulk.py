@@ -0,0 +1,69 @@
+MISSING_ID = 10 ** 9
+
+
+def create(subject, **data):
+    return {"op": "create", "data": {"subject": subject, "type": "Corrective", "scheduled_date": "2024-03-01", **data}}
+
+
+def bulk(client, auth, mode, operations):
+    return client.post("/api/requests/bulk", json={"mode": mode, "operations": operations}, headers=auth)
+
+
+def subjects(client, equipment_id):
+    return [row["subject"] for row in client.get("/api/requests", params={"equipment_id": equipment_id}).json()]
+
+
+def test_atomic_batch_commits_everything(client, auth, make_equipment, make_request):
+    equipment = make_equipment()
+    existing = make_request(equipment_id=equipment["id"])
+    response = bulk(client, auth, "atomic", [
+        create("A", equipment_id=equipment["id"]),
+        {"op": "update", "id": existing["id"], "data": {"priority": "High"}, "version": existing["version"]},
+        {"op": "stage", "id": existing["id"], "stage": "In Progress"},
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert body["committed"] is True
+    assert [result["status"] for result in body["results"]] == [201, 200, 200]
+    assert sorted(subjects(client, equipment["id"])) == ["A", existing["subject"]]
+
+
+def test_atomic_validation_failure_writes_nothing(client, auth, make_equipment):
+    equipment = make_equipment()
+    response = bulk(client, auth, "atomic", [
+        create("A", equipment_id=equipment["id"]),
+        create("B", equipment_id=equipment["id"], scheduled_date="2024-13-01"),
+    ])
+    assert response.status_code == 409
+    assert [result["status"] for result in response.json()["results"]] == [424, 422]
+    assert subjects(client, equipment["id"]) == []
+
+
+def test_atomic_insert_failure_blames_only_the_failing_create(client, auth, make_equipment):
+    equipment = make_equipment()
+    response = bulk(client, auth, "atomic", [
+        create("A", equipment_id=equipment["id"]),
+        create("B", equipment_id=MISSING_ID),
+        create("C", equipment_id=equipment["id"]),
+    ])
+    assert response.status_code == 409
+    assert [result["status"] for result in response.json()["results"]] == [424, 409, 424]
+    assert subjects(client, equipment["id"]) == []
+
+
+def test_best_effort_keeps_the_items_that_worked(client, auth, make_equipment, make_request):
+    equipment = make_equipment()
+    existing = make_request(equipment_id=equipment["id"])
+    response = bulk(client, auth, "best_effort", [
+        create("A", equipment_id=equipment["id"]),
+        create("B", equipment_id=MISSING_ID),
+        {"op": "update", "id": existing["id"], "data": {"priority": "High"}, "version": existing["version"] + 5},
+        {"op": "stage", "id": existing["id"], "stage": "Repaired"},
+        {"op": "stage", "id": MISSING_ID, "stage": "Repaired"},
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert body["committed"] is True
+    assert [result["status"] for result in body["results"]] == [201, 409, 412, 200, 404]
+    assert (body["succeeded"], body["failed"]) == (2, 3)
+    assert sorted(subjects(client, equipment["id"])) == ["A", existing["subject"]]
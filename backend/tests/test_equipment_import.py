@@ -0,0 +1,94 @@
+import itertools
+import json
+import pytest
+
+_serials = itertools.count(1)
+HEADER = "name,serial_number,purchase_date,warranty,location,department,employee,company\n"
+
+
+def import_csv(client, auth, body):
+    response = client.post("/api/equipment/import", content=body, headers={**auth, "Content-Type": "text/csv"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def stored(client, serial):
+    found = client.post("/api/equipment/lookup", json={"serials": [serial]}).json()["found"]
+    return found[0] if found else None
+
+
+@pytest.fixture
+def serial():
+    return f"IMP/{next(_serials)}"
+
+
+def test_import_creates_then_updates_by_serial(client, auth, serial):
+    report = import_csv(client, auth, HEADER + f"Lathe,{serial},2023-05-01,2025-05-01,Hall B,Machining,Ann,Acme\n")
+    assert (report["rows"], report["imported"], report["rejected"]) == (1, 1, 0)
+    created = stored(client, serial)
+
+    import_csv(client, auth, HEADER + f"Lathe Mk2,{serial},2023-05-01,2026-05-01,Hall C,Machining,Ann,Acme\n")
+    updated = stored(client, serial)
+    assert updated["id"] == created["id"]
+    assert (updated["name"], updated["warranty"], updated["location"]) == ("Lathe Mk2", "2026-05-01", "Hall C")
+
+
+def test_blank_cells_keep_stored_values(client, auth, serial):
+    import_csv(client, auth, HEADER + f"Drill,{serial},2023-05-01,2025-05-01,Hall B,Machining,Ann,Acme\n")
+    import_csv(client, auth, HEADER + f"Drill,{serial},2023-05-01,,Hall D,Machining,Ann,\n")
+
+    row = stored(client, serial)
+    assert row["location"] == "Hall D"
+    assert row["warranty"] == "2025-05-01"
+    assert row["company"] == "Acme"
+
+
+def test_ndjson_nulls_keep_stored_values(client, auth, serial):
+    import_csv(client, auth, HEADER + f"Saw,{serial},2023-05-01,2025-05-01,Hall B,Machining,Ann,Acme\n")
+    record = {"name": "Saw", "serial_number": serial, "purchase_date": "2023-05-01", "warranty": None,
+              "location": "Yard", "department": "Machining", "employee": "Ann", "company": None}
+    response = client.post("/api/equipment/import", content=json.dumps(record) + "\n",
+                           headers={**auth, "Content-Type": "application/x-ndjson"})
+    assert response.json()["imported"] == 1
+
+    row = stored(client, serial)
+    assert (row["location"], row["warranty"], row["company"]) == ("Yard", "2025-05-01", "Acme")
+
+
+def test_invalid_rows_are_reported_and_skipped(client, auth, serial):
+    report = import_csv(client, auth, HEADER + f"Good,{serial},2023-05-01,2024-05-01,Hall A,Ops,Bo,\n"
+                                               f"Bad,{serial}-bad,not-a-date,2024-05-01,Hall A,Ops,Bo,\n")
+    assert (report["imported"], report["rejected"]) == (1, 1)
+    assert report["errors"][0]["line"] == 3
+    assert stored(client, f"{serial}-bad") is None
+
+
+def test_partial_reimport_of_existing_serial(client, auth, serial):
+    import_csv(client, auth, HEADER + f"Mill,{serial},2023-05-01,2025-05-01,Hall B,Machining,Ann,Acme\n")
+
+    report = import_csv(client, auth, f"serial_number,health\n{serial},55\n")
+    assert (report["imported"], report["rejected"]) == (1, 0)
+    report = import_csv(client, auth, f"name,serial_number,location,employee\n,{serial},,Bea\n")
+    assert (report["imported"], report["rejected"]) == (1, 0)
+
+    row = stored(client, serial)
+    assert (row["health"], row["employee"]) == (55, "Bea")
+    assert (row["name"], row["location"], row["purchase_date"], row["company"]) == ("Mill", "Hall B", "2023-05-01", "Acme")
+
+
+def test_new_serials_still_need_every_required_column(client, auth, serial):
+    existing = f"{serial}-old"
+    import_csv(client, auth, HEADER + f"Mill,{existing},2023-05-01,,Hall B,Machining,Ann,\n")
+
+    report = import_csv(client, auth, f"serial_number,health\n{existing},70\n{serial},70\n")
+    assert (report["imported"], report["rejected"]) == (1, 1)
+    assert report["errors"][0]["line"] == 3
+    assert stored(client, existing)["health"] == 70
+    assert stored(client, serial) is None
+
+
+def test_partial_row_is_still_validated(client, auth, serial):
+    import_csv(client, auth, HEADER + f"Mill,{serial},2023-05-01,,Hall B,Machining,Ann,\n")
+    report = import_csv(client, auth, f"serial_number,purchase_date\n{serial},someday\n")
+    assert (report["imported"], report["rejected"]) == (0, 1)
+    assert stored(client, serial)["purchase_date"] == "2023-05-01"
@@ -0,0 +1,51 @@
+import pytest
+from sqlmodel import Session, text
+from database import engine
+from metrics import RequestStats, current_request
+from querylog import N_PLUS_ONE_THRESHOLD, assert_max_queries, repeated_statements
+
+pytestmark = pytest.mark.skipif(not N_PLUS_ONE_THRESHOLD, reason="N+1 check turned off")
+
+
+def shapes_of(run):
+    stats = RequestStats({"method": "GET"})
+    token = current_request.set(stats)
+    try:
+        with Session(engine) as session:
+            run(session)
+    finally:
+        current_request.reset(token)
+    return stats.shapes
+
+
+def test_select_repeated_with_different_parameters_is_flagged():
+    shapes = shapes_of(lambda session: [session.execute(text("SELECT :n"), {"n": n}).all() for n in range(N_PLUS_ONE_THRESHOLD)])
+    assert repeated_statements(shapes, "/api/anything")
+
+
+def test_identical_repeats_and_batch_routes_are_not_flagged():
+    same = shapes_of(lambda session: [session.execute(text("SELECT :n"), {"n": 1}).all() for _ in range(N_PLUS_ONE_THRESHOLD)])
+    assert repeated_statements(same, "/api/anything") == []
+
+    varied = shapes_of(lambda session: [session.execute(text("SELECT :n"), {"n": n}).all() for n in range(N_PLUS_ONE_THRESHOLD)])
+    assert repeated_statements(varied, "/api/requests/bulk") == []
+
+
+def test_writes_and_executemany_are_not_counted():
+    def run(session):
+        session.execute(text("CREATE TEMP TABLE IF NOT EXISTS querylog_probe (n integer)"))
+        for n in range(N_PLUS_ONE_THRESHOLD):
+            session.execute(text("INSERT INTO querylog_probe (n) VALUES (:n)"), {"n": n})
+        session.execute(text("INSERT INTO querylog_probe (n) VALUES (:n)"), [{"n": n} for n in range(N_PLUS_ONE_THRESHOLD)])
+        session.rollback()
+    assert shapes_of(run) == {}
+
+
+def test_assert_max_queries(client):
+    with assert_max_queries(engine, 1, "GET /api/requests"):
+        client.get("/api/requests")
+    with pytest.raises(AssertionError, match="ran 2 queries, expected at most 1"):
+        with assert_max_queries(engine, 1, "two statements"):
+            with Session(engine) as session:
+                session.execute(text("SELECT 1"))
+                session.execute(text("SELECT 2"))
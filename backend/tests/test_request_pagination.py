@@ -0,0 +1,30 @@
+def test_keyset_pages_cover_every_row_once(client, make_request):
+    created = [make_request(company="Keyset Co")["id"] for _ in range(5)]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"company": "Keyset Co", "limit": 2}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = client.get("/api/requests", params=params)
+        assert response.status_code == 200
+        seen += [row["id"] for row in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert seen == sorted(created)
+    assert pages == 3
+
+
+def test_filters_are_applied_in_sql(client, make_request):
+    keep = make_request(company="Filter Co", priority="High")
+    make_request(company="Filter Co", priority="Low")
+
+    response = client.get("/api/requests", params={"company": "Filter Co", "priority": "High"})
+    assert [row["id"] for row in response.json()] == [keep["id"]]
+
+
+def test_invalid_limit_is_rejected(client):
+    assert client.get("/api/requests", params={"limit": 0}).status_code == 422
@@ -0,0 +1,33 @@
+from sqlmodel import delete
+from models import RequestRollup
+from rollups import rebuild_rollups, verify_rollups
+
+
+def test_rollups_follow_every_kind_of_write(client, auth, session, make_request):
+    moved = make_request(company="Rollup Co")
+    edited = make_request(company="Rollup Co", type="Preventive")
+    removed = make_request(company="Rollup Co")
+
+    assert client.put(f"/api/requests/{moved['id']}/stage", params={"stage": "In Progress"}, headers=auth).status_code == 200
+    team_id = client.get("/api/teams").json()[0]["id"]
+    response = client.put(f"/api/requests/{edited['id']}", json={"type": "Corrective", "company": "Other Co", "team_id": team_id},
+                          headers=auth)
+    assert response.status_code == 200
+    assert client.delete(f"/api/requests/{removed['id']}", headers=auth).status_code == 200
+    response = client.post("/api/requests/bulk", headers=auth, json={"operations": [
+        {"op": "create", "data": {"subject": "Bulk", "type": "Corrective", "scheduled_date": "2024-03-01"}},
+        {"op": "stage", "id": moved["id"], "stage": "Repaired"},
+    ]})
+    assert response.status_code == 200, response.text
+
+    assert verify_rollups(session) == []
+
+
+def test_rebuild_repairs_drift(session, make_request):
+    make_request()
+    session.exec(delete(RequestRollup))
+    session.commit()
+    assert verify_rollups(session)
+
+    rebuild_rollups(session)
+    assert verify_rollups(session) == []
@@ -0,0 +1,41 @@
+import pytest
+import search
+from add_search_indexes import add_search_indexes
+from database import engine
+
+
+@pytest.fixture(scope="module", params=["indexed", "unindexed"])
+def search_mode(request, client):
+    """Search with the structures from add_search_indexes.py, and without them (ILIKE fallback)"""
+    if request.param == "indexed":
+        add_search_indexes()
+        search.detect_search_indexes(engine)
+    else:
+        search._available = {target.table: set() for target in search.SEARCH_TARGETS.values()}
+    yield request.param
+    search.detect_search_indexes(engine)
+
+
+def results(client, q, **params):
+    response = client.get("/api/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_finds_equipment_by_serial_prefix(client, search_mode, make_equipment):
+    equipment = make_equipment(name="Spindle Grinder", serial_number=f"SRCH/{search_mode}/4471")
+    found = results(client, f"SRCH/{search_mode}/44", types="equipment")["results"]
+    assert [row["id"] for row in found] == [equipment["id"]]
+
+
+def test_pages_are_stable_and_disjoint(client, search_mode, make_request):
+    word = f"flywheel{search_mode}"
+    created = {make_request(subject=f"{word} check {index}")["id"] for index in range(5)}
+
+    first = results(client, word, types="requests", limit=3)
+    again = results(client, word, types="requests", limit=3)
+    assert first["results"] == again["results"]
+    second = results(client, word, types="requests", limit=3, offset=first["next_offset"])
+    ids = [row["id"] for row in first["results"] + second["results"]]
+    assert sorted(ids) == sorted(created)
+    assert second["next_offset"] is None
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+from sync import decode_token, encode_token
+
+
+def test_without_token_asks_for_full_resync(client):
+    body = client.get("/api/sync").json()
+    assert body["full_resync"] is True
+    assert decode_token(body["token"])
+
+
+def test_changes_and_tombstones_since_token(client, auth, make_request):
+    token = client.get("/api/sync").json()["token"]
+    kept = make_request()
+    removed = make_request()
+    assert client.delete(f"/api/requests/{removed['id']}", headers=auth).status_code == 200
+
+    body = client.get("/api/sync", params={"since": token}).json()
+    assert body["full_resync"] is False
+    changed = [row["id"] for row in body["changed"]["requests"]]
+    assert kept["id"] in changed
+    assert removed["id"] not in changed
+    assert removed["id"] in body["deleted"]["requests"]
+    assert decode_token(body["token"]) >= decode_token(token)
+
+
+def test_token_moves_forward_with_writes(client, make_request):
+    before = decode_token(client.get("/api/sync").json()["token"])
+    make_request()
+    after = decode_token(client.get("/api/sync").json()["token"])
+    assert after > before
+
+
+def test_expired_token_asks_for_full_resync(client):
+    old = encode_token(datetime.utcnow() - timedelta(days=365))
+    assert client.get("/api/sync", params={"since": old}).json()["full_resync"] is True
@@ -0,0 +1,67 @@
+def move(client, auth, request_id, stage, expected_stage=None):
+    params = {"stage": stage}
+    if expected_stage is not None:
+        params["expected_stage"] = expected_stage
+    return client.put(f"/api/requests/{request_id}/stage", params=params, headers=auth)
+
+
+def equipment_status(client, equipment_id):
+    return client.post("/api/equipment/lookup", json={"ids": [equipment_id]}).json()["found"][0]["status"]
+
+
+def test_allowed_moves(client, auth, make_request):
+    request = make_request()
+    assert move(client, auth, request["id"], "Repaired").json()["stage"] == "Repaired"
+    assert move(client, auth, request["id"], "New").status_code == 400
+    assert move(client, auth, request["id"], "Closed").status_code == 400
+
+
+def test_stale_expected_stage_conflicts(client, auth, make_request):
+    request = make_request()
+    assert move(client, auth, request["id"], "In Progress", expected_stage="New").status_code == 200
+    response = move(client, auth, request["id"], "Repaired", expected_stage="New")
+    assert response.status_code == 409
+    assert client.get("/api/requests", params={"equipment_id": request["equipment_id"]}).json()[0]["stage"] == "In Progress"
+
+
+def test_missing_request(client, auth):
+    assert move(client, auth, 10 ** 9, "Repaired").status_code == 404
+
+
+def test_scrap_and_restore_equipment(client, auth, make_equipment, make_request):
+    equipment = make_equipment()
+    first = make_request(equipment_id=equipment["id"])
+    second = make_request(equipment_id=equipment["id"])
+
+    move(client, auth, first["id"], "Scrap")
+    move(client, auth, second["id"], "Scrap")
+    assert equipment_status(client, equipment["id"]) == "scrapped"
+
+    # Still scrapped while another request keeps it in Scrap
+    assert move(client, auth, first["id"], "Repaired").status_code == 200
+    assert equipment_status(client, equipment["id"]) == "scrapped"
+
+    assert move(client, auth, second["id"], "Repaired").status_code == 200
+    assert equipment_status(client, equipment["id"]) == "operational"
+
+
+def test_plain_updates_cannot_change_stage(client, auth, make_equipment, make_request):
+    equipment = make_equipment()
+    request = make_request(equipment_id=equipment["id"])
+
+    response = client.put(f"/api/requests/{request['id']}", json={"stage": "Scrap"}, headers=auth)
+    assert response.status_code == 422
+    response = client.post("/api/requests/bulk", headers=auth, json={"mode": "best_effort", "operations": [
+        {"op": "update", "id": request["id"], "data": {"stage": "Scrap"}},
+    ]})
+    assert response.json()["results"][0]["status"] == 422
+
+    assert client.get("/api/requests", params={"equipment_id": equipment["id"]}).json()[0]["stage"] == "New"
+    assert equipment_status(client, equipment["id"]) == "operational"
+
+
+def test_echoing_the_current_stage_is_allowed(client, auth, make_request):
+    request = make_request()
+    response = client.put(f"/api/requests/{request['id']}", json={"subject": "Echo", "stage": "New"}, headers=auth)
+    assert response.status_code == 200
+    assert (response.json()["subject"], response.json()["stage"]) == ("Echo", "New")
@@ -0,0 +1,37 @@
+def test_update_bumps_version_and_etag(client, auth, make_request):
+    request = make_request()
+    response = client.put(f"/api/requests/{request['id']}", json={"subject": "Renamed"},
+                          headers={**auth, "If-Match": f'"{request["version"]}"'})
+    assert response.status_code == 200
+    assert response.json()["version"] == request["version"] + 1
+    assert response.headers["ETag"] == f'"{request["version"] + 1}"'
+
+
+def test_stale_if_match_is_rejected(client, auth, make_request):
+    request = make_request()
+    stale = {**auth, "If-Match": f'"{request["version"]}"'}
+    assert client.put(f"/api/requests/{request['id']}", json={"subject": "First"}, headers=stale).status_code == 200
+
+    response = client.put(f"/api/requests/{request['id']}", json={"subject": "Second"}, headers=stale)
+    assert response.status_code == 412
+    assert client.get("/api/requests", params={"equipment_id": request["equipment_id"]}).json()[0]["subject"] == "First"
+
+
+def test_update_without_if_match_is_unconditional(client, auth, make_request):
+    request = make_request()
+    response = client.put(f"/api/requests/{request['id']}", json={"priority": "High"}, headers=auth)
+    assert response.status_code == 200
+    assert response.json()["subject"] == request["subject"]
+
+
+def test_malformed_if_match(client, auth, make_request):
+    request = make_request()
+    response = client.put(f"/api/requests/{request['id']}", json={"subject": "x"}, headers={**auth, "If-Match": "not-an-etag"})
+    assert response.status_code == 400
+
+
+def test_version_and_id_are_not_taken_from_the_body(client, auth, make_request):
+    request = make_request()
+    response = client.put(f"/api/requests/{request['id']}", json={"subject": "Kept", "version": 99, "id": 10 ** 9}, headers=auth)
+    assert response.json()["id"] == request["id"]
+    assert response.json()["version"] == request["version"] + 1
@@ -0,0 +1,104 @@
+"""
+Request stage transitions: the allowed moves, and an atomic compare-and-set
+that changes the stage only if the request is still in the expected stage.
+This is the only path that writes `stage`; plain updates refuse to change it
+(see without_stage).
+"""
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import exists, update
+from sqlmodel import Session, select
+from models import Equipment, MaintenanceRequest
+from rollups import RollupBatch, move_in_rollup, row_rollup_key
+
+# Adjacent moves on the board, closing a new request as repaired directly,
+# scrapping from any stage, and un-scrapping to Repaired
+ALLOWED_TRANSITIONS = {
+    "New": {"In Progress", "Repaired", "Scrap"},
+    "In Progress": {"New", "Repaired", "Scrap"},
+    "Repaired": {"In Progress", "Scrap"},
+    "Scrap": {"Repaired"},
+}
+
+
+def check_transition(from_stage: str, to_stage: str):
+    if to_stage not in ALLOWED_TRANSITIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown stage: {to_stage}")
+    if to_stage not in ALLOWED_TRANSITIONS.get(from_stage, ()):
+        raise HTTPException(status_code=400, detail=f"Cannot move a request from {from_stage} to {to_stage}")
+
+
+def without_stage(session: Session, request_id: int, values: dict) -> dict:
+    """
+    `values` for a plain request update, minus `stage`. Echoing the current
+    stage back is harmless; changing it skips the transition rules and the
+    equipment side effects, so that is refused with 422.
+    """
+    if "stage" not in values:
+        return values
+    stage = values["stage"]
+    current = session.exec(select(MaintenanceRequest.stage).where(MaintenanceRequest.id == request_id)).first()
+    # A missing request is left for the update itself to report (404)
+    if current is not None and stage != current:
+        raise HTTPException(status_code=422, detail=f"Move requests with PUT /api/requests/{request_id}/stage, not with an update")
+    return {key: value for key, value in values.items() if key != "stage"}
+
+
+def transition_stage(session: Session, request_id: int, stage: str, expected_stage: Optional[str] = None,
+                     rollups: Optional[RollupBatch] = None) -> Tuple[dict, Optional[dict]]:
+    """
+    Move a request to `stage` with one `UPDATE ... WHERE id = ? AND stage = ?
+    RETURNING *`. Scrapping also marks the equipment scrapped in the same
+    transaction, and moving out of Scrap makes it operational again unless
+    another of its requests is still scrapped. Does not commit; returns the updated request and equipment
+    (if any) as dicts so the caller can publish them without reloading.
+    Rollup moves go to `rollups` when given, otherwise straight to the table.
+
+    Raises 404 if the request does not exist and 409 if it has moved since the
+    caller saw it in `expected_stage`.
+    """
+    if expected_stage is None:
+        # No stage from the client: compare against what is stored now
+        expected_stage = session.exec(
+            select(MaintenanceRequest.stage).where(MaintenanceRequest.id == request_id)
+        ).first()
+        if expected_stage is None:
+            raise HTTPException(status_code=404, detail="Request not found")
+    check_transition(expected_stage, stage)
+
+    # Core updates skip the before_flush hook, so bump version and updated_at here
+    now = datetime.utcnow()
+    result = session.execute(
+        update(MaintenanceRequest)
+        .where(MaintenanceRequest.id == request_id, MaintenanceRequest.stage == expected_stage)
+        .values(stage=stage, version=MaintenanceRequest.version + 1, updated_at=now)
+        .returning(*MaintenanceRequest.__table__.columns)
+    ).mappings().first()
+    if result is None:
+        current = session.get(MaintenanceRequest, request_id)
+        if current is None:
+            raise HTTPException(status_code=404, detail="Request not found")
+        raise HTTPException(status_code=409, detail=f"Request is in {current.stage}, not {expected_stage}")
+    db_request = dict(result)
+
+    old_key, new_key = row_rollup_key({**db_request, "stage": expected_stage}), row_rollup_key(db_request)
+    if rollups is not None:
+        rollups.move(old_key, new_key)
+    else:
+        move_in_rollup(session, old_key, new_key)
+
+    equipment = None
+    equipment_id = db_request["equipment_id"]
+    if equipment_id is not None and "Scrap" in (stage, expected_stage):
+        statement = update(Equipment).where(Equipment.id == equipment_id)
+        if stage == "Scrap":
+            statement = statement.values(status="scrapped")
+        else:
+            still_scrapped = exists().where(MaintenanceRequest.equipment_id == equipment_id, MaintenanceRequest.stage == "Scrap")
+            statement = statement.where(Equipment.status == "scrapped", ~still_scrapped).values(status="operational")
+        row = session.execute(
+            statement.values(version=Equipment.version + 1, updated_at=now).returning(*Equipment.__table__.columns)
+        ).mappings().first()
+        equipment = dict(row) if row is not None else None
+    return db_request, equipment
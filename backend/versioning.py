@@ -0,0 +1,93 @@
+"""
+Optimistic concurrency: every editable row carries a version number that is
+exposed as its ETag, and updates are guarded with If-Match.
+"""
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlmodel import Session, SQLModel, select
+
+# Never taken from a request body
+PROTECTED_FIELDS = {"id", "version", "updated_at"}
+
+
+def version_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def if_match_version(if_match: Optional[str]) -> Optional[int]:
+    """Expected version from an If-Match header; None when absent or `*`"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be an ETag returned by this API")
+
+
+def changed_fields(body: SQLModel) -> dict:
+    """Fields the client actually sent, read straight off the unvalidated table model"""
+    return {key: getattr(body, key) for key in body.model_fields_set if key not in PROTECTED_FIELDS}
+
+
+def versioned_update(session: Session, model, row_id: int, values: dict, expected_version: Optional[int],
+                     old_columns: Sequence[str] = (), label: Optional[str] = None) -> Tuple[dict, dict]:
+    """
+    Apply `values` with a single
+    `UPDATE ... SET version = version + 1 WHERE id = ? AND version = ? RETURNING *`.
+    Without an expected version the update is unconditional.
+
+    `old_columns` are also returned as they were before the update, for callers
+    that maintain derived data such as rollups. On PostgreSQL they come from a
+    locked sub-select in the same statement; other databases cannot return
+    sub-select columns, so they are read first and the update becomes a
+    compare-and-set on the version that was read. Does not commit.
+
+    Raises 404 ("<label> not found") for a missing row and 412 when the row is
+    no longer at `expected_version`.
+    """
+    table = model.__table__
+    label = label or model.__name__
+    # Old values only differ from the returned ones for columns being changed
+    changing = [name for name in old_columns if name in values]
+    old_values = {}
+
+    if changing and session.get_bind().dialect.name != "postgresql":
+        current = session.exec(select(model.version, *(getattr(model, name) for name in changing)).where(model.id == row_id)).first()
+        if current is None:
+            raise HTTPException(status_code=404, detail=f"{label} not found")
+        if expected_version is not None and current.version != expected_version:
+            _precondition_failed(label, current.version, expected_version)
+        expected_version = current.version
+        old_values = {name: current._mapping[name] for name in changing}
+        changing = []
+
+    statement = update(model).values(**values, version=model.version + 1, updated_at=datetime.utcnow())
+    returning = list(table.columns)
+    if changing:
+        old = select(model.id, *(getattr(model, name) for name in changing)).where(model.id == row_id).with_for_update().subquery("old")
+        statement = statement.where(model.id == old.c.id)
+        returning += [old.c[name].label(f"old_{name}") for name in changing]
+    else:
+        statement = statement.where(model.id == row_id)
+    if expected_version is not None:
+        statement = statement.where(model.version == expected_version)
+
+    row = session.execute(statement.returning(*returning)).mappings().first()
+    if row is None:
+        current = session.exec(select(model.version).where(model.id == row_id)).first()
+        if current is None:
+            raise HTTPException(status_code=404, detail=f"{label} not found")
+        _precondition_failed(label, current, expected_version)
+    new = {column.name: row[column.name] for column in table.columns}
+    old_values.update({name: row[f"old_{name}"] for name in changing})
+    return new, {name: old_values.get(name, new[name]) for name in old_columns}
+
+
+def _precondition_failed(label: str, current: int, expected: Optional[int]):
+    raise HTTPException(
+        status_code=412,
+        detail=f"{label} was modified (version {current}, expected {expected})",
+        headers={"ETag": version_etag(current)},
+    )
@@ -6,7 +6,7 @@ import StageProgressBar from './StageProgressBar';
 
 export default function RequestModal({ isOpen, onClose, request, initialDate }) {
     const { user } = useAuth();
-    const { equipment, teams, technicians, workCenters, addRequest, updateRequest, deleteRequest, getTechnicianLoad } = useMaintenance();
+    const { equipment, teams, technicians, workCenters, addRequest, updateRequest, deleteRequest } = useMaintenance();
     const [targetType, setTargetType] = useState('equipment'); // 'equipment' or 'workcenter'
 
     const [formData, setFormData] = useState({
@@ -24,6 +24,45 @@ export default function RequestModal({ isOpen, onClose, request, initialDate })
 
     const [showWorksheet, setShowWorksheet] = useState(false);
 
+    // Equipment is picked by typing or scanning a serial number / name;
+    // suggestions come from the server-side prefix index
+    const [equipmentQuery, setEquipmentQuery] = useState('');
+    const [suggestions, setSuggestions] = useState([]);
+    // Typed text is only a search; the request needs an equipment picked from the suggestions
+    const [equipmentError, setEquipmentError] = useState('');
+
+    const searchEquipment = (value) => {
+        setEquipmentQuery(value);
+        setFormData(prev => ({ ...prev, equipment_id: '' }));
+        if (!value.trim()) {
+            setSuggestions([]);
+            return;
+        }
+        fetch(`http://127.0.0.1:8001/api/equipment/autocomplete?q=${encodeURIComponent(value)}&limit=8`)
+            .then(res => res.json())
+            .then(setSuggestions)
+            .catch(error => console.error("Error fetching equipment suggestions:", error));
+    };
+
+    // Technician load comes from the server aggregate, not the (capped) request list
+    const [workload, setWorkload] = useState([]);
+    useEffect(() => {
+        if (!isOpen) return;
+        fetch('http://127.0.0.1:8001/api/technicians/workload')
+            .then(res => res.json())
+            .then(setWorkload)
+            .catch(error => console.error("Error fetching technician workload:", error));
+    }, [isOpen]);
+
+    const technicianLoad = (techId) => workload.find(w => w.technician_id === techId)?.load_percentage || 0;
+
+    const pickEquipment = (item) => {
+        setEquipmentQuery(`${item.name} (${item.serial_number})`);
+        setSuggestions([]);
+        setEquipmentError('');
+        setFormData(prev => ({ ...prev, equipment_id: item.id, team_id: item.team_id, technician_id: item.technician_id }));
+    };
+
     useEffect(() => {
         if (request) {
             setFormData({
@@ -40,6 +79,8 @@ export default function RequestModal({ isOpen, onClose, request, initialDate })
             });
             setShowWorksheet(!!request.worksheet_notes);
             setTargetType(request.work_center_id ? 'workcenter' : 'equipment');
+            const current = equipment.find(e => e.id === request.equipment_id);
+            setEquipmentQuery(current ? `${current.name} (${current.serial_number})` : '');
         } else {
             setFormData({
                 subject: '',
@@ -55,7 +96,10 @@ export default function RequestModal({ isOpen, onClose, request, initialDate })
             });
             setShowWorksheet(false);
             setTargetType('equipment');
+            setEquipmentQuery('');
         }
+        setSuggestions([]);
+        setEquipmentError('');
     }, [request, isOpen, initialDate]);
 
     // Auto-Fill Logic
@@ -76,6 +120,10 @@ export default function RequestModal({ isOpen, onClose, request, initialDate })
 
     const handleSubmit = async (e) => {
         e.preventDefault();
+        if (targetType === 'equipment' && !formData.equipment_id) {
+            setEquipmentError('Pick an equipment from the suggestions');
+            return;
+        }
         try {
             // Convert empty strings to null for optional integer fields
             const payload = {
@@ -194,16 +242,31 @@ export default function RequestModal({ isOpen, onClose, request, initialDate })
                     {targetType === 'equipment' ? (
                         <div className="form-group">
                             <label>Equipment</label>
-                            <select
+                            <input
+                                type="text"
                                 required
-                                value={formData.equipment_id}
-                                onChange={(e) => setFormData({ ...formData, equipment_id: e.target.value })}
-                            >
-                                <option value="">Select Equipment</option>
-                                {equipment.map(e => (
-                                    <option key={e.id} value={e.id}>{e.name} ({e.serial_number})</option>
-                                ))}
-                            </select>
+                                placeholder="Type or scan a serial number or name"
+                                value={equipmentQuery}
+                                onChange={(e) => searchEquipment(e.target.value)}
+                            />
+                            {equipmentError && (
+                                <p style={{ color: 'var(--color-scrap)', fontSize: '11px', fontWeight: 700, marginTop: '0.4rem' }}>
+                                    {equipmentError}
+                                </p>
+                            )}
+                            {suggestions.length > 0 && (
+                                <div style={{ border: '1px solid var(--color-border)', borderRadius: 'var(--radius-sm)', marginTop: '0.25rem', background: 'white' }}>
+                                    {suggestions.map(item => (
+                                        <div
+                                            key={item.id}
+                                            onClick={() => pickEquipment(item)}
+                                            style={{ padding: '0.5rem 0.75rem', cursor: 'pointer', fontSize: '13px' }}
+                                        >
+                                            <strong>{item.serial_number}</strong> — {item.name}
+                                        </div>
+                                    ))}
+                                </div>
+                            )}
                         </div>
                     ) : (
                         <div className="form-group">
@@ -291,7 +354,7 @@ export default function RequestModal({ isOpen, onClose, request, initialDate })
                                 <option value="">Select Technician</option>
                                 {technicians.map(t => <option key={t.id} value={t.id}>{t.name}</option>)}
                             </select>
-                            {formData.technician_id && getTechnicianLoad(Number(formData.technician_id)) > 85 && (
+                            {formData.technician_id && technicianLoad(Number(formData.technician_id)) > 85 && (
                                 <p style={{ color: 'var(--color-scrap)', fontSize: '11px', fontWeight: 700, marginTop: '0.4rem' }}>
                                     ⚠️ The load is more to technician assign carefully
                                 </p>
@@ -1,4 +1,4 @@
-import { createContext, useContext, useState, useEffect, useCallback } from 'react';
+import { createContext, useContext, useState, useEffect, useCallback, useRef } from 'react';
 
 const MaintenanceContext = createContext();
 
@@ -17,42 +17,62 @@ const getAuthHeaders = () => {
     return { 'Content-Type': 'application/json' };
 };
 
+// Guard an update with the version the client last saw; the server answers 412 if it has moved on
+const ifMatch = (rows, id) => {
+    const row = rows.find(r => r.id === id);
+    return row?.version ? { 'If-Match': `"${row.version}"` } : {};
+};
+
+// Apply a sync delta to a list: drop deleted ids first, then upsert changed rows
+const mergeRows = (rows, changed, deleted) => {
+    const removed = new Set(deleted);
+    const byId = new Map(rows.filter(r => !removed.has(r.id)).map(r => [r.id, r]));
+    changed.forEach(r => byId.set(r.id, r));
+    return Array.from(byId.values());
+};
+
 export function MaintenanceProvider({ children }) {
     const [equipment, setEquipment] = useState([]);
     const [teams, setTeams] = useState([]);
     const [requests, setRequests] = useState([]);
+    // The bootstrap only carries the newest requests; counts over `requests`
+    // are partial when this is set and should come from the report endpoints
+    const [requestsTruncated, setRequestsTruncated] = useState(false);
     const [technicians, setTechnicians] = useState([]);
     const [workCenters, setWorkCenters] = useState([]);
     const [categories, setCategories] = useState([]);
     const [loading, setLoading] = useState(true);
+    const syncToken = useRef(null);
+
+    // Pages that load request data from the server (board, calendar, reports)
+    // listen here instead of depending on `requests`, which changes with every
+    // pushed event. Listeners get { resync, changed: [rows], deleted: [ids] }.
+    const requestListeners = useRef(new Set());
+    const notifyRequestChanges = useCallback((change) => {
+        const normalized = { resync: false, changed: [], deleted: [], ...change };
+        requestListeners.current.forEach(listener => listener(normalized));
+    }, []);
+    const subscribeRequestChanges = useCallback((listener) => {
+        requestListeners.current.add(listener);
+        return () => requestListeners.current.delete(listener);
+    }, []);
 
     const fetchData = useCallback(async () => {
         try {
             setLoading(true);
-            const [eqRes, teamRes, techRes, reqRes, wcRes, catRes] = await Promise.all([
-                fetch(`${API_URL}/equipment`),
-                fetch(`${API_URL}/teams`),
-                fetch(`${API_URL}/technicians`),
-                fetch(`${API_URL}/requests`),
-                fetch(`${API_URL}/work-centers`),
-                fetch(`${API_URL}/equipment-categories`)
-            ]);
-
-            const [eqData, teamData, techData, reqData, wcData, catData] = await Promise.all([
-                eqRes.json(),
-                teamRes.json(),
-                techRes.json(),
-                reqRes.json(),
-                wcRes.json(),
-                catRes.json()
-            ]);
-
-            setEquipment(eqData);
-            setTeams(teamData);
-            setTechnicians(techData);
-            setRequests(reqData);
-            setWorkCenters(wcData);
-            setCategories(catData);
+            // One round trip for all reference data; the browser revalidates
+            // with If-None-Match and gets a 304 when nothing changed.
+            const res = await fetch(`${API_URL}/bootstrap?active_only=false`);
+            const data = await res.json();
+
+            setEquipment(data.equipment);
+            setTeams(data.teams);
+            setTechnicians(data.technicians);
+            setRequests(data.requests);
+            setRequestsTruncated(data.requests_truncated);
+            setWorkCenters(data.work_centers);
+            setCategories(data.equipment_categories);
+            syncToken.current = data.sync_token;
         } catch (error) {
             console.error("Error fetching data from PostgreSQL:", error);
         } finally {
@@ -60,10 +80,75 @@ export function MaintenanceProvider({ children }) {
         }
     }, []);
 
+    // After a mutation, download only the rows changed since the last sync
+    const syncData = useCallback(async () => {
+        const reload = async () => {
+            await fetchData();
+            notifyRequestChanges({ resync: true });
+        };
+        if (!syncToken.current) return reload();
+        try {
+            const res = await fetch(`${API_URL}/sync?since=${encodeURIComponent(syncToken.current)}`);
+            const data = await res.json();
+            if (data.full_resync) return reload();
+
+            const setters = {
+                equipment: setEquipment,
+                teams: setTeams,
+                technicians: setTechnicians,
+                requests: setRequests,
+                work_centers: setWorkCenters,
+                equipment_categories: setCategories
+            };
+            Object.entries(setters).forEach(([key, setter]) => {
+                if (data.changed[key].length || data.deleted[key].length) {
+                    setter(rows => mergeRows(rows, data.changed[key], data.deleted[key]));
+                }
+            });
+            if (data.changed.requests.length || data.deleted.requests.length) {
+                notifyRequestChanges({ changed: data.changed.requests, deleted: data.deleted.requests });
+            }
+            syncToken.current = data.token;
+        } catch (error) {
+            console.error("Error syncing data:", error);
+        }
+    }, [fetchData, notifyRequestChanges]);
+
     useEffect(() => {
         fetchData();
     }, [fetchData]);
 
+    // Live updates pushed by the server, so open boards don't need to poll
+    useEffect(() => {
+        const setters = {
+            equipment: setEquipment,
+            teams: setTeams,
+            technicians: setTechnicians,
+            requests: setRequests,
+            work_centers: setWorkCenters,
+            equipment_categories: setCategories
+        };
+        const source = new EventSource(`${API_URL}/events`);
+        source.addEventListener('change', (message) => {
+            const event = JSON.parse(message.data);
+            if (event.action === 'resync') {
+                syncData();
+                return;
+            }
+            const setter = setters[event.entity];
+            if (!setter) return;
+            if (event.action === 'deleted') {
+                setter(rows => mergeRows(rows, [], [event.id]));
+            } else {
+                setter(rows => mergeRows(rows, [event.data], []));
+            }
+            if (event.entity === 'requests') {
+                notifyRequestChanges(event.action === 'deleted' ? { deleted: [event.id] } : { changed: [event.data] });
+            }
+        });
+        return () => source.close();
+    }, [syncData, notifyRequestChanges]);
+
     const addRequest = async (reqData) => {
         try {
             const response = await fetch(`${API_URL}/requests`, {
@@ -71,7 +156,7 @@ export function MaintenanceProvider({ children }) {
                 headers: getAuthHeaders(),
                 body: JSON.stringify(reqData)
             });
-            if (response.ok) fetchData();
+            if (response.ok) syncData();
         } catch (error) {
             console.error("Error adding request:", error);
         }
@@ -81,22 +166,25 @@ export function MaintenanceProvider({ children }) {
         try {
             const response = await fetch(`${API_URL}/requests/${reqId}`, {
                 method: 'PUT',
-                headers: getAuthHeaders(),
+                headers: { ...getAuthHeaders(), ...ifMatch(requests, reqId) },
                 body: JSON.stringify(reqData)
             });
-            if (response.ok) fetchData();
+            if (response.ok || response.status === 412) syncData();
         } catch (error) {
             console.error("Error updating request:", error);
         }
     };
 
-    const updateRequestStage = async (reqId, stage) => {
+    const updateRequestStage = async (reqId, stage, expectedStage) => {
         try {
-            const response = await fetch(`${API_URL}/requests/${reqId}/stage?stage=${stage}`, {
+            const params = new URLSearchParams({ stage });
+            if (expectedStage) params.set('expected_stage', expectedStage);
+            const response = await fetch(`${API_URL}/requests/${reqId}/stage?${params}`, {
                 method: 'PUT',
                 headers: getAuthHeaders()
             });
-            if (response.ok) fetchData();
+            // 409 means someone else moved the card first; resync to show where it is now
+            if (response.ok || response.status === 409) syncData();
         } catch (error) {
             console.error("Error updating stage:", error);
         }
@@ -108,7 +196,7 @@ export function MaintenanceProvider({ children }) {
                 method: 'DELETE',
                 headers: getAuthHeaders()
             });
-            if (response.ok) fetchData();
+            if (response.ok) syncData();
         } catch (error) {
             console.error("Error deleting request:", error);
         }
@@ -123,7 +211,7 @@ export function MaintenanceProvider({ children }) {
             });
             if (response.ok) {
                 const data = await response.json();
-                fetchData();
+                syncData();
                 return data;
             }
         } catch (error) {
@@ -135,12 +223,13 @@ export function MaintenanceProvider({ children }) {
         try {
             const response = await fetch(`${API_URL}/equipment/${eqId}`, {
                 method: 'PUT',
-                headers: getAuthHeaders(),
+                headers: { ...getAuthHeaders(), ...ifMatch(equipment, eqId) },
                 body: JSON.stringify(eqData)
             });
+            if (response.status === 412) syncData();
             if (response.ok) {
                 const data = await response.json();
-                fetchData();
+                syncData();
                 return data;
             }
         } catch (error) {
@@ -154,7 +243,7 @@ export function MaintenanceProvider({ children }) {
                 method: 'DELETE',
                 headers: getAuthHeaders()
             });
-            if (response.ok) fetchData();
+            if (response.ok) syncData();
         } catch (error) {
             console.error("Error deleting equipment:", error);
         }
@@ -167,7 +256,7 @@ export function MaintenanceProvider({ children }) {
                 headers: getAuthHeaders(),
                 body: JSON.stringify(teamData)
             });
-            if (response.ok) fetchData();
+            if (response.ok) syncData();
         } catch (error) {
             console.error("Error adding team:", error);
         }
@@ -177,10 +266,10 @@ export function MaintenanceProvider({ children }) {
         try {
             const response = await fetch(`${API_URL}/teams/${teamId}`, {
                 method: 'PUT',
-                headers: getAuthHeaders(),
+                headers: { ...getAuthHeaders(), ...ifMatch(teams, teamId) },
                 body: JSON.stringify(teamData)
             });
-            if (response.ok) fetchData();
+            if (response.ok || response.status === 412) syncData();
         } catch (error) {
             console.error("Error updating team:", error);
         }
@@ -192,7 +281,7 @@ export function MaintenanceProvider({ children }) {
                 method: 'DELETE',
                 headers: getAuthHeaders()
             });
-            if (response.ok) fetchData();
+            if (response.ok) syncData();
         } catch (error) {
             console.error("Error deleting team:", error);
         }
@@ -205,7 +294,7 @@ export function MaintenanceProvider({ children }) {
                 headers: getAuthHeaders(),
                 body: JSON.stringify(techData)
             });
-            if (response.ok) fetchData();
+            if (response.ok) syncData();
         } catch (error) {
             console.error("Error adding technician:", error);
         }
@@ -215,10 +304,10 @@ export function MaintenanceProvider({ children }) {
         try {
             const response = await fetch(`${API_URL}/technicians/${techId}`, {
                 method: 'PUT',
-                headers: getAuthHeaders(),
+                headers: { ...getAuthHeaders(), ...ifMatch(technicians, techId) },
                 body: JSON.stringify(techData)
             });
-            if (response.ok) fetchData();
+            if (response.ok || response.status === 412) syncData();
         } catch (error) {
             console.error("Error updating technician:", error);
         }
@@ -230,7 +319,7 @@ export function MaintenanceProvider({ children }) {
                 method: 'DELETE',
                 headers: getAuthHeaders()
             });
-            if (response.ok) fetchData();
+            if (response.ok) syncData();
         } catch (error) {
             console.error("Error deleting technician:", error);
         }
@@ -243,7 +332,7 @@ export function MaintenanceProvider({ children }) {
                 headers: getAuthHeaders(),
                 body: JSON.stringify(wcData)
             });
-            if (response.ok) fetchData();
+            if (response.ok) syncData();
         } catch (error) {
             console.error("Error adding work center:", error);
         }
@@ -253,10 +342,10 @@ export function MaintenanceProvider({ children }) {
         try {
             const response = await fetch(`${API_URL}/work-centers/${wcId}`, {
                 method: 'PUT',
-                headers: getAuthHeaders(),
+                headers: { ...getAuthHeaders(), ...ifMatch(workCenters, wcId) },
                 body: JSON.stringify(wcData)
             });
-            if (response.ok) fetchData();
+            if (response.ok || response.status === 412) syncData();
         } catch (error) {
             console.error("Error updating work center:", error);
         }
@@ -268,7 +357,7 @@ export function MaintenanceProvider({ children }) {
                 method: 'DELETE',
                 headers: getAuthHeaders()
             });
-            if (response.ok) fetchData();
+            if (response.ok) syncData();
         } catch (error) {
             console.error("Error deleting work center:", error);
         }
@@ -281,7 +370,7 @@ export function MaintenanceProvider({ children }) {
                 headers: getAuthHeaders(),
                 body: JSON.stringify(catData)
             });
-            if (response.ok) fetchData();
+            if (response.ok) syncData();
         } catch (error) {
             console.error("Error adding category:", error);
         }
@@ -291,10 +380,10 @@ export function MaintenanceProvider({ children }) {
         try {
             const response = await fetch(`${API_URL}/equipment-categories/${catId}`, {
                 method: 'PUT',
-                headers: getAuthHeaders(),
+                headers: { ...getAuthHeaders(), ...ifMatch(categories, catId) },
                 body: JSON.stringify(catData)
             });
-            if (response.ok) fetchData();
+            if (response.ok || response.status === 412) syncData();
         } catch (error) {
             console.error("Error updating category:", error);
         }
@@ -306,7 +395,7 @@ export function MaintenanceProvider({ children }) {
                 method: 'DELETE',
                 headers: getAuthHeaders()
             });
-            if (response.ok) fetchData();
+            if (response.ok) syncData();
         } catch (error) {
             console.error("Error deleting category:", error);
         }
@@ -342,21 +431,11 @@ export function MaintenanceProvider({ children }) {
             .filter(Boolean);
     }, [equipment, getEquipmentRequests]);
 
-    const getTechnicianLoad = useCallback((techId) => {
-        const techRequests = requests.filter(r =>
-            r.technician_id === techId &&
-            r.stage !== 'Repaired' &&
-            r.stage !== 'Scrap'
-        );
-        // Assuming base capacity is 4 active requests for 100% load
-        const load = (techRequests.length / 4) * 100;
-        return Math.min(Math.round(load), 100);
-    }, [requests]);
-
     const value = {
         equipment,
         teams,
         requests,
+        requestsTruncated,
         technicians,
         workCenters,
         categories,
@@ -381,9 +460,8 @@ export function MaintenanceProvider({ children }) {
         deleteWorkCenter,
         getEquipmentRequests,
         getSimilarEquipment,
-        getTechnicianLoad,
-        getTechnicianLoad,
         deleteRequest,
+        subscribeRequestChanges,
         refreshData: fetchData
     };
 
@@ -399,3 +477,36 @@ export function useMaintenance() {
     if (!context) throw new Error('useMaintenance must be used within a MaintenanceProvider');
     return context;
 }
+
+// Calls `onChange({ resync, changed, deleted })` after requests change on the
+// server; a burst of changes is merged into one call `delay` ms after the last
+export function useRequestChanges(onChange, delay = 500) {
+    const { subscribeRequestChanges } = useMaintenance();
+    const callback = useRef(onChange);
+    useEffect(() => {
+        callback.current = onChange;
+    });
+    useEffect(() => {
+        let pending = null;
+        let timer = null;
+        const unsubscribe = subscribeRequestChanges((change) => {
+            pending = pending
+                ? {
+                    resync: pending.resync || change.resync,
+                    changed: [...pending.changed, ...change.changed],
+                    deleted: [...pending.deleted, ...change.deleted]
+                }
+                : change;
+            clearTimeout(timer);
+            timer = setTimeout(() => {
+                const batch = pending;
+                pending = null;
+                callback.current(batch);
+            }, delay);
+        });
+        return () => {
+            unsubscribe();
+            clearTimeout(timer);
+        };
+    }, [subscribeRequestChanges, delay]);
+}
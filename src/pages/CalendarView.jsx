@@ -1,11 +1,10 @@
-import { useState } from 'react';
-import { useMaintenance } from '../context/MaintenanceContext';
+import { useState, useEffect, useCallback, useRef } from 'react';
+import { useRequestChanges } from '../context/MaintenanceContext';
 import { ChevronLeft, ChevronRight, Plus } from 'lucide-react';
 import RequestModal from '../components/RequestModal';
 import './MaintenanceCalendar.css';
 
 export default function MaintenanceCalendar() {
-    const { requests, equipment, workCenters } = useMaintenance();
     const [currentDate, setCurrentDate] = useState(new Date());
     const [isModalOpen, setIsModalOpen] = useState(false);
     const [selectedDate, setSelectedDate] = useState(null);
@@ -24,6 +23,38 @@ export default function MaintenanceCalendar() {
     const days = Array.from({ length: daysInMonth }, (_, i) => i + 1);
     const blanks = Array.from({ length: firstDay }, (_, i) => i);
 
+    // One range query per visible month instead of scanning all data per day cell
+    const [eventsByDay, setEventsByDay] = useState({});
+    const pad = (n) => String(n).padStart(2, '0');
+    const monthFrom = `${year}-${pad(month + 1)}-01`;
+    const monthTo = `${year}-${pad(month + 1)}-${pad(daysInMonth)}`;
+    const loadMonth = useCallback(() => {
+        fetch(`http://127.0.0.1:8001/api/calendar?from=${monthFrom}&to=${monthTo}`)
+            .then(res => res.json())
+            .then(data => setEventsByDay(Object.fromEntries(data.days.map(d => [d.date, d]))))
+            .catch(error => console.error("Error fetching calendar:", error));
+    }, [monthFrom, monthTo]);
+
+    useEffect(() => {
+        loadMonth();
+    }, [loadMonth]);
+
+    const eventsRef = useRef(eventsByDay);
+    useEffect(() => {
+        eventsRef.current = eventsByDay;
+    }, [eventsByDay]);
+
+    // Reload the month only when a pushed change lands in it or touches a request it shows
+    useRequestChanges(({ resync, changed, deleted }) => {
+        const shown = new Set(Object.values(eventsRef.current).flatMap(day => day.requests.map(r => r.id)));
+        const inMonth = (date) => date && date.slice(0, 10) >= monthFrom && date.slice(0, 10) <= monthTo;
+        if (resync
+            || changed.some(row => inMonth(row.scheduled_date) || shown.has(row.id))
+            || deleted.some(id => shown.has(id))) {
+            loadMonth();
+        }
+    });
+
     const prevMonth = () => setCurrentDate(new Date(year, month - 1));
     const nextMonth = () => setCurrentDate(new Date(year, month + 1));
 
@@ -66,8 +97,8 @@ export default function MaintenanceCalendar() {
 
                     {days.map(day => {
                         const dateStr = `${year}-${String(month + 1).padStart(2, '0')}-${String(day).padStart(2, '0')}`;
-                        const dayRequests = requests.filter(r => r.scheduled_date === dateStr);
-                        const dayEquipments = equipment.filter(e => e.purchase_date === dateStr);
+                        const dayRequests = eventsByDay[dateStr]?.requests || [];
+                        const dayEquipments = eventsByDay[dateStr]?.equipment || [];
 
                         return (
                             <div key={day} className="calendar-day" onClick={() => handleDateClick(day)}>
@@ -78,15 +109,11 @@ export default function MaintenanceCalendar() {
                                             ⭐ {eq.name}
                                         </div>
                                     ))}
-                                    {dayRequests.map(req => {
-                                        const eq = equipment.find(e => e.id === req.equipment_id);
-                                        const wc = workCenters.find(w => w.id === req.work_center_id);
-                                        return (
-                                            <div key={req.id} className={`calendar-req-pill ${req.type.toLowerCase()}`} title={`${req.type}: ${req.subject}`}>
-                                                {req.type === 'Preventive' ? '🔧' : '🚨'} {eq?.name || wc?.name || 'Asset'}
-                                            </div>
-                                        );
-                                    })}
+                                    {dayRequests.map(req => (
+                                        <div key={req.id} className={`calendar-req-pill ${req.type.toLowerCase()}`} title={`${req.type}: ${req.subject}`}>
+                                            {req.type === 'Preventive' ? '🔧' : '🚨'} {req.equipment_name || req.work_center_name || 'Asset'}
+                                        </div>
+                                    ))}
                                 </div>
                             </div>
                         );
@@ -1,91 +1,116 @@
-import { useState } from 'react';
-import { useMaintenance } from '../context/MaintenanceContext';
+import { useState, useEffect, useCallback } from 'react';
+import { useMaintenance, useRequestChanges } from '../context/MaintenanceContext';
 import { ClipboardList, AlertTriangle, CheckCircle, Calendar, Bell, ShieldCheck, ZapOff, Plus, Clock, Search, Box } from 'lucide-react';
 import RequestModal from '../components/RequestModal';
 
 export default function Dashboard() {
-    const { requests, equipment, technicians } = useMaintenance();
+    const { equipment, technicians } = useMaintenance();
     const [isModalOpen, setIsModalOpen] = useState(false);
     const [searchTerm, setSearchTerm] = useState('');
     const [showSearch, setShowSearch] = useState(false);
 
-    // Filter function for search
-    const filterBySearch = (items, searchFields) => {
-        if (!searchTerm.trim()) return items;
-        const lowerSearch = searchTerm.toLowerCase();
-        return items.filter(item =>
-            searchFields.some(field => {
-                const value = field(item);
-                return value && value.toString().toLowerCase().includes(lowerSearch);
-            })
-        );
-    };
+    // Search runs server-side (ranked full-text), debounced while typing; only
+    // the query text triggers it, so pushed data changes do not re-run it
+    const [searchResults, setSearchResults] = useState(null);
+    const query = searchTerm.trim();
+    useEffect(() => {
+        const q = query;
+        if (q.length < 2) {
+            setSearchResults(null);
+            return;
+        }
+        const timer = setTimeout(() => {
+            fetch(`http://127.0.0.1:8001/api/search?q=${encodeURIComponent(q)}&limit=100`)
+                .then(res => res.json())
+                .then(data => setSearchResults({
+                    requests: data.results.filter(r => r.type === 'requests').map(r => r.data),
+                    equipment: data.results.filter(r => r.type === 'equipment').map(r => r.data)
+                }))
+                .catch(error => console.error("Error searching:", error));
+        }, 250);
+        return () => clearTimeout(timer);
+    }, [query]);
+
+    const filteredEquipment = searchResults ? searchResults.equipment : equipment;
 
-    // Apply search filters
-    const filteredRequests = filterBySearch(requests, [
-        r => r.equipment_name,
-        r => r.type,
-        r => r.stage,
-        r => r.description,
-        r => r.scheduled_date,
-        r => r.assigned_to
-    ]);
+    // The bootstrap request list is capped, so without a search the request
+    // counts come from the rollup summary instead of the partial list
+    const [requestSummary, setRequestSummary] = useState(null);
+    const loadRequestSummary = useCallback(() => {
+        const day = (offset) => {
+            const d = new Date();
+            d.setDate(d.getDate() + offset);
+            return `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
+        };
+        const summary = (range) => fetch(`http://127.0.0.1:8001/api/reports/summary?group_by=stage,type&${range}`).then(res => res.json());
+        Promise.all([summary(`date_to=${day(-1)}`), summary(`date_from=${day(0)}`)])
+            .then(([past, upcoming]) => setRequestSummary({ past, upcoming }))
+            .catch(error => console.error("Error fetching request summary:", error));
+    }, []);
 
-    const filteredEquipment = filterBySearch(equipment, [
-        e => e.name,
-        e => e.serial_number,
-        e => e.manufacturer,
-        e => e.location,
-        e => e.status
-    ]);
+    useEffect(() => {
+        loadRequestSummary();
+    }, [loadRequestSummary]);
+
+    useRequestChanges(loadRequestSummary, 2000);
 
     // Helper functions for request tracking
-    const getOverdueRequests = () => {
-        const now = new Date();
-        return filteredRequests.filter(req => {
-            if (req.stage === 'Repaired' || req.stage === 'Scrap') return false;
-            const scheduledDate = new Date(req.scheduled_date);
-            return scheduledDate < now;
-        });
+    const countSearchResults = (rows) => {
+        const today = new Date();
+        today.setHours(0, 0, 0, 0);
+        const isPast = (req) => new Date(`${req.scheduled_date}T00:00:00`) < today;
+        return {
+            overdue: rows.filter(req => isPast(req) && req.stage !== 'Repaired' && req.stage !== 'Scrap').length,
+            onTrack: rows.filter(req => req.stage === 'Repaired' || !isPast(req)).length,
+            scheduled: rows.filter(r => r.type === 'Preventive' && r.stage !== 'Repaired').length,
+            total: rows.length
+        };
     };
 
-    const getRequestsOnTrack = () => {
-        const now = new Date();
-        return filteredRequests.filter(req => {
-            if (req.stage === 'Repaired') return true;
-            const scheduledDate = new Date(req.scheduled_date);
-            return scheduledDate >= now;
-        });
+    const countSummary = ({ past, upcoming }) => {
+        const sum = (groups, keep) => groups.filter(keep).reduce((total, g) => total + g.count, 0);
+        const all = [...past, ...upcoming];
+        return {
+            overdue: sum(past, g => g.stage !== 'Repaired' && g.stage !== 'Scrap'),
+            onTrack: sum(past, g => g.stage === 'Repaired') + sum(upcoming, () => true),
+            scheduled: sum(all, g => g.type === 'Preventive' && g.stage !== 'Repaired'),
+            total: sum(all, () => true)
+        };
     };
 
     const getCriticalEquipment = () => {
         return filteredEquipment.filter(e => e.health < 50 || e.status === 'scrapped');
     };
 
-    const getScheduledMaintenance = () => {
-        return filteredRequests.filter(r => r.type === 'Preventive' && r.stage !== 'Repaired');
-    };
-
-    const overdueRequests = getOverdueRequests();
-    const onTrackRequests = getRequestsOnTrack();
+    const requestCounts = searchResults
+        ? countSearchResults(searchResults.requests)
+        : requestSummary ? countSummary(requestSummary) : { overdue: 0, onTrack: 0, scheduled: 0, total: 0 };
     const criticalEquipment = getCriticalEquipment();
-    const scheduledMaintenance = getScheduledMaintenance();
 
-    const { getTechnicianLoad } = useMaintenance();
+    // Workload is aggregated server-side, already ranked by active requests;
+    // request changes refresh it once they have settled rather than per event
+    const [workload, setWorkload] = useState([]);
+    const loadWorkload = useCallback(() => {
+        fetch('http://127.0.0.1:8001/api/technicians/workload')
+            .then(res => res.json())
+            .then(setWorkload)
+            .catch(error => console.error("Error fetching technician workload:", error));
+    }, []);
 
-    const getTechnicianLoadData = () => {
-        return technicians.map(tech => {
-            const loadPercentage = getTechnicianLoad(tech.id);
-            const activeRequests = requests.filter(r =>
-                r.technician_id === tech.id &&
-                r.stage !== 'Repaired' &&
-                r.stage !== 'Scrap'
-            ).length;
-            return { ...tech, activeRequests, loadPercentage };
-        }).sort((a, b) => b.loadPercentage - a.loadPercentage);
-    };
+    useEffect(() => {
+        loadWorkload();
+    }, [loadWorkload, technicians]);
+
+    useRequestChanges(loadWorkload, 2000);
 
-    const technicianLoad = getTechnicianLoadData();
+    const technicianLoad = workload.map(w => ({
+        id: w.technician_id,
+        name: w.name,
+        activeRequests: w.active_requests,
+        scheduledHours: w.scheduled_hours,
+        overdue: w.overdue,
+        loadPercentage: w.load_percentage
+    }));
 
     const stats = [
         {
@@ -98,7 +123,7 @@ export default function Dashboard() {
         },
         {
             label: 'Scheduled Maintenance',
-            value: scheduledMaintenance.length,
+            value: requestCounts.scheduled,
             icon: Calendar,
             color: '#6366f1',
             gradient: 'linear-gradient(135deg, #818cf8 0%, #6366f1 100%)',
@@ -116,11 +141,11 @@ export default function Dashboard() {
         },
         {
             label: 'On Track',
-            value: `${Math.round((onTrackRequests.length / Math.max(filteredRequests.length, 1)) * 100)}%`,
+            value: `${Math.round((requestCounts.onTrack / Math.max(requestCounts.total, 1)) * 100)}%`,
             icon: CheckCircle,
             color: '#10b981',
             gradient: 'linear-gradient(135deg, #34d399 0%, #10b981 100%)',
-            subtitle: `${onTrackRequests.length}/${filteredRequests.length} requests`
+            subtitle: `${requestCounts.onTrack}/${requestCounts.total} requests`
         },
     ];
 
@@ -7,7 +7,7 @@ import EquipmentModal from '../components/EquipmentModal';
 
 export default function EquipmentPage() {
     const { user } = useAuth();
-    const { equipment, getEquipmentRequests, deleteEquipment } = useMaintenance();
+    const { equipment, getEquipmentRequests, requestsTruncated, deleteEquipment } = useMaintenance();
     const [search, setSearch] = useState('');
     const [viewMode, setViewMode] = useState('kanban');
     const [selectedEq, setSelectedEq] = useState(null);
@@ -151,6 +151,11 @@ export default function EquipmentPage() {
 
                 <div id="related-requests" style={{ marginTop: '3rem' }}>
                     <h3 style={{ fontSize: '1.25rem', marginBottom: '1.5rem', fontWeight: 800 }}>Maintenance History</h3>
+                    {requestsTruncated && (
+                        <p style={{ fontSize: '12px', color: 'var(--color-text-muted)', marginTop: '-1rem', marginBottom: '1rem' }}>
+                            Showing recent requests only; older history is not loaded.
+                        </p>
+                    )}
                     <div className="card" style={{ border: 'none', boxShadow: 'var(--shadow-md)' }}>
                         <table className="table-view">
                             <thead>
@@ -426,7 +431,7 @@ export default function EquipmentPage() {
                                     <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', paddingTop: '1.25rem', borderTop: '1px solid #f1f5f9' }}>
                                         <div style={{ display: 'flex', alignItems: 'center', gap: '0.4rem', color: 'var(--color-text-secondary)' }}>
                                             <Wrench size={16} color="var(--color-primary)" />
-                                            <span style={{ fontSize: '13px', fontWeight: 700 }}>{getEquipmentRequests(item.id).length} Active</span>
+                                            <span style={{ fontSize: '13px', fontWeight: 700 }}>{getEquipmentRequests(item.id).length}{requestsTruncated ? '+' : ''} Active</span>
                                         </div>
                                         <div style={{ display: 'flex', alignItems: 'center', gap: '6px' }}>
                                             <div style={{ width: '60px', height: '6px', background: '#f1f5f9', borderRadius: '3px', overflow: 'hidden' }}>
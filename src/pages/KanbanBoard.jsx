@@ -1,32 +1,85 @@
-import { useState } from 'react';
-import { useMaintenance } from '../context/MaintenanceContext';
+import { useState, useEffect, useCallback, useRef } from 'react';
+import { useMaintenance, useRequestChanges } from '../context/MaintenanceContext';
 import { useAuth } from '../context/AuthContext';
 import { ChevronRight, ChevronLeft, Star, Clock, AlertTriangle, Plus } from 'lucide-react';
 import RequestModal from '../components/RequestModal';
 
 export default function KanbanBoard() {
     const { user } = useAuth();
-    const { requests, updateRequestStage, technicians, equipment, workCenters } = useMaintenance();
+    const { updateRequestStage, technicians } = useMaintenance();
     const [isModalOpen, setIsModalOpen] = useState(false);
     const [selectedRequest, setSelectedRequest] = useState(null);
     const [sortBy, setSortBy] = useState('date'); // date, priority, none
     const [showSortMenu, setShowSortMenu] = useState(false);
+    const [columns, setColumns] = useState({});
+
+    // Board columns come from the server already counted and sorted
+    const loadBoard = useCallback(() => {
+        fetch(`http://127.0.0.1:8001/api/requests/board?sort=${sortBy}`)
+            .then(res => res.json())
+            .then(data => setColumns(Object.fromEntries(data.columns.map(col => [col.stage, col]))))
+            .catch(error => console.error("Error fetching board:", error));
+    }, [sortBy]);
+
+    useEffect(() => {
+        loadBoard();
+    }, [loadBoard]);
+
+    const columnsRef = useRef(columns);
+    useEffect(() => {
+        columnsRef.current = columns;
+    }, [columns]);
+
+    // Reload one column from the top, as deep as it was loaded, keeping its cursor valid
+    const reloadColumn = useCallback((stage) => {
+        const loaded = columnsRef.current[stage]?.cards.length || 0;
+        const limit = Math.min(Math.max(loaded, 20), 200);
+        fetch(`http://127.0.0.1:8001/api/requests/board?sort=${sortBy}&stage=${encodeURIComponent(stage)}&limit=${limit}`)
+            .then(res => res.json())
+            .then(data => setColumns(prev => ({ ...prev, [stage]: data })))
+            .catch(error => console.error("Error reloading column:", error));
+    }, [sortBy]);
+
+    // Pushed changes only reload the columns a card left or entered. A card
+    // that was not loaded and is not new has an unknown old column, so its
+    // count can only be fixed by reloading the board.
+    useRequestChanges(({ resync, changed, deleted }) => {
+        const loadedCards = Object.values(columnsRef.current).flatMap(col => col.cards.map(card => [card.id, card]));
+        const loaded = new Map(loadedCards);
+        const affected = new Set();
+        let reloadAll = resync;
+        changed.forEach(row => {
+            const card = loaded.get(row.id);
+            if (card && card.version === row.version) return; // already showing this version
+            if (card) affected.add(card.stage);
+            else if (row.version > 1) reloadAll = true;
+            affected.add(row.stage);
+        });
+        deleted.forEach(id => {
+            const card = loaded.get(id);
+            if (card) affected.add(card.stage);
+            else reloadAll = true;
+        });
+        if (reloadAll) loadBoard();
+        else affected.forEach(reloadColumn);
+    });
+
+    const loadMore = (stage) => {
+        const column = columns[stage];
+        fetch(`http://127.0.0.1:8001/api/requests/board?sort=${sortBy}&stage=${encodeURIComponent(stage)}&cursor=${encodeURIComponent(column.next_cursor)}`)
+            .then(res => res.json())
+            .then(data => setColumns(prev => ({
+                ...prev,
+                [stage]: { ...prev[stage], cards: [...prev[stage].cards, ...data.cards], next_cursor: data.next_cursor }
+            })))
+            .catch(error => console.error("Error loading cards:", error));
+    };
 
     const handleOpenModal = (req = null) => {
         setSelectedRequest(req);
         setIsModalOpen(true);
     };
 
-    const sortRequests = (reqs) => {
-        if (sortBy === 'date') {
-            return [...reqs].sort((a, b) => new Date(a.scheduled_date) - new Date(b.scheduled_date));
-        } else if (sortBy === 'priority') {
-            const priorityOrder = { 'High': 0, 'Medium': 1, 'Low': 2 };
-            return [...reqs].sort((a, b) => priorityOrder[a.priority] - priorityOrder[b.priority]);
-        }
-        return reqs;
-    };
-
     const stages = ['New', 'In Progress', 'Repaired', 'Scrap'];
     const getStageColor = (stage) => {
         switch (stage) {
@@ -131,7 +184,8 @@ export default function KanbanBoard() {
 
             <div className="kanban-container" style={{ display: 'flex', gap: '1.5rem', overflowX: 'auto', paddingBottom: '1rem' }}>
                 {stages.map((stage) => {
-                    const stageRequests = sortRequests(requests.filter(r => r.stage === stage));
+                    const column = columns[stage] || { cards: [], count: 0, next_cursor: null };
+                    const stageRequests = column.cards;
                     return (
                         <div key={stage} className="kanban-col" style={{ flex: '0 0 320px', background: '#f1f5f9', borderRadius: 'var(--radius-lg)', padding: '0.75rem', display: 'flex', flexDirection: 'column', height: 'fit-content', minHeight: '500px' }}>
                             <div className="kanban-col-header" style={{
@@ -146,14 +200,12 @@ export default function KanbanBoard() {
                                 fontWeight: 800
                             }}>
                                 <span>{getStageLabel(stage)}</span>
-                                <span style={{ opacity: 0.5, fontWeight: 600 }}>{stageRequests.length}</span>
+                                <span style={{ opacity: 0.5, fontWeight: 600 }}>{column.count}</span>
                             </div>
 
                             <div style={{ flex: 1, overflowY: 'auto', paddingRight: '0.25rem' }}>
                                 {stageRequests.map((req) => {
                                     const tech = technicians.find(t => t.id === req.technician_id);
-                                    const equip = equipment.find(e => e.id === req.equipment_id);
-                                    const wc = workCenters.find(w => w.id === req.work_center_id);
                                     const overdue = isOverdue(req.scheduled_date) && stage !== 'Repaired' && stage !== 'Scrap';
 
                                     return (
@@ -186,7 +238,7 @@ export default function KanbanBoard() {
 
                                             <div style={{ display: 'flex', alignItems: 'center', gap: '0.5rem', marginBottom: '1rem' }}>
                                                 <div style={{ width: '6px', height: '6px', borderRadius: '50%', backgroundColor: getStageColor(stage) }}></div>
-                                                <span style={{ fontSize: '12px', color: 'var(--color-text-secondary)', fontWeight: 600 }}>{equip?.name || wc?.name || 'Unassigned'}</span>
+                                                <span style={{ fontSize: '12px', color: 'var(--color-text-secondary)', fontWeight: 600 }}>{req.equipment_name || req.work_center_name || 'Unassigned'}</span>
                                             </div>
 
                                             <div style={{ display: 'flex', alignItems: 'center', justifyContent: 'space-between' }}>
@@ -208,10 +260,10 @@ export default function KanbanBoard() {
                                                 <div style={{ display: 'flex', alignItems: 'center', gap: '0.5rem' }}>
                                                     {user?.role !== 'employee' && (
                                                         <div style={{ display: 'flex', gap: '4px' }}>
-                                                            <button className="btn-link" style={{ padding: 4 }} onClick={(e) => { e.stopPropagation(); updateRequestStage(req.id, stages[stages.indexOf(stage) - 1]); }} disabled={stages.indexOf(stage) === 0}>
+                                                            <button className="btn-link" style={{ padding: 4 }} onClick={(e) => { e.stopPropagation(); updateRequestStage(req.id, stages[stages.indexOf(stage) - 1], stage); }} disabled={stages.indexOf(stage) === 0}>
                                                                 <ChevronLeft size={16} />
                                                             </button>
-                                                            <button className="btn-link" style={{ padding: 4 }} onClick={(e) => { e.stopPropagation(); updateRequestStage(req.id, stages[stages.indexOf(stage) + 1]); }} disabled={stages.indexOf(stage) === stages.length - 1}>
+                                                            <button className="btn-link" style={{ padding: 4 }} onClick={(e) => { e.stopPropagation(); updateRequestStage(req.id, stages[stages.indexOf(stage) + 1], stage); }} disabled={stages.indexOf(stage) === stages.length - 1}>
                                                                 <ChevronRight size={16} />
                                                             </button>
                                                         </div>
@@ -222,6 +274,11 @@ export default function KanbanBoard() {
                                         </div>
                                     );
                                 })}
+                                {column.next_cursor && (
+                                    <button className="btn btn-secondary" style={{ width: '100%' }} onClick={() => loadMore(stage)}>
+                                        Load more ({column.count - stageRequests.length} remaining)
+                                    </button>
+                                )}
                             </div>
                         </div>
                     );
@@ -1,11 +1,33 @@
-import { useState } from 'react';
-import { useMaintenance } from '../context/MaintenanceContext';
+import { useState, useEffect, useCallback } from 'react';
+import { useMaintenance, useRequestChanges } from '../context/MaintenanceContext';
 import { BarChart3, PieChart, Info, Zap } from 'lucide-react';
 
 export default function ReportingPage() {
-    const { requests, teams, equipment } = useMaintenance();
+    const { teams, equipment } = useMaintenance();
 
     const [viewMode, setViewMode] = useState('pivot'); // 'pivot' | 'graph'
+    const [matrix, setMatrix] = useState({ cells: [], department_totals: [], team_totals: [], total: 0 });
+
+    // Counts are aggregated server-side; fetched once, then again after a burst of request changes settles
+    const loadMatrix = useCallback(() => {
+        fetch('http://127.0.0.1:8001/api/reports/matrix')
+            .then(res => res.json())
+            .then(setMatrix)
+            .catch(error => console.error("Error fetching report matrix:", error));
+    }, []);
+
+    useEffect(() => {
+        loadMatrix();
+    }, [loadMatrix]);
+
+    useRequestChanges(loadMatrix, 2000);
+
+    const cellCount = (department, teamId) =>
+        matrix.cells.find(c => c.department === department && c.team_id === teamId)?.count || 0;
+    const departmentTotal = (department) =>
+        matrix.department_totals.find(d => d.department === department)?.count || 0;
+    const teamTotal = (teamId) =>
+        matrix.team_totals.find(t => t.team_id === teamId)?.count || 0;
 
     // Simple Pivot calculation: Team vs Request Stage
     const categories = [...new Set(equipment.map(e => e.department))];
@@ -13,7 +35,7 @@ export default function ReportingPage() {
     // Graph Data Preparation
     const teamData = teams.map(t => ({
         name: t.name,
-        count: requests.filter(r => r.team_id === t.id).length,
+        count: teamTotal(t.id),
         color: 'var(--color-primary)'
     }));
     const maxCount = Math.max(...teamData.map(d => d.count), 1);
@@ -78,17 +100,11 @@ export default function ReportingPage() {
                                 <tr key={cat} style={{ backgroundColor: idx % 2 === 0 ? 'white' : '#fcfdfe' }}>
                                     <td style={{ fontWeight: 800, color: 'var(--color-text-main)', borderRight: '1px solid var(--color-border)', padding: '1.25rem 1.5rem' }}>{cat}</td>
                                     {teams.map(t => {
-                                        const count = requests.filter(r => {
-                                            const eq = equipment.find(e => e.id === r.equipment_id);
-                                            return eq?.department === cat && r.team_id === t.id;
-                                        }).length;
+                                        const count = cellCount(cat, t.id);
                                         return <td key={t.id} style={{ textAlign: 'center', borderRight: '1px solid var(--color-border)', color: count ? 'var(--color-text-main)' : '#ccc', fontWeight: count ? 700 : 400 }}>{count || '0'}</td>;
                                     })}
                                     <td style={{ textAlign: 'center', fontWeight: 800, backgroundColor: '#f8fafc', color: 'var(--color-primary)', fontSize: '14px' }}>
-                                        {requests.filter(r => {
-                                            const eq = equipment.find(e => e.id === r.equipment_id);
-                                            return eq?.department === cat;
-                                        }).length}
+                                        {departmentTotal(cat)}
                                     </td>
                                 </tr>
                             ))}
@@ -96,10 +112,10 @@ export default function ReportingPage() {
                                 <td style={{ padding: '1.25rem 1.5rem', borderRight: '1px solid var(--color-border)' }}>Grand Total</td>
                                 {teams.map(t => (
                                     <td key={t.id} style={{ textAlign: 'center', borderRight: '1px solid var(--color-border)' }}>
-                                        {requests.filter(r => r.team_id === t.id).length}
+                                        {teamTotal(t.id)}
                                     </td>
                                 ))}
-                                <td style={{ textAlign: 'center', fontSize: '16px', color: 'var(--color-primary)' }}>{requests.length}</td>
+                                <td style={{ textAlign: 'center', fontSize: '16px', color: 'var(--color-primary)' }}>{matrix.total}</td>
                             </tr>
                         </tbody>
                     </table>